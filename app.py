@@ -1,510 +1,977 @@
-# Create the complete updated app.py with proper form handling
-app_code = 
-from flask import Flask, render_template, request, redirect, url_for
+from flask import Flask, Request, after_this_request, g, render_template, request, redirect, stream_with_context, url_for
+import concurrent.futures
+import gzip
+import hashlib
+import json
 import os
-import re
+import secrets
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
+# orjson is optional; the JSON API falls back to the standard library
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from evaluation_store import EvaluationStore, EvaluationWriter, StoredEvaluation, evaluation_id_time, new_evaluation_id
+from evaluator import evaluate_resume_text, ResumeEvaluator
+from incremental import EvaluationSession
+from job_queue import JobError, JobQueue, JobWorkerPool
+from metrics import LATENCY_BUCKETS, MetricsRegistry, SIZE_BUCKETS, StageTimings
+from pdf_pool import PdfParsePool
+from pdf_text import PDF_SUPPORT, PdfParseError, PdfTextCache, read_pdf_upload
+from profiling import ProfilingMiddleware
+from result_cache import EvaluationCache, evaluation_key
+from rubric import DEFAULT_RUBRIC_PATH, RubricStore
+from text_ingest import StreamingFormDataParser, TextDecodeError, read_text_stream
+from text_normalize import normalize_text
+
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['PHRASE_CPU_BUDGET'] = 0.25  # CPU seconds per request for phrase extraction
+app.config['EVALUATION_CACHE_SIZE'] = 256  # Finished evaluations kept per worker, 0 disables the cache
+app.config['EVALUATION_CACHE_TTL'] = 600  # Seconds a cached evaluation stays valid
+app.config['PDF_TEXT_CACHE_DIR'] = os.path.join('cache', 'pdf_text')
+app.config['PDF_TEXT_CACHE_MAX_BYTES'] = 64 * 1024 * 1024  # Extracted text kept on disk, shared by all workers
+app.config['PDF_MAX_PAGES'] = 10  # Pages read from an uploaded PDF; later pages are ignored
+app.config['PDF_MAX_CHARS'] = 100_000  # Characters read from an uploaded PDF
+app.config['PDF_POOL_PROCESSES'] = 2  # PDF parse worker processes per app process, 0 parses in the request thread
+app.config['PDF_PARSE_TIMEOUT'] = 10  # Seconds a request waits for its PDF to be parsed
+app.config['PDF_PARSE_CPU_SECONDS'] = 10  # CPU seconds one parse may use before its worker is killed
+app.config['PDF_PARSE_MEMORY_BYTES'] = 512 * 1024 * 1024  # Address space limit of a parse worker
+app.config['BATCH_MAX_ITEMS'] = 200  # Resumes accepted in one batch request
+app.config['BATCH_WORKERS'] = 4  # Threads evaluating batch items, shared by all batch requests
+app.config['BATCH_IN_FLIGHT'] = 8  # Items queued ahead of a batch response's reader
+app.config['METRICS_DIR'] = os.path.join('cache', 'metrics')  # Per-process metric snapshots merged by /metrics
+app.config['METRICS_FLUSH_INTERVAL'] = 1.0  # Seconds between snapshot writes of one process
+app.config['PROFILE_SECRET'] = os.environ.get('RESUME_PROFILE_SECRET')  # Signs profiling tokens, None disables profiling
+app.config['PROFILE_DIR'] = os.path.join('cache', 'profiles')  # pstats files of profiled requests
+app.config['PROFILE_TOP'] = 25  # Functions listed in the logged profile summary
+app.config['PROFILE_TOKEN_MAX_AGE'] = 300  # Seconds a profiling token stays valid
+app.config['RUBRIC_PATH'] = os.environ.get('RESUME_RUBRIC_PATH', DEFAULT_RUBRIC_PATH)  # Scores, keywords and feedback rules
+app.config['SESSION_CACHE_SIZE'] = 1024  # Editing sessions kept per worker for incremental re-evaluation
+app.config['SESSION_TTL'] = 1800  # Seconds an editing session is kept after its last evaluation
+app.config['SESSION_CACHE_CHARS'] = 32 * 1024 * 1024  # Characters of text the editing sessions of one worker may hold
+app.config['SESSIONS_PER_CLIENT'] = 4  # Editing sessions one client may hold per worker; another ends its oldest
+app.config['SESSION_CLIENT_COOKIE'] = 'resume_client'  # Tells clients apart for SESSIONS_PER_CLIENT; without it, the address does
+app.config['LIVE_MAX_CHARS'] = 100_000  # Longest resume text scored live while typing
+app.config['RUBRIC_POLL_INTERVAL'] = 2.0  # Seconds between checks for an edited rubric file, None disables reloading
+app.config['TEMPLATE_CACHE_DIR'] = os.path.join('cache', 'jinja')  # Compiled templates, shared by workers and restarts
+app.config['STATIC_MAX_AGE'] = 365 * 24 * 3600  # Seconds browsers keep static files requested by fingerprint
+app.config['COMPRESS_MIN_BYTES'] = 500  # HTML responses smaller than this are sent uncompressed
+app.config['COMPRESS_LEVEL'] = 6  # gzip level for HTML responses
+app.config['RESUME_MAX_CHARS'] = 100_000  # Characters of pasted or .txt resume text read; the rest is dropped unread
+app.config['FORM_FIELD_MAX_BYTES'] = 64 * 1024  # Largest other form field; a bigger one is rejected with a 413
+app.config['JOB_DB_PATH'] = os.path.join('cache', 'jobs.sqlite3')  # Queue of asynchronous evaluations, shared by all workers
+app.config['JOB_SPOOL_DIR'] = os.path.join('cache', 'jobs')  # Uploads kept until their job has finished
+app.config['JOB_WORKERS'] = 2  # Threads per app process running queued jobs, 0 leaves them to other processes
+app.config['JOB_POLL_INTERVAL'] = 0.5  # Seconds an idle job thread waits before looking for new jobs
+app.config['JOB_LEASE_SECONDS'] = 120  # A job whose process stops renewing its lease for this long is run again
+app.config['JOB_MAX_ATTEMPTS'] = 3  # Runs of a job before it is marked failed
+app.config['JOB_RETRY_DELAY'] = 5.0  # Seconds before a failed job is retried, times the attempts so far
+app.config['JOB_RETENTION'] = 7 * 24 * 3600  # Seconds finished jobs and their results are kept
+app.config['ASYNC_PDF_MIN_BYTES'] = 2 * 1024 * 1024  # PDFs this large posted to /evaluate are queued as a job
+app.config['EVALUATION_STORE_PATH'] = os.path.join('cache', 'evaluations.sqlite3')  # Results behind /results/<id>
+app.config['EVALUATION_STORE_RETENTION'] = 90 * 24 * 3600  # Seconds a stored result and its URL stay available
+app.config['EVALUATION_WRITE_QUEUE'] = 1000  # Results per worker waiting for the background writer; more are spilled
+app.config['EVALUATION_WRITE_BATCH'] = 100  # Most results committed in one transaction
+app.config['EVALUATION_FLUSH_INTERVAL'] = 0.05  # Seconds the writer waits for a batch to fill before committing
+app.config['EVALUATION_SPILL_DIR'] = os.path.join('cache', 'evaluation_spill')  # Overflow of a full write queue, None drops it
+app.config['EVALUATION_SPILL_MAX_BYTES'] = 64 * 1024 * 1024  # Spill file size per worker past which results are dropped
+app.config['EVALUATION_SAVE_GRACE'] = 60  # Seconds a new result URL shows a retrying page instead of a 404 until saved
+
+class ResumeRequest(Request):
+    """Request whose form parser streams resume_text instead of buffering the whole field"""
+    
+    def make_form_data_parser(self):
+        return StreamingFormDataParser(
+            stream_factory=self._get_file_stream,
+            max_form_memory_size=app.config['FORM_FIELD_MAX_BYTES'],
+            max_content_length=self.max_content_length,
+            max_form_parts=self.max_form_parts,
+            cls=self.parameter_storage_class,
+            streamed_fields={'resume_text': app.config['RESUME_MAX_CHARS']},
+            logger=app.logger,
+        )
+
+app.request_class = ResumeRequest
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-class ResumeEvaluator:
-    def __init__(self):
-        self.career_tracks = [
-            "Technology & Software",
-            "Healthcare & Medicine",
-            "Finance & Banking",
-            "Marketing & Communications",
-            "Education & Training",
-            "Public Service & Nonprofit",
-            "Engineering & Manufacturing",
-            "Creative & Design",
-            "Sales & Business Development",
-            "Consulting & Strategy",
-            "Legal & Compliance",
-            "Operations & Supply Chain"
-        ]
-        
-        self.life_stages = [
-            "High School Student (16-18)",
-            "College Student (18-22)",
-            "Recent Graduate (22-25)",
-            "Early Career (25-30)",
-            "Career Transition",
-            "Returning to Workforce"
-        ]
-        
-        self.rubric_descriptions = {
-            "relevance": "How well your resume matches your target job or field - includes relevant keywords, experience, and skills.",
-            "clarity": "How clear, organized, and easy to read your resume is - formatting, structure, and readability.",
-            "impact": "How strongly your achievements and results are communicated - quantified accomplishments and action verbs.",
-            "completeness": "Whether all key sections and details are present - contact info, experience, education, skills.",
-            "differentiation": "How well you stand out from other candidates - unique value proposition and memorable elements."
-        }
-    
-    def extract_good_phrases(self, resume_text):
-        """Extract strong phrases and accomplishments from resume"""
-        good_phrases = []
-        
-        # Look for quantified achievements
-        quantified_patterns = [
-            r'[Ii]ncreased.*?(\d+%|\d+\s*percent)',
-            r'[Rr]educed.*?(\d+%|\d+\s*percent)',
-            r'[Mm]anaged.*?\$[\d,]+',
-            r'[Ll]ed.*?(\d+)\s*(people|team|members)',
-            r'[Aa]chieved.*?(\d+%|\d+\s*percent)',
-            r'[Gg]enerated.*?\$[\d,]+',
-            r'[Ss]aved.*?\$[\d,]+',
-            r'[Ii]mproved.*?(\d+%|\d+\s*percent)'
-        ]
-        
-        for pattern in quantified_patterns:
-            matches = re.findall(pattern, resume_text, re.IGNORECASE)
-            for match in matches:
-                # Get the full sentence containing the match
-                sentences = re.split(r'[.!?]', resume_text)
-                for sentence in sentences:
-                    if re.search(pattern, sentence, re.IGNORECASE):
-                        good_phrases.append(sentence.strip())
-                        break
-        
-        # Look for strong action verbs at start of bullet points
-        action_patterns = [
-            r'[•\-\*]\s*(Developed|Created|Implemented|Led|Managed|Designed|Built|Launched|Optimized|Streamlined).*',
-            r'^\s*(Developed|Created|Implemented|Led|Managed|Designed|Built|Launched|Optimized|Streamlined).*'
-        ]
-        
-        for pattern in action_patterns:
-            matches = re.findall(pattern, resume_text, re.MULTILINE | re.IGNORECASE)
-            good_phrases.extend(matches[:3])  # Limit to 3 examples
-        
-        return list(set(good_phrases))[:5]  # Return top 5 unique phrases
-    
-    def extract_growth_phrases(self, resume_text):
-        """Extract phrases that indicate areas for improvement"""
-        growth_phrases = []
-        
-        # Look for weak language patterns
-        weak_patterns = [
-            r'[Rr]esponsible for.*',
-            r'[Hh]elped with.*',
-            r'[Aa]ssisted in.*',
-            r'[Ww]orked on.*',
-            r'[Ii]nvolved in.*'
-        ]
-        
-        for pattern in weak_patterns:
-            matches = re.findall(pattern, resume_text, re.IGNORECASE)
-            for match in matches:
-                sentences = re.split(r'[.!?]', resume_text)
-                for sentence in sentences:
-                    if re.search(pattern, sentence, re.IGNORECASE):
-                        growth_phrases.append(sentence.strip())
-                        break
-        
-        return list(set(growth_phrases))[:3]  # Return top 3 unique phrases
-    
-    def generate_personal_feedback(self, user_inputs, evaluation, resume_text):
-        """Generate personalized feedback based on user inputs and resume"""
-        feedback = []
-        
-        career_track = user_inputs.get('career_track', '')
-        dream_job = user_inputs.get('dream_job', '')
-        life_stage = user_inputs.get('life_stage', '')
-        
-        # Career alignment feedback
-        if dream_job:
-            if evaluation['total_score'] >= 70:
-                feedback.append(f"Your resume shows strong alignment with your goal of '{dream_job}'. The experience and skills you've highlighted demonstrate clear progression toward this role.")
+# Compiled templates are kept on disk so new workers start without compiling them
+os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR'])
+
+# Initialize evaluator; an edited rubric file replaces it without a restart
+rubric_store = RubricStore(app.config['RUBRIC_PATH'], app.config['RUBRIC_POLL_INTERVAL'], app.logger)
+evaluator = ResumeEvaluator(rubric_store.current())
+evaluation_cache = EvaluationCache(app.config['EVALUATION_CACHE_SIZE'], app.config['EVALUATION_CACHE_TTL'])
+evaluation_sessions = EvaluationCache(app.config['SESSION_CACHE_SIZE'], app.config['SESSION_TTL'],
+                                      max_size=app.config['SESSION_CACHE_CHARS'],
+                                      sizeof=EvaluationSession.retained_chars)
+pdf_text_cache = PdfTextCache(app.config['PDF_TEXT_CACHE_DIR'], app.config['PDF_TEXT_CACHE_MAX_BYTES'])
+batch_executor = concurrent.futures.ThreadPoolExecutor(app.config['BATCH_WORKERS'], thread_name_prefix='batch')
+evaluation_store = EvaluationStore(app.config['EVALUATION_STORE_PATH'], app.config['EVALUATION_STORE_RETENTION'])
+# Results are written by a background thread per worker, off the request path
+evaluation_writer = EvaluationWriter(evaluation_store, app.config['EVALUATION_WRITE_QUEUE'],
+                                     app.config['EVALUATION_WRITE_BATCH'], app.config['EVALUATION_FLUSH_INTERVAL'],
+                                     app.config['EVALUATION_SPILL_DIR'],
+                                     app.config['EVALUATION_SPILL_MAX_BYTES'],
+                                     lambda records, seconds: metrics.observe('resume_evaluation_flush_seconds', seconds),
+                                     app.logger)
+job_queue = JobQueue(app.config['JOB_DB_PATH'], app.config['JOB_LEASE_SECONDS'], app.config['JOB_MAX_ATTEMPTS'],
+                     app.config['JOB_RETRY_DELAY'])
+pdf_parse_pool = None
+if app.config['PDF_POOL_PROCESSES']:
+    pdf_parse_pool = PdfParsePool(app.config['PDF_POOL_PROCESSES'], app.config['PDF_PARSE_TIMEOUT'],
+                                  app.config['PDF_PARSE_CPU_SECONDS'], app.config['PDF_PARSE_MEMORY_BYTES'])
+
+# Metrics, merged across gunicorn workers through snapshot files
+metrics = MetricsRegistry(app.config['METRICS_DIR'], app.config['METRICS_FLUSH_INTERVAL'])
+metrics.counter('resume_http_requests_total', "Requests handled, by endpoint, method and status")
+metrics.histogram('resume_http_request_duration_seconds', "Request latency by endpoint", LATENCY_BUCKETS)
+metrics.histogram('resume_stage_duration_seconds', "Time spent in each stage of an evaluation", LATENCY_BUCKETS)
+metrics.histogram('resume_input_chars', "Characters of resume text per evaluation", SIZE_BUCKETS)
+metrics.counter('resume_cache_hits_total', "Cache lookups that found an entry, by cache")
+metrics.counter('resume_cache_misses_total', "Cache lookups that found nothing, by cache")
+metrics.counter('resume_pdf_workers_replaced_total', "PDF parse workers killed after a crash, timeout or error")
+metrics.counter('resume_jobs_submitted_total', "Asynchronous jobs queued, by kind")
+metrics.counter('resume_job_runs_total', "Job runs by kind and outcome: done, queued for a retry or failed")
+metrics.histogram('resume_job_wait_seconds', "Time from submitting a job to the start of its latest run", LATENCY_BUCKETS)
+metrics.histogram('resume_job_run_seconds', "Duration of each job run, by kind", LATENCY_BUCKETS)
+metrics.counter('resume_evaluation_writes_total', "Stored results by outcome: written, spilled to disk or dropped")
+metrics.gauge('resume_evaluation_write_queue_depth', "Results waiting for the background writer, over all workers")
+metrics.histogram('resume_evaluation_flush_seconds', "Duration of each batched write of stored results", LATENCY_BUCKETS)
+metrics.gauge('resume_session_cache_chars', "Characters of text held by editing sessions, over all workers")
+
+def cache_counters():
+    """Counters kept by the caches, the PDF pool and the evaluation writer, for the metrics snapshot"""
+    counters = {}
+    session_stats = evaluation_sessions.stats()
+    for name, stats in (('evaluation', evaluation_cache.stats()), ('pdf_text', pdf_text_cache.stats()),
+                        ('session', session_stats)):
+        counters[('resume_cache_hits_total', (('cache', name),))] = stats['hits']
+        counters[('resume_cache_misses_total', (('cache', name),))] = stats['misses']
+    counters[('resume_session_cache_chars', ())] = session_stats['size']
+    if pdf_parse_pool is not None:
+        counters[('resume_pdf_workers_replaced_total', ())] = pdf_parse_pool.replaced
+    for outcome in ('written', 'spilled', 'dropped'):
+        counters[('resume_evaluation_writes_total', (('outcome', outcome),))] = getattr(evaluation_writer, outcome)
+    counters[('resume_evaluation_write_queue_depth', ())] = evaluation_writer.depth()
+    return counters
+
+metrics.add_collector(cache_counters)
+
+# Per-request profiling is only wired in when a secret is configured
+if app.config['PROFILE_SECRET']:
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app, app.config['PROFILE_SECRET'], app.config['PROFILE_DIR'],
+                                       app.config['PROFILE_TOP'], app.config['PROFILE_TOKEN_MAX_AGE'], app.logger)
+
+def cache_hit_ratios(counters):
+    """Hit ratio of each cache over every worker, derived from the merged counters"""
+    ratios = {}
+    hits = counters.get('resume_cache_hits_total', {})
+    misses = counters.get('resume_cache_misses_total', {})
+    for key in hits:
+        lookups = hits[key] + misses.get(key, 0)
+        ratios[(('cache', key.split('"')[1]),)] = hits[key] / lookups if lookups else 0.0
+    return {'resume_cache_hit_ratio': ("Share of cache lookups that found an entry, by cache", ratios)}
+
+def exported_gauges(counters):
+    """Gauges for /metrics: cache hit ratios and the jobs in the shared queue by state"""
+    gauges = cache_hit_ratios(counters)
+    depth = {(('state', state),): count for state, count in job_queue.counts().items()}
+    gauges['resume_jobs'] = ("Jobs in the queue, by state", depth)
+    return gauges
+
+def record_stages(timings):
+    for stage, seconds in timings.stages.items():
+        metrics.observe('resume_stage_duration_seconds', seconds, (('stage', stage),))
+
+def current_evaluator():
+    """The evaluator for the current rubric, rebuilt when the rubric file was reloaded
+    
+    Callers should fetch it once per request so every part of a response uses
+    the same rubric.
+    """
+    global evaluator
+    rubric = rubric_store.current()
+    current = evaluator
+    if current.rubric is not rubric:
+        current = evaluator = ResumeEvaluator(rubric)
+    return current
+
+def run_evaluation(evaluator, resume_text, user_inputs, timings=None):
+    """Evaluate under the configured phrase budget"""
+    return evaluate_resume_text(evaluator, resume_text, user_inputs, app.config['PHRASE_CPU_BUDGET'], timings)
+
+class SubmissionError(Exception):
+    """A submitted resume or its form fields failed validation"""
+
+def read_user_inputs(fields):
+    """Validate the career_track, life_stage and dream_job fields and return them as user_inputs"""
+    user_inputs = {name: fields.get(name) for name in ('career_track', 'life_stage', 'dream_job')}
+    if not all(isinstance(field, str) and field for field in user_inputs.values()):
+        raise SubmissionError("Please fill in all required fields.")
+    return user_inputs
+
+def read_resume_file(file, timings=None):
+    """Return the text of an uploaded .txt or .pdf resume, or None for other files"""
+    timings = timings or StageTimings()
+    if file.filename.endswith('.txt'):
+        ingestion = read_text_stream(file.stream, app.config['RESUME_MAX_CHARS'])
+        if ingestion.truncated:
+            app.logger.info("Text upload truncated to %d characters (%d bytes read)",
+                            len(ingestion.text), ingestion.bytes_read)
+        return ingestion.text
+    elif file.filename.endswith('.pdf') and PDF_SUPPORT:
+        # Repeat uploads of the same PDF reuse the text extracted last time
+        with timings.stage('pdf'):
+            extraction = read_pdf_upload(file, pdf_text_cache,
+                                         app.config['PDF_MAX_PAGES'], app.config['PDF_MAX_CHARS'],
+                                         pdf_parse_pool, app.config['UPLOAD_FOLDER'])
+        if extraction.truncated:
+            app.logger.info("PDF truncated to %d of %d pages (%.3fs)", extraction.pages_read,
+                            extraction.page_count, sum(extraction.page_timings))
+        return extraction.text
+    return None
+
+def read_submission(fields, files, timings=None):
+    """Validate a submission and return (user_inputs, resume_text)
+    
+    fields is the form (or JSON object) and files the uploaded files, so the
+    HTML form and the JSON API share one set of rules. The resume text is
+    returned in its canonical form, which is what gets hashed and analyzed.
+    """
+    timings = timings or StageTimings()
+    resume_text = fields.get('resume_text') or ''
+    
+    # Handle file upload
+    file = files.get('resume_file')
+    if file and file.filename:
+        try:
+            file_text = read_resume_file(file, timings)
+            if file_text is not None:
+                resume_text = file_text
+        except PdfParseError as e:
+            raise SubmissionError(str(e))
+        except TextDecodeError as e:
+            raise SubmissionError(f"{file.filename} is not UTF-8 text ({e}). Save it as UTF-8 or paste the text instead.")
+        except Exception:
+            app.logger.exception("Error reading %s", file.filename)
+    
+    # Validation
+    user_inputs = read_user_inputs(fields)
+    
+    if isinstance(resume_text, str):
+        # Form bodies are already capped while parsed; JSON bodies arrive whole
+        with timings.stage('normalize'):
+            resume_text = normalize_text(resume_text[:app.config['RESUME_MAX_CHARS']])
+    if not isinstance(resume_text, str) or not resume_text:
+        raise SubmissionError("Please provide your resume text or upload a file.")
+    return user_inputs, resume_text
+
+def get_evaluation(user_inputs, resume_text, timings=None, evaluator=None):
+    """Return the evaluation for a submission, from the cache when possible"""
+    timings = timings or StageTimings()
+    evaluator = evaluator or current_evaluator()
+    metrics.observe('resume_input_chars', len(resume_text))
+    # Resubmissions of the same resume and inputs skip scoring entirely
+    with timings.stage('cache'):
+        cache_key = evaluation_key(resume_text, user_inputs['career_track'], user_inputs['life_stage'],
+                                   user_inputs['dream_job'], evaluator.rubric.version)
+        result = evaluation_cache.get(cache_key)
+    if result is None:
+        result = run_evaluation(evaluator, resume_text, user_inputs, timings)
+        if not result.pop('partial'):
+            evaluation_cache.put(cache_key, result)
+    return result
+
+def store_evaluation(user_inputs, resume_text, result, timings, evaluator):
+    """Queue a finished evaluation for the store and return the id of its /results page
+    
+    Returns None when the writer had to drop it, so no link to a page that
+    will never exist is handed out.
+    """
+    input_hash = evaluation_key(resume_text, user_inputs['career_track'], user_inputs['life_stage'],
+                                user_inputs['dream_job'], evaluator.rubric.version)
+    record = StoredEvaluation(new_evaluation_id(), input_hash, evaluator.rubric.version, user_inputs, result,
+                              dict(timings.stages))
+    if not evaluation_writer.put(record):
+        return None
+    return record.id
+
+def result_url_for(result_id):
+    """URL of a stored result's page, or None for an evaluation that was not stored"""
+    return url_for('result_page', result_id=result_id) if result_id is not None else None
+
+# Client address -> ids of the sessions it started in this worker, oldest first
+client_sessions = OrderedDict()
+client_sessions_lock = threading.Lock()
+
+def session_client():
+    """Key of the client starting an editing session, for the per-client session cap
+    
+    Users behind one proxy or NAT share an address, so clients are told apart
+    by a random cookie handed out with their first session. A client sending
+    no cookie is keyed on its address.
+    """
+    cookie = app.config['SESSION_CLIENT_COOKIE']
+    client = request.cookies.get(cookie)
+    if client and len(client) <= 64:
+        return 'client:' + client
+    
+    @after_this_request
+    def set_client_cookie(response):
+        response.set_cookie(cookie, secrets.token_urlsafe(16), httponly=True, samesite='Lax',
+                            secure=request.is_secure)
+        return response
+    return 'address:' + (request.remote_addr or '')
+
+def get_session(session_id, start=True):
+    """Return (session_id, session), starting a new session for a missing or expired id
+    
+    With start false a missing id gives (None, None) instead. Sessions live in
+    the memory of one worker, so a resubmission that reaches another worker
+    starts over with a full evaluation. Each client (see session_client) keeps
+    at most SESSIONS_PER_CLIENT sessions; starting another ends its oldest one.
+    """
+    session = evaluation_sessions.get(session_id) if isinstance(session_id, str) else None
+    if session is not None:
+        return session_id, session
+    if not start:
+        return None, None
+    session_id = secrets.token_urlsafe(16)
+    client = session_client()
+    with client_sessions_lock:
+        ids = client_sessions.pop(client, [])
+        ids.append(session_id)
+        while len(ids) > app.config['SESSIONS_PER_CLIENT']:
+            evaluation_sessions.discard(ids.pop(0))
+        client_sessions[client] = ids
+        # No more clients can hold a session than there are sessions
+        while len(client_sessions) > app.config['SESSION_CACHE_SIZE']:
+            client_sessions.popitem(last=False)
+    return session_id, EvaluationSession()
+
+# Static file name -> short content hash, computed once per process
+asset_fingerprints = {}
+
+@app.template_global()
+def asset_url(filename):
+    """URL of a static file carrying its content hash, so browsers may cache it for good"""
+    fingerprint = asset_fingerprints.get(filename)
+    if fingerprint is None:
+        with open(os.path.join(app.static_folder, filename), 'rb') as f:
+            fingerprint = asset_fingerprints[filename] = hashlib.sha256(f.read()).hexdigest()[:12]
+    return url_for('static', filename=filename, v=fingerprint)
+
+# Template name -> short hash of its source, computed once per process
+template_fingerprints = {}
+
+def template_fingerprint(name):
+    """Hash of a template's source, so ETags of pages rendered from it change when it is edited"""
+    fingerprint = template_fingerprints.get(name)
+    if fingerprint is None:
+        source = app.jinja_env.loader.get_source(app.jinja_env, name)[0]
+        fingerprint = template_fingerprints[name] = hashlib.sha256(source.encode('utf-8')).hexdigest()[:12]
+    return fingerprint
+
+# (rubric version, ETag, body, gzipped body) of the plain GET / page
+index_page = None
+
+def render_index_page(evaluator):
+    """The form page for the evaluator's rubric, rendered on the first request after each reload"""
+    global index_page
+    page = index_page
+    if page is None or page[0] != evaluator.rubric.version:
+        body = render_template('index.html',
+                               career_tracks=evaluator.career_tracks,
+                               life_stages=evaluator.life_stages,
+                               score_names=evaluator.rubric.score_names,
+                               error=None,
+                               prev_data={}).encode('utf-8')
+        etag = hashlib.sha256(body).hexdigest()[:16]
+        page = index_page = (evaluator.rubric.version, etag, body, gzip.compress(body, app.config['COMPRESS_LEVEL']))
+    return page[1:]
+
+def read_patches(patches):
+    """Validate live-update patches, returning (start, end, text) tuples"""
+    if not isinstance(patches, list):
+        raise SubmissionError("patches must be a list.")
+    parsed = []
+    for patch in patches:
+        if not isinstance(patch, dict):
+            raise SubmissionError("Each patch must be an object with start, end and text.")
+        start, end, text = patch.get('start'), patch.get('end'), patch.get('text', '')
+        if not all(isinstance(offset, int) and not isinstance(offset, bool) for offset in (start, end)):
+            raise SubmissionError("Patch start and end must be integers.")
+        if not isinstance(text, str):
+            raise SubmissionError("Patch text must be a string.")
+        parsed.append((start, end, text))
+    return parsed
+
+def dump_json(payload):
+    """Serialize straight to bytes with orjson when it is installed"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload)
+        except TypeError:
+            pass  # Such as integers beyond 64 bits, which the json module still writes
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+def json_response(payload, status=200):
+    return app.response_class(dump_json(payload), status=status, mimetype='application/json')
+
+def valid_item_id(item_id):
+    """Whether a client's batch item id can be echoed back as is"""
+    if isinstance(item_id, str):
+        return True
+    return isinstance(item_id, int) and not isinstance(item_id, bool) and -2 ** 63 <= item_id < 2 ** 64
+
+def read_batch(req):
+    """Split a batch request into (id, fields, files) items
+    
+    NDJSON bodies carry one JSON object per line. Multipart bundles carry any
+    number of resume_file uploads that share the form's other fields. A line
+    that is not a JSON object becomes an item whose fields are the error.
+    """
+    if req.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        items = []
+        for number, line in enumerate(req.get_data().splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                fields = json.loads(line)
+            except ValueError as e:
+                fields = SubmissionError(f"Line {number} is not valid JSON: {e}")
             else:
-                feedback.append(f"To better align with your goal of '{dream_job}', consider emphasizing more relevant experience and incorporating industry-specific keywords.")
-        
-        # Life stage specific feedback
-        if "Student" in life_stage or "Graduate" in life_stage:
-            feedback.append("As someone early in your career, focus on highlighting academic projects, internships, and transferable skills. Consider adding relevant coursework and certifications.")
-        elif "Career Transition" in life_stage:
-            feedback.append("For a career transition, emphasize transferable skills and any relevant experience or training in your target field. Consider adding a professional summary that bridges your past and future.")
-        
-        # Score-based feedback
-        if evaluation['scores']['impact'] < 15:
-            feedback.append("Your resume would benefit from more quantified achievements. Try to add specific numbers, percentages, or dollar amounts to demonstrate your impact.")
-        
-        if evaluation['scores']['relevance'] < 15:
-            feedback.append(f"Consider incorporating more keywords and terminology specific to {career_track} to improve relevance for your target roles.")
-        
-        return feedback
-    
-    def suggest_career_paths(self, user_inputs, resume_text):
-        """Suggest career paths based on resume content and user inputs"""
-        insights = []
-        
-        career_track = user_inputs.get('career_track', '')
-        dream_job = user_inputs.get('dream_job', '')
-        
-        # Analyze resume for skills and experience
-        tech_keywords = ['python', 'javascript', 'sql', 'data', 'software', 'programming', 'development']
-        business_keywords = ['management', 'strategy', 'analysis', 'project', 'leadership', 'operations']
-        creative_keywords = ['design', 'creative', 'marketing', 'content', 'brand', 'visual']
-        
-        resume_lower = resume_text.lower()
-        
-        # Suggest paths based on detected skills
-        if any(keyword in resume_lower for keyword in tech_keywords):
-            insights.append("Your technical background positions you well for roles in software development, data analysis, or product management.")
-        
-        if any(keyword in resume_lower for keyword in business_keywords):
-            insights.append("Your business and leadership experience could lead to opportunities in consulting, operations management, or business development.")
-        
-        if any(keyword in resume_lower for keyword in creative_keywords):
-            insights.append("Your creative skills suggest potential paths in digital marketing, UX/UI design, or brand management.")
-        
-        # Career track specific suggestions
-        if career_track == "Technology & Software":
-            insights.append("Consider specializing in emerging areas like AI/ML, cybersecurity, or cloud computing to stay competitive in tech.")
-        elif career_track == "Healthcare & Medicine":
-            insights.append("Healthcare technology and telemedicine are growing fields that combine healthcare with digital innovation.")
-        elif career_track == "Finance & Banking":
-            insights.append("FinTech and sustainable finance are rapidly expanding areas within the financial sector.")
-        
-        # Add general career development insight
-        insights.append("Consider building a portfolio of projects or case studies that demonstrate your skills in action, especially for your target role.")
-        
-        return insights[:4]  # Return top 4 insights
-    
-    def evaluate_resume(self, resume_text, career_track, life_stage, dream_job):
-        """Enhanced evaluation with more detailed analysis"""
-        scores = {}
-        
-        # Relevance scoring (enhanced)
-        relevance_score = self._score_relevance(resume_text, career_track, dream_job)
-        scores['relevance'] = relevance_score
-        
-        # Clarity scoring
-        clarity_score = self._score_clarity(resume_text)
-        scores['clarity'] = clarity_score
-        
-        # Impact scoring (enhanced)
-        impact_score = self._score_impact(resume_text)
-        scores['impact'] = impact_score
-        
-        # Completeness scoring
-        completeness_score = self._score_completeness(resume_text)
-        scores['completeness'] = completeness_score
-        
-        # Differentiation scoring
-        differentiation_score = self._score_differentiation(resume_text)
-        scores['differentiation'] = differentiation_score
-        
-        total_score = sum(scores.values())
-        
-        # Generate enhanced feedback
-        strengths = self._generate_strengths(scores, resume_text)
-        improvements = self._generate_improvements(scores, resume_text, career_track)
-        career_alignment = self._generate_career_alignment(total_score, career_track, dream_job, life_stage)
-        resources = self._generate_resources(scores, career_track, life_stage)
-        
-        return {
-            'scores': scores,
-            'total_score': total_score,
-            'strengths': strengths,
-            'improvements': improvements,
-            'career_alignment': career_alignment,
-            'resources': resources
-        }
-    
-    def _score_relevance(self, resume_text, career_track, dream_job):
-        """Enhanced relevance scoring"""
-        score = 10  # Base score
-        
-        # Career track keywords
-        track_keywords = {
-            "Technology & Software": ['python', 'javascript', 'software', 'development', 'programming', 'coding', 'technical', 'system', 'database', 'api'],
-            "Healthcare & Medicine": ['patient', 'clinical', 'medical', 'healthcare', 'treatment', 'diagnosis', 'care', 'health', 'medicine', 'hospital'],
-            "Finance & Banking": ['financial', 'investment', 'banking', 'accounting', 'budget', 'analysis', 'risk', 'portfolio', 'audit', 'compliance'],
-            "Marketing & Communications": ['marketing', 'brand', 'campaign', 'social media', 'content', 'advertising', 'promotion', 'communications', 'digital', 'seo'],
-            "Education & Training": ['teaching', 'education', 'curriculum', 'student', 'learning', 'training', 'instruction', 'academic', 'classroom', 'pedagogy'],
-            "Public Service & Nonprofit": ['community', 'public', 'nonprofit', 'volunteer', 'service', 'social', 'advocacy', 'outreach', 'civic', 'government']
-        }
-        
-        if career_track in track_keywords:
-            keywords = track_keywords[career_track]
-            keyword_count = sum(1 for keyword in keywords if keyword.lower() in resume_text.lower())
-            score += min(keyword_count * 2, 8)  # Up to 8 bonus points
-        
-        # Dream job relevance
-        if dream_job:
-            dream_words = dream_job.lower().split()
-            dream_relevance = sum(1 for word in dream_words if word in resume_text.lower())
-            score += min(dream_relevance, 2)  # Up to 2 bonus points
-        
-        return min(score, 20)
-    
-    def _score_clarity(self, resume_text):
-        """Score resume clarity and organization"""
-        score = 15  # Base score for having text
-        
-        # Check for common sections
-        sections = ['experience', 'education', 'skills', 'summary', 'objective']
-        section_count = sum(1 for section in sections if section.lower() in resume_text.lower())
-        score += min(section_count, 3)  # Up to 3 points for sections
-        
-        # Check for bullet points (good formatting)
-        if '•' in resume_text or '-' in resume_text or '*' in resume_text:
-            score += 2
-        
-        return min(score, 20)
-    
-    def _score_impact(self, resume_text):
-        """Enhanced impact scoring"""
-        score = 8  # Base score
-        
-        # Look for quantified achievements
-        numbers = re.findall(r'\d+%|\d+\s*percent|\$[\d,]+|\d+\s*(people|team|members|clients|customers)', resume_text, re.IGNORECASE)
-        score += min(len(numbers) * 2, 8)  # Up to 8 points for quantified results
-        
-        # Strong action verbs
-        strong_verbs = ['achieved', 'improved', 'increased', 'reduced', 'led', 'managed', 'developed', 'created', 'implemented', 'optimized']
-        verb_count = sum(1 for verb in strong_verbs if verb.lower() in resume_text.lower())
-        score += min(verb_count, 4)  # Up to 4 points for action verbs
-        
-        return min(score, 20)
-    
-    def _score_completeness(self, resume_text):
-        """Score resume completeness"""
-        score = 10  # Base score
-        
-        # Essential elements
-        if '@' in resume_text:  # Email
-            score += 2
-        if any(word in resume_text.lower() for word in ['phone', 'tel', '(']):  # Phone
-            score += 2
-        if any(word in resume_text.lower() for word in ['experience', 'work', 'employment']):
-            score += 3
-        if any(word in resume_text.lower() for word in ['education', 'degree', 'university', 'college']):
-            score += 3
-        
-        return min(score, 20)
-    
-    def _score_differentiation(self, resume_text):
-        """Score how well the resume stands out"""
-        score = 12  # Base score
-        
-        # Unique elements
-        if any(word in resume_text.lower() for word in ['award', 'recognition', 'honor', 'achievement']):
-            score += 3
-        if any(word in resume_text.lower() for word in ['project', 'portfolio', 'publication']):
-            score += 2
-        if any(word in resume_text.lower() for word in ['volunteer', 'community', 'leadership']):
-            score += 2
-        if any(word in resume_text.lower() for word in ['certification', 'certified', 'license']):
-            score += 1
-        
-        return min(score, 20)
-    
-    def _generate_strengths(self, scores, resume_text):
-        """Generate specific strengths based on scores and content"""
-        strengths = []
-        
-        if scores['clarity'] >= 18:
-            strengths.append("Excellent resume structure and organization that's easy to scan and read")
-        elif scores['clarity'] >= 15:
-            strengths.append("Clear, well-organized resume structure")
-        
-        if scores['impact'] >= 16:
-            strengths.append("Strong use of quantified achievements and measurable results")
-        elif scores['impact'] >= 12:
-            strengths.append("Good inclusion of measurable results and achievements")
-        
-        if scores['completeness'] >= 18:
-            strengths.append("Comprehensive coverage of all essential resume sections")
-        
-        if scores['differentiation'] >= 16:
-            strengths.append("Notable unique elements that help you stand out from other candidates")
-        
-        if scores['relevance'] >= 16:
-            strengths.append("Strong alignment between your experience and target career field")
-        
-        # Content-based strengths
-        if any(word in resume_text.lower() for word in ['led', 'managed', 'supervised']):
-            strengths.append("Demonstrated leadership and management experience")
-        
-        if len(re.findall(r'\d+%|\d+\s*percent', resume_text)) >= 3:
-            strengths.append("Excellent use of specific percentages to quantify your impact")
-        
-        return strengths[:4]  # Return top 4 strengths
-    
-    def _generate_improvements(self, scores, resume_text, career_track):
-        """Generate specific improvement suggestions"""
-        improvements = []
-        
-        if scores['relevance'] < 15:
-            improvements.append(f"Add more {career_track.lower()}-specific keywords and terminology to better align with your target field")
-        
-        if scores['impact'] < 14:
-            improvements.append("Include more quantified achievements with specific numbers, percentages, or dollar amounts")
-        
-        if scores['clarity'] < 16:
-            improvements.append("Improve formatting with consistent bullet points, clear section headers, and better organization")
-        
-        if scores['differentiation'] < 14:
-            improvements.append("Add unique elements like awards, certifications, projects, or volunteer work to stand out")
-        
-        if scores['completeness'] < 16:
-            improvements.append("Ensure all essential sections are complete: contact info, experience, education, and skills")
-        
-        # Content-based improvements
-        weak_verbs = ['responsible for', 'helped with', 'assisted in', 'worked on']
-        if any(phrase in resume_text.lower() for phrase in weak_verbs):
-            improvements.append("Replace weak phrases like 'responsible for' with stronger action verbs like 'led', 'developed', or 'achieved'")
-        
-        if not re.search(r'\d+%|\d+\s*percent|\$[\d,]+', resume_text):
-            improvements.append("Add specific metrics and numbers to demonstrate the scope and impact of your work")
-        
-        return improvements[:4]  # Return top 4 improvements
-    
-    def _generate_career_alignment(self, total_score, career_track, dream_job, life_stage):
-        """Generate career alignment feedback"""
-        if total_score >= 80:
-            alignment = f"Excellent alignment! Your resume strongly positions you for {career_track.lower()} roles"
-        elif total_score >= 65:
-            alignment = f"Good alignment with {career_track.lower()}, with room for targeted improvements"
-        else:
-            alignment = f"Moderate alignment with {career_track.lower()}. Focus on adding more relevant experience and keywords"
-        
-        if dream_job:
-            alignment += f" and specifically for your goal of '{dream_job}'."
+                if not isinstance(fields, dict):
+                    fields = SubmissionError(f"Line {number} must be a JSON object.")
+                elif 'id' in fields and not valid_item_id(fields['id']):
+                    fields = SubmissionError(f"Line {number} has an id that is neither a string nor a 64-bit integer.")
+            item_id = fields.get('id', number) if isinstance(fields, dict) else number
+            items.append((item_id, fields, {}))
+        return items
+    
+    fields = req.form.to_dict()
+    files = [file for file in req.files.getlist('resume_file') if file and file.filename]
+    if not files:
+        return [(1, fields, {})]
+    return [(file.filename, fields, {'resume_file': file}) for file in files]
+
+def evaluate_batch_item(index, item_id, fields, files, store=False):
+    """Evaluate one batch entry, turning a bad entry into an error result
+    
+    With store the evaluation is also kept for /results, and its result_id added.
+    """
+    timings = StageTimings()
+    try:
+        if isinstance(fields, SubmissionError):
+            raise fields
+        with timings.stage('upload'):
+            user_inputs, resume_text = read_submission(fields, files, timings)
+    except SubmissionError as e:
+        return {'index': index, 'id': item_id, 'error': str(e)}
+    evaluator = current_evaluator()
+    try:
+        result = get_evaluation(user_inputs, resume_text, timings, evaluator)
+        if store:
+            with timings.stage('store'):
+                result_id = store_evaluation(user_inputs, resume_text, result, timings, evaluator)
+    except Exception:
+        app.logger.exception("Batch item %s failed", item_id)
+        return {'index': index, 'id': item_id, 'error': "This resume could not be evaluated."}
+    finally:
+        record_stages(timings)
+    item = {'index': index, 'id': item_id, 'user_inputs': user_inputs, **result}
+    if store:
+        item['result_id'] = result_id
+    return item
+
+def stream_batch(items):
+    """Evaluate items concurrently and yield one NDJSON line per item as it finishes
+    
+    At most BATCH_IN_FLIGHT items are queued ahead of the client. The next item
+    is only submitted after a finished one has been written out, so a slow
+    reader holds back evaluation instead of piling up results in memory.
+    """
+    pending = set()
+    futures_items = {}
+    queued = iter(enumerate(items))
+    
+    def submit_next():
+        for index, (item_id, fields, files) in queued:
+            future = batch_executor.submit(evaluate_batch_item, index, item_id, fields, files)
+            pending.add(future)
+            futures_items[future] = (index, item_id)
+            return
+    
+    for _ in range(app.config['BATCH_IN_FLIGHT']):
+        submit_next()
+    while pending:
+        done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            pending.discard(future)
+            index, item_id = futures_items.pop(future)
+            # One item that cannot be written out must not end the stream for the rest
+            try:
+                line = dump_json(future.result())
+            except Exception:
+                app.logger.exception("Batch item %d could not be written", index)
+                line = dump_json({'index': index, 'id': item_id if valid_item_id(item_id) else None,
+                                  'error': "This resume could not be evaluated."})
+            yield line + b'\n'
+            submit_next()
+
+def upload_size(file):
+    """Size in bytes of an uploaded file, which Werkzeug has already spooled to a seekable stream"""
+    stream = file.stream
+    position = stream.tell()
+    size = stream.seek(0, os.SEEK_END)
+    stream.seek(position)
+    return size
+
+def submit_job(kind, items):
+    """Queue (id, fields, files) items as one job and return its id
+    
+    Uploads are saved under JOB_SPOOL_DIR, since the job may run in another
+    process after this request has ended; the payload records their paths.
+    """
+    job_id = secrets.token_urlsafe(16)
+    spool_dir = os.path.join(app.config['JOB_SPOOL_DIR'], job_id)
+    payload = []
+    for index, (item_id, fields, files) in enumerate(items):
+        entry = {'id': item_id}
+        if isinstance(fields, SubmissionError):
+            entry['error'] = str(fields)
         else:
-            alignment += "."
-        
-        # Life stage specific advice
-        if "Student" in life_stage:
-            alignment += " As a student, emphasize academic projects, internships, and relevant coursework."
-        elif "Recent Graduate" in life_stage:
-            alignment += " As a recent graduate, highlight your education, projects, and any internship experience."
-        elif "Career Transition" in life_stage:
-            alignment += " For your career transition, focus on transferable skills and any relevant training or experience."
-        
-        return alignment
-    
-    def _generate_resources(self, scores, career_track, life_stage):
-        """Generate targeted resource recommendations"""
-        resources = []
-        
-        # Score-based resources
-        if scores['impact'] < 15:
-            resources.append("Harvard Business Review's guide to quantifying achievements on your resume")
-        
-        if scores['clarity'] < 16:
-            resources.append("Resume formatting templates and best practices from industry professionals")
-        
-        # Career track specific resources
-        track_resources = {
-            "Technology & Software": "GitHub portfolio development and technical resume writing guides",
-            "Healthcare & Medicine": "Healthcare resume templates and medical terminology resources",
-            "Finance & Banking": "Financial services resume examples and industry certification guides",
-            "Marketing & Communications": "Marketing portfolio development and creative resume strategies",
-            "Education & Training": "Teaching resume templates and education sector job search resources",
-            "Public Service & Nonprofit": "Nonprofit resume writing and public service career development resources"
-        }
-        
-        if career_track in track_resources:
-            resources.append(track_resources[career_track])
-        
-        # Life stage specific resources
-        if "Student" in life_stage or "Graduate" in life_stage:
-            resources.append("Entry-level resume writing and new graduate job search strategies")
-        elif "Career Transition" in life_stage:
-            resources.append("Career change resume strategies and transferable skills identification")
-        
-        # General resources
-        resources.append("LinkedIn profile optimization to complement your resume")
-        resources.append("Industry-specific job boards and networking opportunities in your field")
-        
-        return resources[:5]  # Return top 5 resources
-
-# Initialize evaluator
-evaluator = ResumeEvaluator()
+            entry['fields'] = fields.to_dict() if hasattr(fields, 'to_dict') else fields
+        file = files.get('resume_file')
+        if file and file.filename:
+            os.makedirs(spool_dir, exist_ok=True)
+            path = os.path.join(spool_dir, str(index))
+            file.save(path)
+            entry['file'] = {'path': path, 'filename': file.filename}
+        payload.append(entry)
+    job_queue.submit(job_id, kind, {'items': payload})
+    metrics.inc('resume_jobs_submitted_total', (('kind', kind),))
+    job_workers.wake()
+    return job_id
+
+def open_job_item(entry):
+    """The (fields, files) of a queued item, with its spooled upload opened again"""
+    fields = entry['fields'] if 'fields' in entry else SubmissionError(entry['error'])
+    file = entry.get('file')
+    if file is None:
+        return fields, {}
+    return fields, {'resume_file': FileStorage(open(file['path'], 'rb'), filename=file['filename'])}
+
+def run_job(job):
+    """Evaluate a queued job for the worker pool, returning (result, stage timings)
+    
+    A single evaluation whose submission is invalid fails for good; in a
+    batch each bad item becomes an error entry, as in /api/v1/evaluate/batch.
+    Finished evaluations are stored like those of /evaluate, and the job's
+    result (or each batch item) carries the result_id of its /results page.
+    """
+    timings = StageTimings()
+    results = []
+    for index, entry in enumerate(job.payload['items']):
+        fields, files = open_job_item(entry)
+        try:
+            if job.kind == 'batch':
+                with timings.stage('evaluate'):
+                    results.append(evaluate_batch_item(index, entry['id'], fields, files, store=True))
+                continue
+            try:
+                if isinstance(fields, SubmissionError):
+                    raise fields
+                with timings.stage('upload'):
+                    user_inputs, resume_text = read_submission(fields, files, timings)
+            except SubmissionError as e:
+                raise JobError(str(e))
+            evaluator = current_evaluator()
+            result = get_evaluation(user_inputs, resume_text, timings, evaluator)
+            with timings.stage('store'):
+                result_id = store_evaluation(user_inputs, resume_text, result, timings, evaluator)
+            record_stages(timings)
+            return {'result_id': result_id, 'user_inputs': user_inputs, **result}, timings.stages
+        finally:
+            for file in files.values():
+                file.close()
+    return {'items': results}, timings.stages
+
+def remove_job_files(job_ids):
+    for job_id in job_ids:
+        shutil.rmtree(os.path.join(app.config['JOB_SPOOL_DIR'], job_id), ignore_errors=True)
+
+def finish_job(job, state, seconds):
+    """Record a job run in the metrics and drop its uploads once it will not run again"""
+    metrics.inc('resume_job_runs_total', (('kind', job.kind), ('state', state)))
+    metrics.observe('resume_job_wait_seconds', job.started_at - job.created_at, (('kind', job.kind),))
+    metrics.observe('resume_job_run_seconds', seconds, (('kind', job.kind),))
+    metrics.flush()
+    if state != 'queued':
+        remove_job_files([job.id])
+
+# Job threads start with the first request each process serves, never in a preloading master
+job_workers = JobWorkerPool(job_queue, run_job, app.config['JOB_WORKERS'], app.config['JOB_POLL_INTERVAL'],
+                            app.config['JOB_RETENTION'], finish_job, remove_job_files, app.logger)
+
+def job_links(job_id):
+    return {'status_url': url_for('api_job_status', job_id=job_id), 'result_url': url_for('job_page', job_id=job_id)}
+
+def job_accepted(job_id):
+    """202 response for a queued job, pointing at its status"""
+    response = json_response({'job_id': job_id, 'status': 'queued', **job_links(job_id)}, 202)
+    response.headers['Location'] = url_for('api_job_status', job_id=job_id)
+    return response
+
+@app.before_request
+def start_stage_timings():
+    g.timings = StageTimings()
+    job_workers.start()
+
+@app.after_request
+def record_request_metrics(response):
+    """Send the request's stage timings as Server-Timing and add them to the metrics"""
+    timings = g.timings
+    if timings.stages:
+        response.headers['Server-Timing'] = timings.server_timing()
+        record_stages(timings)
+    endpoint = request.endpoint or 'unknown'
+    metrics.inc('resume_http_requests_total',
+                (('endpoint', endpoint), ('method', request.method), ('status', response.status_code)))
+    metrics.observe('resume_http_request_duration_seconds', timings.elapsed(), (('endpoint', endpoint),))
+    metrics.flush()
+    return response
+
+@app.after_request
+def compress_response(response):
+    """gzip HTML responses for clients that accept it, and mark fingerprinted static files immutable"""
+    if request.endpoint == 'static':
+        filename = (request.view_args or {}).get('filename')
+        if request.args.get('v') and request.args['v'] == asset_fingerprints.get(filename):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = app.config['STATIC_MAX_AGE']
+            response.cache_control.immutable = True
+        return response
+    if (response.mimetype != 'text/html' or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or not request.accept_encodings['gzip']):
+        return response
+    data = response.get_data()
+    if len(data) < app.config['COMPRESS_MIN_BYTES']:
+        return response
+    with g.timings.stage('compress'):
+        response.set_data(gzip.compress(data, app.config['COMPRESS_LEVEL']))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
 
 @app.route('/', methods=['GET'])
 def index():
-    return render_template('index.html', 
-                         career_tracks=evaluator.career_tracks,
-                         life_stages=evaluator.life_stages,
-                         error=None,
-                         prev_data={})
+    """The form page, served from memory with an ETag once rendered for the current rubric"""
+    with g.timings.stage('render'):
+        etag, body, gzipped = render_index_page(current_evaluator())
+    if request.accept_encodings['gzip']:
+        response = app.response_class(gzipped, mimetype='text/html')
+        response.headers['Content-Encoding'] = 'gzip'
+        etag += '-gzip'
+    else:
+        response = app.response_class(body, mimetype='text/html')
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = True  # Revalidate with the ETag on every visit
+    response.set_etag(etag)
+    return response.make_conditional(request)
 
 @app.route('/evaluate', methods=['POST'])
 def evaluate():
-    # Get form data
-    career_track = request.form.get('career_track')
-    life_stage = request.form.get('life_stage')
-    dream_job = request.form.get('dream_job')
-    resume_text = request.form.get('resume_text', '')
-    
-    # Handle file upload
-    if 'resume_file' in request.files:
-        file = request.files['resume_file']
-        if file and file.filename:
-            try:
-                if file.filename.endswith('.txt'):
-                    resume_text = file.read().decode('utf-8')
-                elif file.filename.endswith('.pdf'):
-                    # For PDF files, you'd need to install PyPDF2 or similar
-                    # For now, we'll use the text area input
-                    pass
-            except Exception as e:
-                print(f"Error reading file: {e}")
-    
-    # Validation
-    if not career_track or not life_stage or not dream_job:
+    evaluator = current_evaluator()
+    try:
+        # A large PDF is evaluated in the background while the browser waits on the job page
+        file = request.files.get('resume_file')
+        if (file and file.filename.endswith('.pdf') and PDF_SUPPORT
+                and upload_size(file) >= app.config['ASYNC_PDF_MIN_BYTES']):
+            read_user_inputs(request.form)
+            with g.timings.stage('upload'):
+                job_id = submit_job('evaluate', [(None, request.form, request.files)])
+            return redirect(url_for('job_page', job_id=job_id), 303)
+        with g.timings.stage('upload'):
+            user_inputs, resume_text = read_submission(request.form, request.files, g.timings)
+    except SubmissionError as e:
         return render_template('index.html',
                              career_tracks=evaluator.career_tracks,
                              life_stages=evaluator.life_stages,
-                             error="Please fill in all required fields.",
+                             score_names=evaluator.rubric.score_names,
+                             error=str(e),
                              prev_data=request.form)
     
-    if not resume_text.strip():
-        return render_template('index.html',
-                             career_tracks=evaluator.career_tracks,
-                             life_stages=evaluator.life_stages,
-                             error="Please provide your resume text or upload a file.",
-                             prev_data=request.form)
+    result = get_evaluation(user_inputs, resume_text, g.timings, evaluator)
+    with g.timings.stage('store'):
+        result_id = store_evaluation(user_inputs, resume_text, result, g.timings, evaluator)
     
-    # Store user inputs
-    user_inputs = {
-        'career_track': career_track,
-        'life_stage': life_stage,
-        'dream_job': dream_job
-    }
-    
-    # Evaluate resume
-    evaluation = evaluator.evaluate_resume(resume_text, career_track, life_stage, dream_job)
-    
-    # Extract phrases and generate enhanced feedback
-    strength_quotes = evaluator.extract_good_phrases(resume_text)
-    growth_quotes = evaluator.extract_growth_phrases(resume_text)
-    personal_feedback = evaluator.generate_personal_feedback(user_inputs, evaluation, resume_text)
-    career_insights = evaluator.suggest_career_paths(user_inputs, resume_text)
-    
-    return render_template('result.html',
-                         evaluation=evaluation,
-                         user_inputs=user_inputs,
-                         rubric_descriptions=evaluator.rubric_descriptions,
-                         strength_quotes=strength_quotes,
-                         growth_quotes=growth_quotes,
-                         personal_feedback=personal_feedback,
-                         career_insights=career_insights)
+    with g.timings.stage('render'):
+        return render_template('result.html',
+                             user_inputs=user_inputs,
+                             rubric_descriptions=evaluator.rubric_descriptions,
+                             result_url=result_url_for(result_id),
+                             **result)
 
-if __name__ == '__main__':
-    app.run(debug=True)
+@app.route('/api/v1/evaluate', methods=['POST'])
+def api_evaluate():
+    """JSON version of /evaluate; accepts a JSON object or the same multipart form"""
+    if request.is_json:
+        fields = request.get_json(silent=True)
+        if not isinstance(fields, dict):
+            return json_response({'error': "Request body must be a JSON object."}, 400)
+        files = {}
+    else:
+        with g.timings.stage('upload'):
+            fields, files = request.form, request.files
+    
+    try:
+        with g.timings.stage('upload'):
+            user_inputs, resume_text = read_submission(fields, files, g.timings)
+    except SubmissionError as e:
+        return json_response({'error': str(e)}, 400)
+    
+    evaluator = current_evaluator()
+    result = get_evaluation(user_inputs, resume_text, g.timings, evaluator)
+    with g.timings.stage('store'):
+        result_id = store_evaluation(user_inputs, resume_text, result, g.timings, evaluator)
+    with g.timings.stage('serialize'):
+        return json_response({'result_id': result_id, 'result_url': result_url_for(result_id),
+                              'user_inputs': user_inputs, **result})
+
+@app.route('/results/<result_id>', methods=['GET'])
+def result_page(result_id):
+    """A stored evaluation rendered with result.html, without scoring it again
+    
+    Records never change, so the ETag only depends on the id, the rubric
+    whose descriptions are shown and the template; a revalidating browser
+    gets a 304 after one indexed read and no rendering. A result handed out
+    moments ago may still be in the write queue of the worker that computed
+    it, so a new id that is not found yet gets a page that refreshes itself.
+    """
+    with g.timings.stage('store'):
+        record = evaluation_writer.get(result_id)
+    if record is None:
+        issued = evaluation_id_time(result_id)
+        if issued is not None and 0 <= time.time() - issued < app.config['EVALUATION_SAVE_GRACE']:
+            response = app.response_class(render_template('job.html', job={'status': 'saving'}, refresh_seconds=1),
+                                          503, mimetype='text/html')
+            response.retry_after = 1
+            response.cache_control.no_store = True
+            return response
+        return render_template('job.html', job=None), 404
+    evaluator = current_evaluator()
+    etag = f'{result_id}-{evaluator.rubric.version}-{template_fingerprint("result.html")}'
+    gzipped = request.accept_encodings['gzip']
+    if gzipped:
+        etag += '-gzip'
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+    else:
+        with g.timings.stage('render'):
+            body = render_template('result.html',
+                                   user_inputs=record.user_inputs,
+                                   rubric_descriptions=evaluator.rubric_descriptions,
+                                   result_url=url_for('result_page', result_id=result_id),
+                                   **record.result).encode('utf-8')
+        if gzipped:
+            with g.timings.stage('compress'):
+                body = gzip.compress(body, app.config['COMPRESS_LEVEL'])
+        response = app.response_class(body, mimetype='text/html')
+        if gzipped:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = True  # Revalidate, since the rubric descriptions on the page may change
+    response.set_etag(etag)
+    return response
+
+@app.route('/api/v1/evaluate/incremental', methods=['POST'])
+def api_evaluate_incremental():
+    """Like /api/v1/evaluate, but only re-analyzes what changed since the session's last version
+    
+    Pass back the session_id of the previous response to continue a session.
+    The response adds the revision number, the change of each score since the
+    previous revision and how many lines were analyzed again.
+    """
+    if request.is_json:
+        fields = request.get_json(silent=True)
+        if not isinstance(fields, dict):
+            return json_response({'error': "Request body must be a JSON object."}, 400)
+        files = {}
+    else:
+        with g.timings.stage('upload'):
+            fields, files = request.form, request.files
+    
+    try:
+        with g.timings.stage('upload'):
+            user_inputs, resume_text = read_submission(fields, files, g.timings)
+    except SubmissionError as e:
+        return json_response({'error': str(e)}, 400)
+    
+    metrics.observe('resume_input_chars', len(resume_text))
+    session_id, session = get_session(fields.get('session_id'))
+    with session.lock:
+        result = session.evaluate(current_evaluator(), resume_text, user_inputs,
+                                  app.config['PHRASE_CPU_BUDGET'], g.timings)
+    evaluation_sessions.put(session_id, session)  # Restarts the session's time-to-live
+    with g.timings.stage('serialize'):
+        return json_response({'session_id': session_id, 'user_inputs': user_inputs, **result})
+
+@app.route('/api/v1/evaluate/live', methods=['POST'])
+def api_evaluate_live():
+    """Rubric scores only, updated from text patches while the user types
+    
+    The JSON body holds career_track, life_stage and dream_job, and either
+    the full resume text or the patches since the revision it names:
+    
+        {"session_id": "...", "revision": 7, "patches": [{"start": 10, "end": 12, "text": "ed"}], ...}
+    
+    Full text continues the session it names, if that still exists. Otherwise
+    the text is only scored, unless "start_session": true asks for a new
+    session to send patches against. Patch offsets count Unicode code points.
+    The response is just session_id (null without a session), revision,
+    scores and total_score. A 409 means the session is gone or has moved on
+    to another revision; send the full text again.
+    """
+    fields = request.get_json(silent=True)
+    if not isinstance(fields, dict):
+        return json_response({'error': "Request body must be a JSON object."}, 400)
+    user_inputs = {name: fields.get(name) or '' for name in ('career_track', 'life_stage', 'dream_job')}
+    if not all(isinstance(value, str) for value in user_inputs.values()):
+        return json_response({'error': "career_track, life_stage and dream_job must be strings."}, 400)
+    
+    with g.timings.stage('upload'):
+        if 'text' in fields:
+            resume_text = fields['text']
+            if not isinstance(resume_text, str):
+                return json_response({'error': "text must be a string."}, 400)
+            session_id, session = get_session(fields.get('session_id'), start=fields.get('start_session') is True)
+            if session is None:
+                session = EvaluationSession()  # Scored once and not kept
+            patches = None
+        else:
+            try:
+                patches = read_patches(fields.get('patches'))
+            except SubmissionError as e:
+                return json_response({'error': str(e)}, 400)
+            session_id = fields.get('session_id')
+            session = evaluation_sessions.get(session_id) if isinstance(session_id, str) else None
+            if session is None:
+                return json_response({'error': "Unknown session; send the full text."}, 409)
+    
+    with session.lock:
+        if patches is not None:
+            if fields.get('revision') != session.revision:
+                return json_response({'error': "Stale revision; send the full text.", 'session_id': session_id,
+                                      'revision': session.revision}, 409)
+            try:
+                resume_text = session.apply_patches(patches)
+            except ValueError as e:
+                return json_response({'error': str(e), 'session_id': session_id, 'revision': session.revision}, 409)
+        if len(resume_text) > app.config['LIVE_MAX_CHARS']:
+            return json_response({'error': f"Live scoring is limited to {app.config['LIVE_MAX_CHARS']} characters."}, 413)
+        result = session.scores(current_evaluator(), resume_text, user_inputs, g.timings)
+    if session_id is not None:
+        evaluation_sessions.put(session_id, session)
+    return json_response({'session_id': session_id, **result})
+
+@app.route('/api/v1/evaluate/batch', methods=['POST'])
+def api_evaluate_batch():
+    """Evaluate many resumes in one request, streaming NDJSON results as they finish"""
+    items = read_batch(request)
+    if len(items) > app.config['BATCH_MAX_ITEMS']:
+        return json_response({'error': f"A batch may contain at most {app.config['BATCH_MAX_ITEMS']} resumes."}, 413)
+    
+    return app.response_class(stream_with_context(stream_batch(items)), mimetype='application/x-ndjson')
+
+@app.route('/api/v1/jobs', methods=['POST'])
+def api_submit_job():
+    """Queue an evaluation and return its job id at once, with 202 and the status URL in Location
+    
+    Takes the same JSON object or multipart form as /api/v1/evaluate. The
+    fields are checked now; the resume itself is read when the job runs.
+    """
+    if request.is_json:
+        fields = request.get_json(silent=True)
+        if not isinstance(fields, dict):
+            return json_response({'error': "Request body must be a JSON object."}, 400)
+        files = {}
+    else:
+        fields, files = request.form, request.files
+    
+    try:
+        read_user_inputs(fields)
+        file = files.get('resume_file')
+        if not fields.get('resume_text') and not (file and file.filename):
+            raise SubmissionError("Please provide your resume text or upload a file.")
+    except SubmissionError as e:
+        return json_response({'error': str(e)}, 400)
+    
+    with g.timings.stage('upload'):
+        job_id = submit_job('evaluate', [(None, fields, files)])
+    return job_accepted(job_id)
+
+@app.route('/api/v1/jobs/batch', methods=['POST'])
+def api_submit_batch_job():
+    """Queue a batch in the formats of /api/v1/evaluate/batch; the finished job's result lists every item"""
+    items = read_batch(request)
+    if len(items) > app.config['BATCH_MAX_ITEMS']:
+        return json_response({'error': f"A batch may contain at most {app.config['BATCH_MAX_ITEMS']} resumes."}, 413)
+    
+    with g.timings.stage('upload'):
+        job_id = submit_job('batch', items)
+    return job_accepted(job_id)
 
+@app.route('/api/v1/jobs/<job_id>', methods=['GET'])
+def api_job_status(job_id):
+    """State, attempts and per-stage timing of a job, plus its result once done"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return json_response({'error': "Unknown or expired job."}, 404)
+    status = {**job, **job_links(job_id)}
+    result = job['result']
+    if job['status'] == 'done' and job['kind'] == 'evaluate' and result.get('result_id'):
+        # The stored result outlives the job, so point at it instead of the job page
+        status['result_id'] = result['result_id']
+        status['result_url'] = result_url_for(result['result_id'])
+    elif job['status'] == 'done' and job['kind'] == 'batch':
+        for item in result['items']:
+            if item.get('result_id'):
+                item['result_url'] = result_url_for(item['result_id'])
+    return json_response(status)
 
-# Save the complete updated app.py
-with open('complete_app.py', 'w') as f:
-    f.write(app_code)
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_page(job_id):
+    """The result page of a finished evaluation job, or a page that refreshes until it is done"""
+    job = job_queue.get(job_id)
+    if job is not None and job['status'] == 'done' and job['kind'] == 'evaluate':
+        result = dict(job['result'])
+        result_id = result.pop('result_id', None)
+        with g.timings.stage('render'):
+            return render_template('result.html',
+                                   rubric_descriptions=current_evaluator().rubric_descriptions,
+                                   result_url=result_url_for(result_id),
+                                   **result)
+    return render_template('job.html', job=job, refresh_seconds=2), 200 if job is not None else 404
 
-print("Complete updated app.py created successfully!")
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of the metrics of every worker process"""
+    return app.response_class(metrics.render(exported_gauges), mimetype='text/plain; version=0.0.4')
+
+if __name__ == '__main__':
+    app.run(debug=True)
@@ -0,0 +1,115 @@
+# numpy is optional; without it only the per-resume scorers are available
+try:
+    import numpy as np
+    NUMPY_SUPPORT = True
+except ImportError:
+    NUMPY_SUPPORT = False
+
+from keyword_matcher import tokenize
+
+
+class BatchScorer:
+    """Compute the five rubric scores for many analyzed resumes at once
+
+    Keyword hits of the whole batch are gathered into a sparse resumes x terms
+    count matrix (CSR index arrays), reduced to per-category distinct counts
+    with one bincount, and every score rule, bonus cap and base score of the
+    rubric is then applied as array arithmetic over the batch. The results
+    equal evaluate_resume()'s scores for the same documents.
+    """
+
+    def __init__(self, rubric):
+        if not NUMPY_SUPPORT:
+            raise RuntimeError("BatchScorer requires numpy")
+        self.rubric = rubric
+        matcher = rubric.matcher
+        self.categories = list(matcher.categories)
+        self._category_index = {category: i for i, category in enumerate(self.categories)}
+        terms = list(dict.fromkeys(kw for keywords in matcher.categories.values() for kw in keywords))
+        self._term_index = {term: i for i, term in enumerate(terms)}
+        # Categories of every term, padded with a spare column index: terms x max categories per term
+        term_categories = [[] for _ in terms]
+        for category, keywords in matcher.categories.items():
+            for keyword in keywords:
+                term_categories[self._term_index[keyword]].append(self._category_index[category])
+        width = max(map(len, term_categories), default=1)
+        self._term_categories = np.full((len(terms), width), len(self.categories), dtype=np.int64)
+        for term, category_ids in enumerate(term_categories):
+            self._term_categories[term, :len(category_ids)] = category_ids
+
+    def count_matrix(self, docs):
+        """CSR arrays (indptr, indices, data) of keyword counts per resume"""
+        indptr = [0]
+        indices = []
+        data = []
+        term_index = self._term_index.__getitem__
+        for doc in docs:
+            counts = doc.keyword_hits.counts
+            indices.extend(map(term_index, counts))
+            data.extend(counts.values())
+            indptr.append(len(indices))
+        return (np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int64),
+                np.asarray(data, dtype=np.int64))
+
+    def distinct_counts(self, indptr, indices):
+        """Distinct keywords found per resume and category: resumes x categories"""
+        # Every stored entry is a term with a nonzero count, so each one adds 1
+        # to every category of its term; one bincount over (resume, category)
+        # cells does the sparse product with the term-category membership.
+        n = len(indptr) - 1
+        width = len(self.categories) + 1
+        rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(indptr))
+        cells = rows[:, None] * width + self._term_categories[indices]
+        counts = np.bincount(cells.ravel(), minlength=n * width)
+        return counts.reshape(n, width)[:, :-1]
+
+    def features(self, docs, career_tracks, dream_jobs):
+        """Arrays of every rubric feature (see ResumeEvaluator.features) over the batch"""
+        n = len(docs)
+        indptr, indices, _ = self.count_matrix(docs)
+        distinct = self.distinct_counts(indptr, indices)
+        features = {'keywords:' + category: distinct[:, self._category_index[category]]
+                    for category in self.rubric.keywords}
+
+        # Track keywords: gather each resume's own track column, zero for unknown tracks
+        track_columns = np.fromiter(
+            (self._category_index['track:' + track] if track in self.rubric.track_keywords else -1
+             for track in career_tracks), dtype=np.int64, count=n)
+        track_distinct = distinct[np.arange(n), np.maximum(track_columns, 0)]
+        features['track_keywords'] = np.where(track_columns >= 0, track_distinct, 0)
+
+        dream_words = {dream_job: tokenize(dream_job) for dream_job in set(dream_jobs) if dream_job}
+        features['dream_job_words'] = np.fromiter(
+            (sum(1 for word in dream_words[dream_job] if word in doc.tokens) if dream_job else 0
+             for doc, dream_job in zip(docs, dream_jobs)), dtype=np.int64, count=n)
+        features['quantified'] = np.fromiter((doc.quantified_count for doc in docs), dtype=np.int64, count=n)
+        features['percentages'] = np.fromiter((doc.percent_count for doc in docs), dtype=np.int64, count=n)
+        features['metrics'] = np.fromiter((doc.has_metric for doc in docs), dtype=np.int64, count=n)
+        features['bullets'] = np.fromiter((doc.has_bullet_marker for doc in docs), dtype=np.int64, count=n)
+        features['email'] = np.fromiter((bool(doc.contact['email']) for doc in docs), dtype=np.int64, count=n)
+        features['phone'] = np.fromiter((bool(doc.contact['phone']) for doc in docs), dtype=np.int64, count=n)
+        return features
+
+    def score(self, docs, career_tracks, dream_jobs):
+        """Rubric scores for analyzed documents, as arrays keyed by score name
+
+        career_tracks and dream_jobs give one value per document. The result
+        also holds 'total_score'.
+        """
+        docs = list(docs)
+        features = self.features(docs, career_tracks, dream_jobs)
+        scores = {}
+        for name, (base, cap, rules) in self.rubric.score_specs.items():
+            score = np.full(len(docs), base)
+            for kind, feature, weight, rule_cap in rules:
+                if kind == 'count':
+                    points = features[feature] * weight
+                    score = score + (points if rule_cap is None else np.minimum(points, rule_cap))
+                else:
+                    present = np.zeros(len(docs), dtype=bool)
+                    for part in feature:
+                        present |= features[part] > 0
+                    score = score + weight * present
+            scores[name] = np.minimum(score, cap)
+        scores['total_score'] = sum(scores[name] for name in self.rubric.score_names)
+        return scores
@@ -0,0 +1,97 @@
+"""Adversarial inputs for the resume analysis pipeline
+
+Every case is a pathological paste of a few hundred KB aimed at regex
+backtracking or per-match rescans. The run times each case at two sizes and
+fails if any case takes longer than the time limit or grows faster than
+linearly with input size. Phrase extraction is also timed under the
+per-request CPU budget, which must cut it off close to the budget.
+
+    python benchmarks/adversarial.py [--size 300000] [--limit 2.0]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, evaluator  # noqa: E402
+from evaluator import CPUBudget  # noqa: E402
+
+
+def _repeat(unit, size):
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+# name -> function(size) returning a resume of roughly that many characters
+CORPUS = {
+    'digit_run': lambda size: 'Increased ' + '1' * size,
+    'digit_run_percent_word': lambda size: 'Improved ' + '9' * size + ' percen',
+    'dollar_run': lambda size: 'Managed $' + _repeat('1,', size),
+    'verbs_without_numbers': lambda size: _repeat('increased reduced achieved improved managed generated saved led ', size),
+    'verbs_before_late_number': lambda size: _repeat('increased ', size) + '50%',
+    'led_without_team': lambda size: _repeat('led 5 ', size),
+    'blank_lines': lambda size: 'Developed\n' + '\n' * size + 'x',
+    'whitespace_line': lambda size: '-' + ' ' * size + 'x',
+    'bullet_flood': lambda size: _repeat('- • * ', size),
+    'bullet_verb_flood': lambda size: _repeat('- Developed ', size),
+    'weak_phrase_flood': lambda size: _repeat('responsible for helped with ', size),
+    'no_sentence_breaks': lambda size: _repeat('word ', size),
+    'sentence_per_char': lambda size: _repeat('a.', size),
+    'decimal_flood': lambda size: _repeat('3.5', size),
+    'phone_digits': lambda size: _repeat('(555) 55', size),
+}
+
+
+def run_case(text):
+    """Time the full analysis pipeline for one input, without a phrase budget"""
+    start = time.perf_counter()
+    doc = evaluator.analyze(text)
+    evaluator.evaluate_resume(doc, 'Technology & Software', 'Career Transition', 'software engineer')
+    evaluator.extract_good_phrases(doc)
+    evaluator.extract_growth_phrases(doc)
+    return time.perf_counter() - start
+
+
+def run_budgeted_phrases(text, seconds):
+    """Time phrase extraction under a request's CPU budget"""
+    doc = evaluator.analyze(text)
+    budget = CPUBudget(seconds)
+    start = time.perf_counter()
+    evaluator.extract_good_phrases(doc, budget)
+    evaluator.extract_growth_phrases(doc, budget)
+    return time.perf_counter() - start, budget.exhausted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=300_000, help='characters per input (default: 300000)')
+    parser.add_argument('--limit', type=float, default=2.0, help='seconds allowed per input (default: 2.0)')
+    parser.add_argument('--max-growth', type=float, default=3.0,
+                        help='allowed slowdown over linear between --size/4 and --size inputs (default: 3.0)')
+    parser.add_argument('--budget', type=float, default=app.config['PHRASE_CPU_BUDGET'],
+                        help='phrase extraction CPU budget in seconds (default: PHRASE_CPU_BUDGET)')
+    args = parser.parse_args(argv)
+
+    failures = []
+    for name, make in CORPUS.items():
+        small = run_case(make(args.size // 4))
+        large = run_case(make(args.size))
+        growth = large / max(small, 1e-3)
+        budgeted, exhausted = run_budgeted_phrases(make(args.size), args.budget)
+        # Sub-50ms timings are too noisy for the growth ratio to mean anything
+        ok = (large <= args.limit and (large < 0.05 or growth <= 4.0 * args.max_growth)
+              and budgeted <= args.budget * 1.5 + 0.05)
+        print(f"{'ok  ' if ok else 'FAIL'} {name:26s} {large * 1000:9.1f} ms  (x{growth:.1f} for 4x input)"
+              f"  phrases {budgeted * 1000:7.1f} ms{' (budget hit)' if exhausted else ''}")
+        if not ok:
+            failures.append(name)
+
+    if failures:
+        print(f"{len(failures)} adversarial input(s) exceeded the bound: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""Seeded synthetic resumes and PDF fixtures for the benchmark suite
+
+Resumes are built from the same vocabulary the rubric scores (track keywords,
+strong verbs, metrics, weak phrases, sections), shaped by the life stage and
+padded with further roles and projects until they fill the requested number
+of pages. The same seed always produces the same corpus.
+
+    python benchmarks/corpus.py --out fixtures/  # write .txt and .pdf fixtures
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluator import ResumeEvaluator  # noqa: E402
+
+LINES_PER_PAGE = 48
+CHARS_PER_LINE = 90
+
+_EVALUATOR = ResumeEvaluator()
+CAREER_TRACKS = _EVALUATOR.career_tracks
+LIFE_STAGES = _EVALUATOR.life_stages
+
+FIRST_NAMES = ['Alex', 'Jordan', 'Sam', 'Taylor', 'Morgan', 'Riley', 'Casey', 'Jamie']
+LAST_NAMES = ['Rivera', 'Chen', 'Okafor', 'Novak', 'Haddad', 'Lindqvist', 'Tanaka', 'Moreau']
+ORGANIZATIONS = ['Northwind', 'Contoso', 'Fabrikam', 'Globex', 'Initech', 'Umbrella Health', 'Acme Labs',
+                 'City Library', 'Riverside School District', 'Harbor Credit Union']
+VERBS = ['Developed', 'Created', 'Implemented', 'Led', 'Managed', 'Designed', 'Built', 'Launched',
+         'Optimized', 'Streamlined', 'Coordinated', 'Supported', 'Organized']
+GENERIC_TERMS = ['stakeholders', 'reporting', 'process', 'documentation', 'customer feedback',
+                 'onboarding', 'scheduling', 'vendors', 'quality checks', 'workflows']
+WEAK_OPENERS = ['Responsible for', 'Helped with', 'Assisted in', 'Worked on', 'Involved in']
+METRICS = ['increased {term} adoption by {n}%', 'reduced {term} turnaround by {n} percent',
+           'managed a ${k},000 budget for {term}', 'led {s} people across {term}',
+           'generated ${k},000 in new revenue through {term}', 'improved {term} accuracy by {n}%',
+           'saved ${k},500 a year on {term}', 'achieved {n}% on-time delivery for {term}']
+SCHOOLS = ['State University', 'Community College', 'Institute of Technology', 'Central High School']
+DEGREES = ['B.S.', 'B.A.', 'A.A.', 'M.S.', 'Diploma']
+
+# Life stage -> (share of bullets with a metric, share with weak phrasing, roles per page)
+STAGE_PROFILE = {
+    "High School Student (16-18)": (0.15, 0.45, 1),
+    "College Student (18-22)": (0.25, 0.35, 2),
+    "Recent Graduate (22-25)": (0.35, 0.25, 2),
+    "Early Career (25-30)": (0.5, 0.15, 3),
+    "Career Transition": (0.45, 0.2, 3),
+    "Returning to Workforce": (0.35, 0.3, 2),
+}
+
+
+def _terms(track):
+    return _EVALUATOR.rubric.track_keywords.get(track, []) + GENERIC_TERMS
+
+
+def _bullet(rng, track, life_stage):
+    metric_share, weak_share, _ = STAGE_PROFILE[life_stage]
+    term = rng.choice(_terms(track))
+    roll = rng.random()
+    if roll < metric_share:
+        metric = rng.choice(METRICS).format(term=term, n=rng.randint(5, 60), k=rng.randint(5, 900),
+                                            s=rng.randint(2, 25))
+        line = f"{rng.choice(VERBS)} {rng.choice(_terms(track))} work and {metric}."
+    elif roll < metric_share + weak_share:
+        line = f"{rng.choice(WEAK_OPENERS)} {term} and {rng.choice(_terms(track))} for the {rng.choice(GENERIC_TERMS)} team."
+    else:
+        line = f"{rng.choice(VERBS)} {term} for {rng.choice(ORGANIZATIONS)} using {rng.choice(_terms(track))}."
+    return rng.choice(['• ', '- ', '* ']) + line
+
+
+def make_resume(rng, pages, track, life_stage):
+    """Return (text, page_lines): a resume of about `pages` pages for the track and stage
+
+    page_lines splits the same lines into pages for PDF fixtures.
+    """
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    lines = [name, f"{name.split()[0].lower()}@example.com | ({rng.randint(200, 989)}) 555-{rng.randint(1000, 9999)}", '',
+             'SUMMARY',
+             f"{life_stage} pursuing {track.lower()} roles, with hands-on {rng.choice(_terms(track))} and "
+             f"{rng.choice(_terms(track))} experience.", '']
+    _, _, roles_per_page = STAGE_PROFILE[life_stage]
+
+    lines.append('EXPERIENCE')
+    target = pages * LINES_PER_PAGE - 16
+    year = 2024
+    while len(lines) < target:
+        for _ in range(roles_per_page):
+            lines.append(f"{rng.choice(['Analyst', 'Coordinator', 'Associate', 'Specialist', 'Intern', 'Lead'])}, "
+                         f"{rng.choice(ORGANIZATIONS)} ({year - 2}-{year})")
+            lines.extend(_bullet(rng, track, life_stage) for _ in range(rng.randint(3, 6)))
+            lines.append('')
+            year -= 2
+        lines.append('PROJECTS')
+        lines.extend(_bullet(rng, track, life_stage) for _ in range(2))
+        lines.append('')
+    del lines[target:]
+
+    lines += ['EDUCATION',
+              f"{rng.choice(DEGREES)}, {rng.choice(SCHOOLS)} - {rng.choice(_terms(track)).title()} focus", '',
+              'SKILLS', ', '.join(rng.sample(_terms(track), min(6, len(_terms(track))))), '',
+              'AWARDS & COMMUNITY',
+              f"- {rng.choice(['Dean’s list honor', 'Employee recognition award', 'Certified first aid license'])}",
+              f"- Volunteer, {rng.choice(ORGANIZATIONS)} community outreach"]
+    lines = [line[:CHARS_PER_LINE] for line in lines]
+    page_lines = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)]
+    return '\n'.join(lines), page_lines
+
+
+def make_pdf(page_lines):
+    """Encode pages of text lines as a minimal one-font PDF that PyPDF2 can read"""
+    def escape(line):
+        line = line.encode('latin-1', 'replace').decode('latin-1')
+        return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None,
+               '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>']
+    kids = []
+    for lines in page_lines:
+        content = 'BT /F1 10 Tf 54 750 Td 14 TL ' + ' '.join(f"({escape(line)}) '" for line in lines) + ' ET'
+        objects.append(f'<< /Length {len(content.encode("latin-1"))} >>\nstream\n{content}\nendstream')
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R '
+                       '/Resources << /Font << /F1 3 0 R >> >> >>')
+        kids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] /Count {len(kids)} >>"
+
+    out = '%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out.encode('latin-1')))
+        out += f'{number} 0 obj\n{body}\nendobj\n'
+    xref = len(out.encode('latin-1'))
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n' + ''.join(f'{offset:010d} 00000 n \n' for offset in offsets)
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'
+    return out.encode('latin-1')
+
+
+def make_pasted_text(rng, chars):
+    """About chars characters of resumes as pasted from Word or a PDF viewer
+
+    The text has CRLF line breaks, smart quotes and dashes, ligatures,
+    no-break spaces, private-use bullets and runs of blank lines, which are
+    the artifacts normalize_text() folds.
+    """
+    parts = []
+    size = 0
+    while size < chars:
+        text, _ = make_resume(rng, 5, rng.choice(CAREER_TRACKS), rng.choice(LIFE_STAGES))
+        text = (text.replace("'", '\u2019').replace(' - ', ' \u2013 ').replace('- ', '\uf0b7\t')
+                .replace('fi', '\ufb01').replace(', ', ',\u00a0 ').replace('\n', '\r\n'))
+        parts.append(text)
+        size += len(text) + 6
+    return '\r\n\r\n\r\n'.join(parts)[:chars]
+
+
+def build_corpus(sizes, per_size=4, seed=0):
+    """Yield (pages, track, life_stage, text, page_lines), cycling through tracks and stages"""
+    rng = random.Random(seed)
+    index = 0
+    for pages in sizes:
+        for _ in range(per_size):
+            track = CAREER_TRACKS[index % len(CAREER_TRACKS)]
+            life_stage = LIFE_STAGES[index % len(LIFE_STAGES)]
+            index += 1
+            text, page_lines = make_resume(rng, pages, track, life_stage)
+            yield pages, track, life_stage, text, page_lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', required=True, help='directory to write the fixtures to')
+    parser.add_argument('--sizes', default='1,5,20,50', help='comma-separated page counts (default: 1,5,20,50)')
+    parser.add_argument('--per-size', type=int, default=4, help='resumes per page count (default: 4)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    sizes = [int(size) for size in args.sizes.split(',')]
+    for number, (pages, _, _, text, page_lines) in enumerate(build_corpus(sizes, args.per_size, args.seed)):
+        stem = os.path.join(args.out, f'resume-{pages:02d}p-{number:03d}')
+        with open(stem + '.txt', 'w', encoding='utf-8') as f:
+            f.write(text)
+        with open(stem + '.pdf', 'wb') as f:
+            f.write(make_pdf(page_lines))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
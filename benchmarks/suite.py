@@ -0,0 +1,204 @@
+"""Per-stage timings over a synthetic corpus, with a JSON history and regression gate
+
+Times each stage of an evaluation separately for resumes of 1 to 50 pages
+across every career track and life stage:
+
+    analyze          building the ResumeDocument (tokens, keyword hits, sentences)
+    evaluate_resume  rubric scores and feedback on the analyzed document
+    good_phrases     extract_good_phrases
+    growth_phrases   extract_growth_phrases
+    pdf_extract      extract_pdf_text on the matching PDF fixture, uncapped
+    render_result    rendering result.html
+    normalize        normalize_text on 1 MB of plain ASCII text and of text
+                     pasted from Word or a PDF (keys normalize@ascii, normalize@pasted)
+
+Every run is appended to the history file. A stage fails the run when its
+median is more than --threshold slower than the median of the last
+--baseline-runs passing runs (and by more than --min-delta-ms).
+
+    python benchmarks/suite.py [--sizes 1,5,20,50] [--threshold 0.25]
+
+Timings only compare on the same machine, so the history is not committed
+(benchmarks/history.json is git-ignored). Record a baseline on the machine
+that runs the gate first, from the commit to compare against:
+
+    python benchmarks/suite.py --repeat 5
+
+Without a baseline for the chosen settings the run only warns, and it becomes
+the baseline; --require-baseline makes it fail instead, e.g. in CI.
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import app, evaluator  # noqa: E402
+from benchmarks.corpus import build_corpus, make_pasted_text, make_pdf  # noqa: E402
+from flask import render_template  # noqa: E402
+from pdf_text import extract_pdf_text, PDF_SUPPORT  # noqa: E402
+from text_normalize import normalize_text  # noqa: E402
+
+STAGES = ['analyze', 'evaluate_resume', 'good_phrases', 'growth_phrases', 'pdf_extract', 'render_result']
+NORMALIZE_CHARS = 1024 * 1024
+DEFAULT_HISTORY = os.path.join(ROOT, 'benchmarks', 'history.json')
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def time_resume(text, page_lines, track, life_stage):
+    """Seconds spent in each stage for one resume"""
+    user_inputs = {'career_track': track, 'life_stage': life_stage, 'dream_job': 'senior analyst'}
+    timings = {}
+    timings['analyze'], doc = _timed(evaluator.analyze, text)
+    timings['evaluate_resume'], evaluation = _timed(evaluator.evaluate_resume, doc, track, life_stage,
+                                                    user_inputs['dream_job'])
+    timings['good_phrases'], strength_quotes = _timed(evaluator.extract_good_phrases, doc)
+    timings['growth_phrases'], growth_quotes = _timed(evaluator.extract_growth_phrases, doc)
+    if PDF_SUPPORT:
+        timings['pdf_extract'], _ = _timed(extract_pdf_text, io.BytesIO(make_pdf(page_lines)))
+
+    context = {
+        'evaluation': evaluation,
+        'strength_quotes': strength_quotes,
+        'growth_quotes': growth_quotes,
+        'personal_feedback': evaluator.generate_personal_feedback(user_inputs, evaluation, doc),
+        'career_insights': evaluator.suggest_career_paths(user_inputs, doc),
+    }
+    with app.test_request_context():
+        timings['render_result'], _ = _timed(render_template, 'result.html', user_inputs=user_inputs,
+                                             rubric_descriptions=evaluator.rubric_descriptions, **context)
+    return timings
+
+
+def run_suite(sizes, per_size, repeat, seed):
+    """Median milliseconds per stage and page count, keyed 'stage@Np', plus the normalize stage"""
+    samples = {}
+    for pages, track, life_stage, text, page_lines in build_corpus(sizes, per_size, seed):
+        for _ in range(repeat):
+            for stage, seconds in time_resume(text, page_lines, track, life_stage).items():
+                samples.setdefault(f'{stage}@{pages}p', []).append(seconds * 1000)
+
+    pasted = make_pasted_text(random.Random(seed), NORMALIZE_CHARS)
+    texts = {'ascii': normalize_text(pasted).encode('ascii', 'ignore').decode('ascii'), 'pasted': pasted}
+    for _ in range(repeat):
+        for name, text in texts.items():
+            samples.setdefault(f'normalize@{name}', []).append(_timed(normalize_text, text)[0] * 1000)
+    return {key: round(statistics.median(values), 3) for key, values in samples.items()}
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=1)
+        f.write('\n')
+    os.replace(tmp_path, path)
+
+
+def baseline_results(history, settings, baseline_runs):
+    """Results of the last baseline_runs passing runs with the same corpus settings"""
+    return [run['results'] for run in history
+            if run.get('passed', True) and run.get('settings') == settings][-baseline_runs:]
+
+
+def find_regressions(results, previous, threshold, min_delta_ms):
+    """Return (key, baseline_ms, current_ms) for every stage slower than allowed by the previous runs"""
+    regressions = []
+    for key, current in sorted(results.items()):
+        values = [run[key] for run in previous if key in run]
+        if not values:
+            continue
+        baseline = statistics.median(values)
+        if current > baseline * (1 + threshold) and current - baseline > min_delta_ms:
+            regressions.append((key, baseline, current))
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1,5,20,50', help='comma-separated page counts (default: 1,5,20,50)')
+    parser.add_argument('--per-size', type=int, default=6,
+                        help='resumes per page count, cycling tracks and life stages (default: 6)')
+    parser.add_argument('--repeat', type=int, default=3, help='timings per resume (default: 3)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON history file (default: benchmarks/history.json)')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown over the baseline median, as a fraction (default: 0.25)')
+    parser.add_argument('--baseline-runs', type=int, default=5,
+                        help='passing runs the baseline is taken from (default: 5)')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='ignore slowdowns smaller than this many milliseconds (default: 1.0)')
+    parser.add_argument('--no-record', action='store_true', help='do not append this run to the history')
+    parser.add_argument('--require-baseline', action='store_true',
+                        help='fail when the history has no passing run with these settings')
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = run_suite(sizes, args.per_size, args.repeat, args.seed)
+    settings = {'sizes': sizes, 'per_size': args.per_size, 'repeat': args.repeat, 'seed': args.seed}
+    history = load_history(args.history)
+    previous = baseline_results(history, settings, args.baseline_runs)
+    regressions = find_regressions(results, previous, args.threshold, args.min_delta_ms)
+    slow = {key for key, _, _ in regressions}
+
+    print(f"{'stage':16s}" + ''.join(f'{pages:>10d}p' for pages in sizes))
+    for stage in STAGES:
+        cells = []
+        for pages in sizes:
+            key = f'{stage}@{pages}p'
+            cells.append(f"{results[key]:10.2f}{'!' if key in slow else ' '}" if key in results else f"{'-':>10s} ")
+        print(f'{stage:16s}' + ''.join(cells))
+    for key in ('normalize@ascii', 'normalize@pasted'):
+        print(f"{key:16s}{results[key]:10.2f}{'!' if key in slow else ' '} (1 MB)")
+    print('(median ms; ! marks a regression)')
+
+    for key, baseline, current in regressions:
+        print(f"REGRESSION {key}: {current:.2f} ms vs baseline {baseline:.2f} ms (+{current / baseline - 1:.0%})")
+    if not previous:
+        print(f"{'ERROR' if args.require_baseline else 'WARNING'}: {args.history} has no passing run with these "
+              f"settings, so nothing was compared", file=sys.stderr)
+
+    if not args.no_record:
+        history.append({
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'machine': platform.node(),
+            'settings': settings,
+            'passed': not regressions,
+            'results': results,
+        })
+        save_history(args.history, history)
+    return 1 if regressions or (args.require_baseline and not previous) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""Check the NumPy batch scorer against evaluate_resume and time both
+
+Builds a seeded reference corpus of synthetic resumes (every rubric keyword
+list, contact details, bullets, quantified results, known and unknown career
+tracks, empty dream jobs), scores it with ResumeEvaluator one resume at a
+time and with BatchScorer in one call, and fails if any score differs. A
+second pass repeats the check with a fractional copy of rubric.json, also
+through bulk_evaluate's chunk scoring.
+
+    python benchmarks/verify_batch_scoring.py [--count 5000] [--seed 0]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bulk_evaluate  # noqa: E402
+from batch_scoring import BatchScorer, NUMPY_SUPPORT  # noqa: E402
+from evaluator import evaluate_resume_text, ResumeEvaluator  # noqa: E402
+from rubric import DEFAULT_RUBRIC_PATH, Rubric  # noqa: E402
+
+EXTRA_TRACKS = ['Creative Arts', 'Skilled Trades', '']
+DREAM_JOBS = ['software engineer', 'data analyst', 'nurse', 'teacher', 'marketing manager', '', '!!!']
+FILLER = ['worked closely with', 'the', 'quarterly', 'results', 'across', 'teams', 'called', 'ledger']
+
+
+def make_resume(rng, rubric):
+    """One synthetic resume drawing a random mix of rubric and track keywords"""
+    pools = list(rubric.keywords.values()) + list(rubric.track_keywords.values())
+    lines = []
+    if rng.random() < 0.6:
+        lines.append('jane.doe@example.com')
+    if rng.random() < 0.5:
+        lines.append(rng.choice(['(555) 123-4567', 'Phone: +1 555', 'tel available on request']))
+    for _ in range(rng.randint(0, 25)):
+        words = [rng.choice(rng.choice(pools)) for _ in range(rng.randint(1, 4))]
+        words += rng.sample(FILLER, rng.randint(0, 3))
+        if rng.random() < 0.3:
+            words.append(rng.choice(['by 15%', '30 percent', '$12,000', '8 people', '4 clients']))
+        rng.shuffle(words)
+        line = ' '.join(words)
+        if rng.random() < 0.3:
+            line = rng.choice(['• ', '- ', '* ']) + line
+        lines.append(line.capitalize() if rng.random() < 0.5 else line.upper())
+    return '\n'.join(lines)
+
+
+def fractional_rubric_data():
+    """rubric.json with a fractional part added to every base, cap, weight and points"""
+    with open(DEFAULT_RUBRIC_PATH, encoding='utf-8') as f:
+        data = json.load(f)
+    for spec in data['scores'].values():
+        spec['base'] += 0.5
+        spec['cap'] += 0.25
+        for rule in spec['rules']:
+            for key in ('weight', 'cap', 'points'):
+                if rule.get(key) is not None:
+                    rule[key] += 0.3
+    return data
+
+
+def compare(evaluator, scorer, corpus, label):
+    """Score the corpus both ways and return the number of differing scores and the timings"""
+    start = time.perf_counter()
+    docs = [evaluator.analyze(text) for text, _, _ in corpus]
+    analyze_time = time.perf_counter() - start
+
+    # The rubric scores exactly as evaluate_resume computes them
+    start = time.perf_counter()
+    expected = [evaluator.score(evaluator.features(doc, track, dream_job))
+                for doc, (_, track, dream_job) in zip(docs, corpus)]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = scorer.score(docs, [track for _, track, _ in corpus], [dream for _, _, dream in corpus])
+    batch_time = time.perf_counter() - start
+
+    mismatches = 0
+    for i, scores in enumerate(expected):
+        for name in evaluator.rubric.score_names:
+            if batch[name][i] != scores[name]:
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"{label} resume {i}: {name} {batch[name][i]} != {scores[name]}")
+        if batch['total_score'][i] != sum(scores.values()):
+            mismatches += 1
+
+    # Spot-check the full public path on a sample
+    for i in range(0, len(corpus), max(len(corpus) // 50, 1)):
+        text, track, dream_job = corpus[i]
+        result = evaluator.evaluate_resume(text, track, 'Career Transition', dream_job)
+        if result['total_score'] != batch['total_score'][i]:
+            mismatches += 1
+            print(f"{label} resume {i}: evaluate_resume total {result['total_score']} != {batch['total_score'][i]}")
+    return mismatches, analyze_time, loop_time, batch_time
+
+
+def compare_bulk(rubric_path, corpus, label):
+    """Run a sample of the corpus through bulk_evaluate's chunk scoring and compare it with evaluate_resume_text"""
+    bulk_evaluate._init_worker(rubric_path, True)
+    evaluator = bulk_evaluate._worker_evaluator
+    mismatches = 0
+    for track in evaluator.career_tracks:
+        user_inputs = {'career_track': track, 'life_stage': 'Career Transition', 'dream_job': 'data analyst'}
+        sample = corpus[:100]
+        entries = [(f'{i}.txt', None, text.encode('utf-8')) for i, (text, _, _) in enumerate(sample)]
+        records = bulk_evaluate.evaluate_chunk(entries, user_inputs, 1 << 20, 10, 1 << 20)
+        for i, ((text, _, _), record) in enumerate(zip(sample, records)):
+            if 'error' in record:
+                continue
+            expected = evaluate_resume_text(evaluator, text, user_inputs)['evaluation']
+            if record['evaluation'] != expected:
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"{label} bulk resume {i} ({track}): "
+                          f"{record['evaluation']['scores']} != {expected['scores']}")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=5000, help="resumes in the reference corpus")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if not NUMPY_SUPPORT:
+        print("numpy is not installed")
+        return 1
+
+    evaluator = ResumeEvaluator()
+    rng = random.Random(args.seed)
+    tracks = evaluator.career_tracks + EXTRA_TRACKS
+    corpus = [(make_resume(rng, evaluator.rubric), rng.choice(tracks), rng.choice(DREAM_JOBS))
+              for _ in range(args.count)]
+    mismatches, analyze_time, loop_time, batch_time = compare(evaluator, BatchScorer(evaluator.rubric), corpus,
+                                                              'rubric.json')
+    print(f"{args.count} resumes: analyze {analyze_time * 1000:.1f} ms, "
+          f"per-resume scorers {loop_time * 1000:.1f} ms, batch scorer {batch_time * 1000:.1f} ms "
+          f"(x{loop_time / batch_time:.1f})")
+
+    # Non-integer base, cap, weight and points must survive both paths unrounded
+    data = fractional_rubric_data()
+    fractional = ResumeEvaluator(Rubric(data, 'fractional rubric'))
+    mismatches += compare(fractional, BatchScorer(fractional.rubric), corpus, 'fractional')[0]
+    with tempfile.TemporaryDirectory() as tmp:
+        rubric_path = os.path.join(tmp, 'rubric.json')
+        with open(rubric_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        mismatches += compare_bulk(rubric_path, corpus, 'fractional')
+
+    if mismatches:
+        print(f"FAIL: {mismatches} scores differ")
+        return 1
+    print("ok: batch scores match evaluate_resume")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
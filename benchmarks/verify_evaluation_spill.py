@@ -0,0 +1,120 @@
+"""Check the spill files and the background thread of EvaluationWriter
+
+- A spilled record is found through the spill index; a record that is in a
+  spill file but not in its index is not, since lookups never scan files.
+- Two writers replaying the spill file of a dead process at the same time
+  write each record once.
+- A batch whose write raises something other than sqlite3.Error is spilled
+  and the thread goes on to write later records.
+
+    python benchmarks/verify_evaluation_spill.py
+"""
+import json
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluation_store import EvaluationStore, EvaluationWriter, StoredEvaluation, new_evaluation_id  # noqa: E402
+
+
+class FlakyStore(EvaluationStore):
+    """EvaluationStore whose next few writes fail, and whose other writes are slow"""
+
+    failures = 0
+
+    def put_many(self, records):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("store is having a bad day")
+        time.sleep(0.01)  # Gives a competing replay the chance to overlap
+        super().put_many(records)
+
+
+def make_record(number):
+    return StoredEvaluation(new_evaluation_id(), f'hash-{number}', 'v1', {'career_track': 'x'},
+                            {'evaluation': {'total_score': number}}, {'score': 0.001})
+
+
+def replay_orphans(store_path, spill_dir, barrier, written):
+    """Replay the orphaned spill files in a process of its own, as a starting gunicorn worker does"""
+    writer = EvaluationWriter(FlakyStore(store_path), batch_size=5, spill_dir=spill_dir)
+    barrier.wait()
+    writer._replay(orphaned=True)
+    written.put(writer.written)
+
+
+def main():
+    logging.basicConfig(level=logging.CRITICAL)
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        spill_dir = os.path.join(tmp, 'spill')
+
+        # Lookups go through the index
+        store = FlakyStore(os.path.join(tmp, 'lookup.sqlite3'))
+        writer = EvaluationWriter(store, spill_dir=spill_dir)
+        spilled = [make_record(n) for n in range(50)]
+        writer._spill(spilled)
+        unindexed = make_record(99)
+        with open(os.path.join(spill_dir, '1-1.jsonl'), 'w', encoding='utf-8') as f:
+            f.write(json.dumps(asdict(unindexed)) + '\n')
+        if not all(writer.get(record.id) == record for record in spilled):
+            failures += 1
+            print("a spilled record was not found through the index")
+        if writer.get(unindexed.id) is not None or writer.get(new_evaluation_id()) is not None:
+            failures += 1
+            print("a lookup read a spill file its index does not point into")
+        os.unlink(os.path.join(spill_dir, '1-1.jsonl'))
+        os.rename(os.path.join(spill_dir, f'{os.getpid()}.jsonl'), os.path.join(spill_dir, 'orphan.jsonl'))
+        os.rename(os.path.join(spill_dir, f'{os.getpid()}.idx'), os.path.join(spill_dir, 'orphan.idx'))
+
+        # The spill file of a dead process is replayed by exactly one of two writers
+        dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+        dead.wait()
+        for extension in ('.jsonl', '.idx'):
+            os.rename(os.path.join(spill_dir, 'orphan' + extension),
+                      os.path.join(spill_dir, f'{dead.pid}{extension}'))
+        context = multiprocessing.get_context('spawn')
+        barrier, written = context.Barrier(2), context.Queue()
+        replays = [context.Process(target=replay_orphans, args=(os.path.join(tmp, 'replay.sqlite3'), spill_dir,
+                                                                 barrier, written))
+                   for _ in range(2)]
+        for replay in replays:
+            replay.start()
+        total = written.get(timeout=60) + written.get(timeout=60)
+        for replay in replays:
+            replay.join()
+        if total != len(spilled) or os.listdir(spill_dir):
+            failures += 1
+            print(f"replaying {len(spilled)} orphaned records wrote {total}, left {os.listdir(spill_dir)}")
+
+        # An unexpected error in a batch write does not stop the thread
+        store = FlakyStore(os.path.join(tmp, 'errors.sqlite3'))
+        store.failures = 1
+        writer = EvaluationWriter(store, spill_dir=spill_dir, flush_interval=0.01)
+        records = [make_record(n) for n in range(20)]
+        writer.put(records[0])
+        time.sleep(0.2)
+        for record in records[1:]:
+            writer.put(record)
+        writer.close()
+        missing = [record.id for record in records if store.get(record.id) is None]
+        if missing or not writer._thread or writer._thread.is_alive():
+            failures += 1
+            print(f"{len(missing)} records not written after a failed batch")
+
+    if failures:
+        print(f"FAIL: {failures} checks failed")
+        return 1
+    print("ok: spilled records are indexed, claimed once and written despite errors")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
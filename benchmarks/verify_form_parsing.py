@@ -0,0 +1,102 @@
+"""Check the streaming form parser against Werkzeug's own form parsing
+
+Parses URL-encoded bodies (escapes split across chunk boundaries, invalid
+UTF-8 in escapes, blank and repeated fields) and multipart bodies with
+StreamingFormDataParser and with Werkzeug's FormDataParser, and fails if
+any field differs. A streamed field under its cap must match too. Also
+checks that an oversized multipart preamble is rejected with a 413 while a
+large file upload is not.
+
+    python benchmarks/verify_form_parsing.py
+"""
+import io
+import os
+import sys
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.exceptions import RequestEntityTooLarge  # noqa: E402
+from werkzeug.formparser import FormDataParser  # noqa: E402
+
+import text_ingest  # noqa: E402
+from text_ingest import StreamingFormDataParser  # noqa: E402
+
+URLENCODED = [
+    b'',
+    b'a=1&b=2&a=3',
+    b'a=&=b&&c&d=',
+    b'name=Jos%C3%A9+Garc%C3%ADa&note=50%25+off+%2B+more',
+    b'dream_job=%BB&resume_text=Led+%FFteam%e2%82%ac',
+    b'resume_text=%E2%82&x=%zz%&y=%',
+    b'k%FF=v%fe%ff%C3&resume_text=' + b'%C3%A9t%C3%A9+' * 20000,
+    b'resume_text=' + quote('Led a team of 8 — résumé\n' * 3000).encode('ascii'),
+]
+BOUNDARY = 'verifyboundary'
+
+
+def multipart(fields):
+    parts = [f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+             for name, value in fields]
+    return (''.join(parts) + f'--{BOUNDARY}--\r\n').encode('utf-8')
+
+
+MULTIPART = [
+    multipart([('career_track', 'Technology & Software'), ('resume_text', 'Led a team\n' * 5000)]),
+    multipart([('dream_job', 'data analyst'), ('resume_text', 'résumé €\r\n' * 3000), ('resume_text', 'x')]),
+]
+
+
+def parse(parser, body, mimetype, options=None):
+    stream = io.BytesIO(body)
+    _, form, _ = parser.parse(stream, mimetype, len(body), options or {})
+    return list(form.items(multi=True))
+
+
+def preview(fields):
+    return repr([(name, value[:40]) for name, value in fields[:3]])
+
+
+def main():
+    failures = 0
+    limits = dict(max_form_memory_size=1024 * 1024, max_form_parts=1000)
+    reference = FormDataParser(**limits)
+    streaming = StreamingFormDataParser(streamed_fields={'resume_text': 1_000_000}, **limits)
+    cases = [(body, 'application/x-www-form-urlencoded', None) for body in URLENCODED]
+    cases += [(body, 'multipart/form-data', {'boundary': BOUNDARY}) for body in MULTIPART]
+    for chunk_size in (1, 2, 3, 7, 64 * 1024):
+        text_ingest.CHUNK_SIZE = chunk_size
+        for number, (body, mimetype, options) in enumerate(cases):
+            expected = parse(reference, body, mimetype, options)
+            got = parse(streaming, body, mimetype, options)
+            if got != expected:
+                failures += 1
+                print(f"case {number} ({mimetype}, chunks of {chunk_size}): {preview(got)} != {preview(expected)}")
+
+    # A preamble that never reaches a boundary may not be buffered without limit
+    small = StreamingFormDataParser(max_form_memory_size=64 * 1024, max_form_parts=1000)
+    try:
+        parse(small, b'x' * (1024 * 1024), 'multipart/form-data', {'boundary': BOUNDARY})
+        failures += 1
+        print("an endless multipart preamble was buffered")
+    except RequestEntityTooLarge:
+        pass
+
+    # while a large upload of short lines still goes through
+    upload = (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="resume_file"; filename="r.txt"\r\n\r\n'
+              + 'Led a team of 8\n' * 65536 + f'\r\n--{BOUNDARY}--\r\n').encode('ascii')
+    try:
+        small.parse(io.BytesIO(upload), 'multipart/form-data', len(upload), {'boundary': BOUNDARY})
+    except RequestEntityTooLarge:
+        failures += 1
+        print("a 1 MB upload was rejected by the 64 KB field limit")
+
+    if failures:
+        print(f"FAIL: {failures} checks failed")
+        return 1
+    print("ok: streamed form fields match Werkzeug")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
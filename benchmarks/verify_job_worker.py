@@ -0,0 +1,67 @@
+"""Check that a job worker thread survives errors while finishing a job
+
+Runs a JobWorkerPool with one thread against a temporary queue whose
+complete() raises sqlite3.OperationalError once and whose on_finish raises
+OSError once. The thread must keep going: the job whose result could not
+be saved is retried, and later jobs finish.
+
+    python benchmarks/verify_job_worker.py
+"""
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_queue import JobQueue, JobWorkerPool  # noqa: E402
+
+
+class FlakyQueue(JobQueue):
+    """JobQueue whose first complete() fails as if the database were locked"""
+
+    failures = 1
+
+    def complete(self, job_id, worker, result, stages=None):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return super().complete(job_id, worker, result, stages)
+
+
+def main():
+    logging.basicConfig(level=logging.CRITICAL)
+    finished = []
+    finish_errors = [OSError("disk full")]
+
+    def on_finish(job, state, run_seconds):
+        finished.append((job.id, state))
+        if finish_errors:
+            raise finish_errors.pop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = FlakyQueue(os.path.join(tmp, 'jobs.sqlite3'), lease_seconds=1, retry_delay=0.1)
+        pool = JobWorkerPool(queue, lambda job: ({'n': job.payload['n']}, {}), threads=1, poll_interval=0.05,
+                             on_finish=on_finish)
+        for n in range(3):
+            queue.submit(f'job-{n}', 'test', {'n': n})
+        pool.start()
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            if all((queue.get(f'job-{n}') or {}).get('status') == 'done' for n in range(3)):
+                break
+            time.sleep(0.05)
+        pool.close()
+        statuses = {f'job-{n}': queue.get(f'job-{n}')['status'] for n in range(3)}
+
+    if any(status != 'done' for status in statuses.values()):
+        print(f"FAIL: jobs not finished after a failed complete() and on_finish(): {statuses}")
+        return 1
+    print(f"ok: the worker thread finished all jobs ({len(finished)} attempts)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
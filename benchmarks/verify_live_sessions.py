@@ -0,0 +1,74 @@
+"""Check the per-client cap on live editing sessions
+
+Two browsers behind one proxy address each start SESSIONS_PER_CLIENT live
+sessions; every session of both must still accept patches. A client that
+starts more than its cap loses only its own oldest sessions.
+
+    python benchmarks/verify_live_sessions.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app  # noqa: E402
+
+PROXY_ADDRESS = '10.0.0.1'
+FIELDS = {'career_track': 'Technology & Software', 'life_stage': 'Career Transition', 'dream_job': 'data analyst'}
+
+
+def start_session(client, text):
+    reply = client.post('/api/v1/evaluate/live', json={**FIELDS, 'text': text, 'start_session': True},
+                        environ_base={'REMOTE_ADDR': PROXY_ADDRESS})
+    data = reply.get_json()
+    return {'session_id': data['session_id'], 'revision': data['revision']}
+
+
+def session_alive(client, session):
+    """Send a patch to the session, keeping its revision up to date, and say whether it was accepted"""
+    patch = {'start': 0, 'end': 0, 'text': 'Led '}
+    reply = client.post('/api/v1/evaluate/live', json={**FIELDS, **session, 'patches': [patch]},
+                        environ_base={'REMOTE_ADDR': PROXY_ADDRESS})
+    if reply.status_code != 200:
+        return False
+    session['revision'] = reply.get_json()['revision']
+    return True
+
+
+def main():
+    cap = app.config['SESSIONS_PER_CLIENT']
+    first, second = app.test_client(), app.test_client()
+    failures = 0
+
+    sessions = {first: [], second: []}
+    for i in range(cap):
+        for client in (first, second):
+            sessions[client].append(start_session(client, f'Developed python tools {i}'))
+    for name, client in (('first', first), ('second', second)):
+        alive = sum(session_alive(client, session) for session in sessions[client])
+        if alive != cap:
+            failures += 1
+            print(f"{name} client behind {PROXY_ADDRESS}: {alive} of {cap} sessions left")
+
+    # Going over the cap ends the client's own oldest sessions, never the other client's
+    extra = [start_session(first, f'Managed budgets {i}') for i in range(cap)]
+    if not all(session_alive(first, session) for session in extra):
+        failures += 1
+        print("first client lost a session it started last")
+    # Only the first session, started before the client had its cookie, is counted against the address
+    if sum(session_alive(first, session) for session in sessions[first]) > 1:
+        failures += 1
+        print(f"first client holds more than {cap} sessions")
+    if not all(session_alive(second, session) for session in sessions[second]):
+        failures += 1
+        print("second client lost sessions to the first")
+
+    if failures:
+        print(f"FAIL: {failures} checks failed")
+        return 1
+    print("ok: clients behind one address keep their own sessions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""Evaluate a directory or archive of resumes offline, across all cores
+
+Walks a directory (recursively), a .zip or a .tar/.tar.gz/.tgz archive for
+.txt and .pdf resumes, extracts and scores each one in a process pool and
+writes one result per resume as JSONL or CSV. Every resume is scored against
+the same career track, life stage and dream job, under the rubric in
+rubric.json or the one given with --rubric.
+
+Workers take resumes in chunks of --chunk-size. With numpy installed the
+rubric scores of a chunk are computed in one batch_scoring.BatchScorer call;
+without it each resume is scored on its own, with the same results.
+
+    python bulk_evaluate.py resumes.zip -o results.jsonl \\
+        --career-track "Technology & Software" --life-stage "Career Transition" \\
+        --dream-job "software engineer"
+
+The output file doubles as the checkpoint: after an interruption, run the
+same command with --resume to skip every resume already written.
+"""
+import argparse
+import concurrent.futures
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+import tarfile
+import time
+import zipfile
+
+from batch_scoring import BatchScorer, NUMPY_SUPPORT
+from evaluator import evaluate_resume_text, ResumeEvaluator
+from pdf_text import extract_pdf_text, PDF_SUPPORT
+from rubric import DEFAULT_RUBRIC_PATH, load_rubric, RubricError
+from text_normalize import normalize_text
+
+RESUME_EXTENSIONS = ('.txt', '.pdf')
+
+# One evaluator (and batch scorer, with numpy) per worker process, built by the pool initializer
+_worker_evaluator = None
+_worker_scorer = None
+
+
+def iter_resumes(source, max_bytes):
+    """Yield (name, path, data) for every resume under source
+
+    Files in a directory are passed by path and read in the worker; archive
+    members are read here, so data holds their bytes and path is None. Members
+    larger than max_bytes come back with data set to None.
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.lower().endswith(RESUME_EXTENSIONS):
+                    path = os.path.join(root, filename)
+                    yield os.path.relpath(path, source), path, None
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(RESUME_EXTENSIONS):
+                    continue
+                data = archive.read(info) if info.file_size <= max_bytes else None
+                yield info.filename, None, data
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source) as archive:
+            for member in archive:
+                if not member.isfile() or not member.name.lower().endswith(RESUME_EXTENSIONS):
+                    continue
+                data = archive.extractfile(member).read() if member.size <= max_bytes else None
+                yield member.name, None, data
+    else:
+        raise ValueError(f"{source} is not a directory, zip or tar archive")
+
+
+def _init_worker(rubric_path, batch_scoring):
+    global _worker_evaluator, _worker_scorer
+    _worker_evaluator = ResumeEvaluator(load_rubric(rubric_path))
+    _worker_scorer = BatchScorer(_worker_evaluator.rubric) if batch_scoring else None
+
+
+def analyze_entry(name, path, data, max_bytes, max_pages, max_chars):
+    """Extract and analyze one resume in a worker, returning (document, None) or (None, error record)"""
+    try:
+        if path is not None:
+            if os.path.getsize(path) > max_bytes:
+                data = None
+            else:
+                with open(path, 'rb') as f:
+                    data = f.read()
+        if data is None:
+            return None, {'source': name, 'error': f"File is larger than {max_bytes} bytes"}
+
+        if name.lower().endswith('.pdf'):
+            if not PDF_SUPPORT:
+                return None, {'source': name, 'error': "PDF support is not installed (PyPDF2)"}
+            resume_text = extract_pdf_text(io.BytesIO(data), max_pages, max_chars).text
+        else:
+            resume_text = data.decode('utf-8')
+        resume_text = normalize_text(resume_text)
+        if not resume_text:
+            return None, {'source': name, 'error': "No text found"}
+
+        return _worker_evaluator.analyze(resume_text), None
+    except Exception as e:
+        return None, {'source': name, 'error': f"{type(e).__name__}: {e}"}
+
+
+def evaluate_chunk(entries, user_inputs, max_bytes, max_pages, max_chars):
+    """Extract and score a chunk of (name, path, data) resumes in a worker, returning their records in order"""
+    records = []
+    analyzed = []  # (position in records, name, document)
+    for name, path, data in entries:
+        doc, error = analyze_entry(name, path, data, max_bytes, max_pages, max_chars)
+        if doc is not None:
+            analyzed.append((len(records), name, doc))
+        records.append(error)
+
+    batch_scores = None
+    score_names = _worker_evaluator.rubric.score_names
+    if _worker_scorer is not None and analyzed:
+        count = len(analyzed)
+        arrays = _worker_scorer.score([doc for _, _, doc in analyzed], [user_inputs['career_track']] * count,
+                                      [user_inputs['dream_job']] * count)
+        # tolist() gives Python ints or floats, so fractional rubric scores are kept as they are
+        batch_scores = {score: arrays[score].tolist() for score in score_names}
+    for number, (position, name, doc) in enumerate(analyzed):
+        scores = None
+        if batch_scores is not None:
+            scores = {score: batch_scores[score][number] for score in score_names}
+        try:
+            result = evaluate_resume_text(_worker_evaluator, doc, user_inputs, scores=scores)
+        except Exception as e:
+            records[position] = {'source': name, 'error': f"{type(e).__name__}: {e}"}
+            continue
+        result.pop('partial')
+        records[position] = {'source': name, **result}
+    return records
+
+
+class ResultWriter:
+    """Append output records to a JSONL or CSV file, one flushed line per resume"""
+
+    def __init__(self, path, fmt, append, score_names):
+        self.fmt = fmt
+        self.score_names = score_names
+        new_file = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8', newline='')
+        self._csv = None
+        if fmt == 'csv':
+            self._csv = csv.DictWriter(self._file, ['source', 'total_score'] + score_names + ['error'])
+            if new_file:
+                self._csv.writeheader()
+
+    def write(self, record):
+        if self._csv is not None:
+            evaluation = record.get('evaluation', {})
+            row = {'source': record['source'], 'error': record.get('error', '')}
+            row['total_score'] = evaluation.get('total_score', '')
+            for category in self.score_names:
+                row[category] = evaluation.get('scores', {}).get(category, '')
+            self._csv.writerow(row)
+        else:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def load_checkpoint(path, fmt):
+    """Return the sources already written to an earlier, interrupted output file
+
+    A line cut short by the interruption is removed so the file can be
+    appended to safely.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'rb+') as f:
+        content = f.read()
+        complete = content[:content.rfind(b'\n') + 1]
+        if len(complete) != len(content):
+            f.truncate(len(complete))
+    text = complete.decode('utf-8')
+    if fmt == 'csv':
+        return {row['source'] for row in csv.DictReader(io.StringIO(text, newline=''))}
+    return {json.loads(line)['source'] for line in text.splitlines() if line.strip()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', help="directory, .zip or .tar archive of .txt/.pdf resumes")
+    parser.add_argument('-o', '--output', required=True, help="results file (.jsonl or .csv)")
+    parser.add_argument('--format', choices=['jsonl', 'csv'],
+                        help="output format (default: from the output file's extension)")
+    parser.add_argument('--career-track', required=True)
+    parser.add_argument('--life-stage', required=True)
+    parser.add_argument('--dream-job', required=True)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=32, help="resumes handed to a worker at a time")
+    parser.add_argument('--no-batch-scoring', action='store_true',
+                        help="score resumes one at a time even when numpy is installed")
+    parser.add_argument('--resume', action='store_true', help="skip resumes already in the output file")
+    parser.add_argument('--max-bytes', type=int, default=16 * 1024 * 1024, help="largest resume file read")
+    parser.add_argument('--max-pages', type=int, default=10, help="pages read from each PDF")
+    parser.add_argument('--max-chars', type=int, default=100_000, help="characters read from each PDF")
+    parser.add_argument('--rubric', default=DEFAULT_RUBRIC_PATH, help="rubric file (default: rubric.json)")
+    args = parser.parse_args(argv)
+
+    # Load it here first so a broken rubric fails once, not in every worker
+    try:
+        rubric = load_rubric(args.rubric)
+    except (OSError, RubricError) as e:
+        parser.error(f"cannot load rubric: {e}")
+
+    fmt = args.format or ('csv' if args.output.lower().endswith('.csv') else 'jsonl')
+    user_inputs = {
+        'career_track': args.career_track,
+        'life_stage': args.life_stage,
+        'dream_job': args.dream_job
+    }
+    done = load_checkpoint(args.output, fmt) if args.resume else set()
+    if done:
+        print(f"Resuming: {len(done)} resumes already in {args.output}", file=sys.stderr)
+
+    batch_scoring = NUMPY_SUPPORT and not args.no_batch_scoring
+    if not NUMPY_SUPPORT and not args.no_batch_scoring:
+        print("numpy is not installed; scoring resumes one at a time", file=sys.stderr)
+
+    writer = ResultWriter(args.output, fmt, append=args.resume, score_names=rubric.score_names)
+    evaluated = errors = 0
+    start = last_report = time.perf_counter()
+    try:
+        with concurrent.futures.ProcessPoolExecutor(args.workers, initializer=_init_worker,
+                                                    initargs=(args.rubric, batch_scoring)) as executor:
+            entries = ((name, path, data) for name, path, data in iter_resumes(args.source, args.max_bytes)
+                       if name not in done)
+            pending = set()
+            # Keep two chunks per worker queued so archive members are not all read into memory at once
+            while True:
+                while len(pending) < args.workers * 2:
+                    chunk = list(itertools.islice(entries, max(args.chunk_size, 1)))
+                    if not chunk:
+                        break
+                    pending.add(executor.submit(evaluate_chunk, chunk, user_inputs,
+                                                args.max_bytes, args.max_pages, args.max_chars))
+                if not pending:
+                    break
+                finished, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    for record in future.result():
+                        writer.write(record)
+                        evaluated += 1
+                        errors += 'error' in record
+
+                now = time.perf_counter()
+                if now - last_report >= 5:
+                    print(f"{evaluated} resumes, {evaluated / (now - start):.1f}/s", file=sys.stderr)
+                    last_report = now
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    rate = evaluated / elapsed if elapsed else 0.0
+    print(f"Evaluated {evaluated} resumes ({errors} errors) in {elapsed:.2f}s: {rate:.1f} resumes/sec",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,417 @@
+"""Finished evaluations kept in SQLite, so every result has a URL that renders without rescoring
+
+Each record holds what result.html needs (inputs, scores, quotes and
+feedback) plus the input hash, rubric version and stage timings of the
+request that computed it. Records never change once written, and reading
+one is a single primary-key lookup. The file is shared by all gunicorn
+workers, so a result URL works whichever worker serves it.
+
+Requests do not write to the table themselves: EvaluationWriter queues the
+records in memory and a background thread commits them in batches.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+
+from sqlite_local import LocalConnections
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    id TEXT PRIMARY KEY,
+    input_hash TEXT NOT NULL,      -- evaluation_key() of the resume text, inputs and rubric version
+    rubric_version TEXT,
+    total_score INTEGER,
+    created_at REAL NOT NULL,
+    user_inputs TEXT NOT NULL,     -- JSON
+    result TEXT NOT NULL,          -- JSON: evaluation, quotes and feedback
+    stages TEXT NOT NULL           -- JSON {stage: seconds} of the request that computed it
+);
+CREATE INDEX IF NOT EXISTS evaluations_by_age ON evaluations (created_at);
+"""
+
+
+def new_evaluation_id():
+    """A random id for a result URL, led by the second it was issued in hex
+
+    The random part is not derived from the resume, so ids cannot be guessed
+    from it. The time tells a worker whether a record it cannot find yet may
+    still be waiting in another worker's write queue.
+    """
+    return f'{int(time.time()):08x}{secrets.token_urlsafe(16)}'
+
+
+def evaluation_id_time(evaluation_id):
+    """When an id from new_evaluation_id was issued, or None for an id of another form"""
+    if len(evaluation_id) != 30:
+        return None
+    try:
+        return int(evaluation_id[:8], 16)
+    except ValueError:
+        return None
+
+
+@dataclass
+class StoredEvaluation:
+    """One evaluation as written to and read from the store"""
+    id: str
+    input_hash: str
+    rubric_version: str
+    user_inputs: dict
+    result: dict
+    stages: dict = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+
+
+class EvaluationStore:
+    """SQLite table of finished evaluations, keyed by their result id
+
+    With a retention, records older than that many seconds are deleted, at
+    most once an hour per process, when new ones are written.
+    """
+
+    def __init__(self, path, retention=None, clock=time.time):
+        self.path = path
+        self.retention = retention
+        self.clock = clock
+        self._connections = LocalConnections(path, SCHEMA)
+        self._purged = 0.0
+
+    def put(self, record):
+        self.put_many([record])
+
+    def put_many(self, records):
+        """Write records in one transaction"""
+        rows = [(record.id, record.input_hash, record.rubric_version,
+                 record.result.get('evaluation', {}).get('total_score'), record.created_at,
+                 json.dumps(record.user_inputs), json.dumps(record.result), json.dumps(record.stages))
+                for record in records]
+        with self._connections.transaction() as db:
+            db.executemany("INSERT OR IGNORE INTO evaluations (id, input_hash, rubric_version, total_score, "
+                           "created_at, user_inputs, result, stages) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        if self.retention is not None and time.monotonic() - self._purged >= 3600:
+            self._purged = time.monotonic()
+            self.purge(self.retention)
+
+    def get(self, evaluation_id):
+        """The stored evaluation with this id, or None"""
+        row = self._connections.get().execute("SELECT * FROM evaluations WHERE id = ?", (evaluation_id,)).fetchone()
+        if row is None:
+            return None
+        return StoredEvaluation(row['id'], row['input_hash'], row['rubric_version'], json.loads(row['user_inputs']),
+                                json.loads(row['result']), json.loads(row['stages']), row['created_at'])
+
+    def purge(self, older_than):
+        """Delete records created more than older_than seconds ago; returns how many were deleted"""
+        cursor = self._connections.get().execute("DELETE FROM evaluations WHERE created_at < ?",
+                                                 (self.clock() - older_than,))
+        return cursor.rowcount
+
+
+class EvaluationWriter:
+    """Write-behind front of an EvaluationStore: put() queues, a thread commits
+
+    put() only appends the record to a queue of at most max_queue records;
+    one thread per process writes up to batch_size of them per transaction,
+    waiting up to flush_interval seconds after the first for a batch to fill,
+    so a busy worker commits once per batch instead of once per request.
+    Records in the queue are visible to get() until they are committed, so a
+    result page works in the worker that computed it right away.
+
+    When the queue is full, or a batch cannot be written, records are
+    appended to a spill file in spill_dir, written once the queue drains.
+    Next to each spill file an index lists the offset of every record, so
+    get() finds an id the store does not have yet in the spill files of
+    every process without reading them. A record is dropped and counted
+    when there is no spill_dir or the spill file has reached spill_max_bytes.
+    Spill files left by a process that died are claimed, by renaming them,
+    and written by the next writer to start.
+
+    The thread starts on the first put() in each process. close(), called
+    at exit, writes everything still queued before returning.
+    """
+
+    def __init__(self, store, max_queue=1000, batch_size=100, flush_interval=0.05, spill_dir=None,
+                 spill_max_bytes=None, on_flush=None, logger=None):
+        self.store = store
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self.on_flush = on_flush  # on_flush(records, seconds) after each committed batch
+        self.logger = logger or logging.getLogger(__name__)
+        self.written = 0
+        self.spilled = 0
+        self.dropped = 0
+        self._pid = None
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._queue = deque()
+        self._pending = {}  # Id -> record, from put() until committed
+        self._closing = False
+        self._thread = None
+        self._spill_bytes = 0
+        self._spill_lock = threading.Lock()
+        self._spill_index = {}  # Index file path -> (inode, bytes read, {id: offset in its spill file})
+        self._index_lock = threading.Lock()
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+        atexit.register(self.close)
+
+    def _start(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # A forked worker starts empty; what it inherited belongs to its parent
+            self._pid = os.getpid()
+            self._queue = deque()
+            self._pending = {}
+            self._closing = False
+            self._spill_bytes = 0
+            self.written = self.spilled = self.dropped = 0
+            self._thread = threading.Thread(target=self._run, name='evaluation-writer', daemon=True)
+            self._thread.start()
+
+    def put(self, record):
+        """Queue a record for writing; returns False if it had to be dropped"""
+        self._start()
+        with self._lock:
+            if len(self._queue) < self.max_queue and not self._closing:
+                self._queue.append(record)
+                self._pending[record.id] = record
+                # The thread is woken for the first record and a full batch; it collects the rest itself
+                if len(self._queue) in (1, self.batch_size):
+                    self._ready.notify()
+                return True
+        return self._spill([record]) > 0
+
+    def get(self, evaluation_id):
+        """The record with this id, from the queue, the store or a spill file"""
+        record = self._pending.get(evaluation_id)
+        if record is not None:
+            return record
+        record = self.store.get(evaluation_id)
+        if record is not None or self.spill_dir is None:
+            return record
+        record = self._find_spilled(evaluation_id)
+        if record is not None:
+            return record
+        # A replay may have moved it into the store while the files were searched
+        return self.store.get(evaluation_id)
+
+    def _find_spilled(self, evaluation_id):
+        """The record with this id from any spill file in spill_dir, or None"""
+        for index_path, offsets in self._spill_offsets():
+            offset = offsets.get(evaluation_id)
+            if offset is None:
+                continue
+            try:
+                with open(index_path[:-len('.idx')] + '.jsonl', 'rb') as f:
+                    f.seek(offset)
+                    record = StoredEvaluation(**json.loads(f.readline()))
+            except (OSError, ValueError, TypeError):
+                continue  # Replayed and removed meanwhile, or cut short by a crash
+            if record.id == evaluation_id:
+                return record
+        return None
+
+    def _spill_offsets(self):
+        """[(index path, {id: offset})] of every spill file, reading only what was added since the last call"""
+        with self._index_lock:
+            paths = glob.glob(os.path.join(self.spill_dir, '*.idx'))
+            for path in set(self._spill_index).difference(paths):
+                del self._spill_index[path]  # Replayed
+            for path in paths:
+                try:
+                    with open(path, 'rb') as f:
+                        inode = os.fstat(f.fileno()).st_ino
+                        known, read, offsets = self._spill_index.get(path, (None, 0, None))
+                        if known != inode:
+                            read, offsets = 0, {}  # A new file under the name of a claimed one
+                        f.seek(read)
+                        data = f.read()
+                except OSError:
+                    continue
+                end = data.rfind(b'\n') + 1  # A line still being written is read next time
+                for line in data[:end].splitlines():
+                    evaluation_id, _, offset = line.decode('utf-8', 'replace').partition(' ')
+                    if offset.isdigit():
+                        offsets[evaluation_id] = int(offset)
+                self._spill_index[path] = (inode, read + end, offsets)
+            return [(path, offsets) for path, (_, _, offsets) in self._spill_index.items()]
+
+    def depth(self):
+        return len(self._queue)
+
+    def _run(self):
+        self._guarded(self._replay, orphaned=True)
+        while True:
+            with self._lock:
+                while not self._queue and not self._closing:
+                    if not self._ready.wait(timeout=1.0) and self._spill_bytes:
+                        break  # Idle with records spilled during a burst; write them now
+                if 0 < len(self._queue) < self.batch_size and not self._closing:
+                    self._ready.wait(self.flush_interval)
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                closing = self._closing
+            if batch:
+                self._guarded(self._write, batch)
+            else:
+                self._guarded(self._replay)
+                if closing:
+                    return
+
+    def _guarded(self, step, *args, **kwargs):
+        """Run one step of the writer thread; an error is logged so the thread keeps going"""
+        try:
+            step(*args, **kwargs)
+        except Exception:
+            self.logger.exception("Evaluation writer step %s failed", step.__name__)
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            self.store.put_many(batch)
+        except Exception:
+            self.logger.exception("Could not write %d evaluations; spilling them", len(batch))
+            self._spill(batch)
+        else:
+            self.written += len(batch)
+            if self.on_flush is not None:
+                self.on_flush(len(batch), time.perf_counter() - start)
+        finally:
+            with self._lock:
+                for record in batch:
+                    self._pending.pop(record.id, None)
+
+    def _spill(self, records):
+        """Append records to this process's spill file and their offsets to its index; returns how many were kept"""
+        kept = 0
+        with self._spill_lock:
+            if self.spill_dir is not None:
+                lines = [json.dumps(asdict(record)).encode('utf-8') + b'\n' for record in records]
+                size = sum(map(len, lines))
+                if self.spill_max_bytes is None or self._spill_bytes + size <= self.spill_max_bytes:
+                    stem = os.path.join(self.spill_dir, str(os.getpid()))
+                    try:
+                        with open(stem + '.jsonl', 'ab') as f:
+                            offset = f.seek(0, os.SEEK_END)
+                            f.writelines(lines)
+                    except OSError:
+                        self.logger.exception("Could not spill %d evaluations", len(records))
+                    else:
+                        self._spill_bytes += size
+                        kept = len(records)
+                        entries = []
+                        for record, line in zip(records, lines):
+                            entries.append(f'{record.id} {offset}\n'.encode('utf-8'))
+                            offset += len(line)
+                        try:
+                            with open(stem + '.idx', 'ab') as f:
+                                f.writelines(entries)
+                        except OSError:
+                            # They are still written on replay, only get() cannot find them before
+                            self.logger.exception("Could not index %d spilled evaluations", len(records))
+            self.spilled += kept
+            self.dropped += len(records) - kept
+        if kept < len(records):
+            self.logger.warning("Dropped %d evaluations that could be neither queued nor spilled", len(records) - kept)
+        return kept
+
+    def _replay(self, orphaned=False):
+        """Write this process's spill file, or with orphaned those of processes that are gone"""
+        if self.spill_dir is None:
+            return
+        if orphaned:
+            # Including files a replay was interrupted in, named <pid>-<time>
+            stems = []
+            for path in glob.glob(os.path.join(self.spill_dir, '*.jsonl')):
+                if not _process_alive(_spill_pid(path)):
+                    stems.append(self._claim(path[:-len('.jsonl')]))
+            # Indexes left behind by a writer that died between claiming a file and its index
+            for path in glob.glob(os.path.join(self.spill_dir, '*.idx')):
+                if not _process_alive(_spill_pid(path)) and not os.path.exists(path[:-len('.idx')] + '.jsonl'):
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+        else:
+            with self._spill_lock:
+                if not self._spill_bytes:
+                    return
+                self._spill_bytes = 0
+                # Spills from now on start a new file
+                stems = [self._claim(os.path.join(self.spill_dir, str(os.getpid())))]
+        for stem in stems:
+            if stem is None:
+                continue
+            try:
+                with open(stem + '.jsonl', encoding='utf-8') as f:
+                    records = [StoredEvaluation(**json.loads(line)) for line in f if line.endswith('\n')]
+                for start in range(0, len(records), self.batch_size):
+                    batch = records[start:start + self.batch_size]
+                    self.store.put_many(batch)
+                    self.written += len(batch)
+                if os.path.exists(stem + '.idx'):
+                    os.unlink(stem + '.idx')
+                os.unlink(stem + '.jsonl')
+            except Exception:
+                self.logger.exception("Could not replay spilled evaluations from %s.jsonl", stem)
+
+    def _claim(self, stem):
+        """Rename a spill file and its index to a new name of this process, so no other writer replays them
+
+        Returns the new path without extension, or None if another writer
+        claimed the file first.
+        """
+        claimed = os.path.join(self.spill_dir, f'{os.getpid()}-{time.time_ns()}')
+        try:
+            os.rename(stem + '.jsonl', claimed + '.jsonl')
+        except FileNotFoundError:
+            return None
+        except OSError:
+            self.logger.exception("Could not claim spilled evaluations in %s.jsonl", stem)
+            return None
+        try:
+            os.rename(stem + '.idx', claimed + '.idx')
+        except OSError:
+            pass  # Never written, or removed as left behind
+        return claimed
+
+    def close(self, timeout=10.0):
+        """Stop accepting records and wait up to timeout seconds for the queue to be written"""
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            self._closing = True
+            self._ready.notify()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self.logger.warning("Evaluation writer still busy at exit; %d evaluations left unwritten",
+                                len(self._queue))
+
+
+def _spill_pid(path):
+    """The pid in a spill file name, <pid>.jsonl or <pid>-<time>.jsonl once claimed"""
+    return os.path.basename(path).split('.')[0].split('-')[0]
+
+
+def _process_alive(name):
+    """Whether the process whose pid starts a spill file name is running; a file with our own pid is a leftover"""
+    try:
+        pid = int(name)
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (ValueError, PermissionError):
+        return True
+    return pid != os.getpid()
@@ -0,0 +1,271 @@
+import re
+import time
+
+from keyword_matcher import tokenize
+from metrics import StageTimings
+from resume_document import as_document, ResumeDocument
+from rubric import load_rubric
+
+# Phrase patterns, matched once over the whole text and mapped back to sentences.
+# Every pattern is bounded: a verb may be followed by at most PHRASE_WINDOW
+# characters of the same sentence (a period only inside a decimal like 3.5)
+# before its number, so matching stays linear in the length of the resume.
+PHRASE_WINDOW = 120
+PHRASE_CHUNK = 16 * 1024
+_SAME_SENTENCE = r'(?:[^.!?\n]|(?<=\d)\.(?=\d)){0,%d}?' % PHRASE_WINDOW
+_PERCENT = r'(?<!\d)(\d{1,12}%|\d{1,12}[ \t]{0,3}percent)'
+_AMOUNT = r'\$[\d,]{1,20}'
+
+QUANTIFIED_PHRASE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r'\bincreased\b' + _SAME_SENTENCE + _PERCENT,
+    r'\breduced\b' + _SAME_SENTENCE + _PERCENT,
+    r'\bmanaged\b' + _SAME_SENTENCE + _AMOUNT,
+    r'\bled\b' + _SAME_SENTENCE + r'(?<!\d)(\d{1,12})[ \t]{0,3}(people|team|members)',
+    r'\bachieved\b' + _SAME_SENTENCE + _PERCENT,
+    r'\bgenerated\b' + _SAME_SENTENCE + _AMOUNT,
+    r'\bsaved\b' + _SAME_SENTENCE + _AMOUNT,
+    r'\bimproved\b' + _SAME_SENTENCE + _PERCENT
+]]
+
+ACTION_PHRASE_PATTERNS = [re.compile(pattern, re.MULTILINE | re.IGNORECASE) for pattern in [
+    r'[•\-\*][ \t]*(Developed|Created|Implemented|Led|Managed|Designed|Built|Launched|Optimized|Streamlined)\b',
+    r'^[ \t]*(Developed|Created|Implemented|Led|Managed|Designed|Built|Launched|Optimized|Streamlined)\b'
+]]
+
+WEAK_PHRASE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r'\bresponsible for\b',
+    r'\bhelped with\b',
+    r'\bassisted in\b',
+    r'\bworked on\b',
+    r'\binvolved in\b'
+]]
+
+
+class CPUBudget:
+    """CPU-time allowance for one request's phrase extraction
+
+    Uses the calling thread's CPU clock, so time spent by other requests in a
+    threaded server is not charged to this one. A limit of None never runs out.
+    """
+
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.deadline = None if seconds is None else time.thread_time() + seconds
+        self.exhausted = False
+
+    def spent(self):
+        """Check the budget, remembering once it has run out"""
+        if self.deadline is not None and not self.exhausted and time.thread_time() >= self.deadline:
+            self.exhausted = True
+        return self.exhausted
+
+
+def _sentences_matching(doc, patterns, group, budget, limit=None):
+    """Yield the sentence of each pattern match until the budget is spent
+    
+    The text is searched in chunks so the budget is checked at least every
+    PHRASE_CHUNK characters even when a pattern finds nothing.
+    """
+    found = [0] * len(patterns)
+    for start, end in doc.chunks(PHRASE_CHUNK):
+        for index, pattern in enumerate(patterns):
+            if budget.spent():
+                return
+            for match in pattern.finditer(doc.text, start, end):
+                if limit is not None and found[index] >= limit:
+                    break
+                found[index] += 1
+                yield doc.sentence_at(match.start(group))
+
+
+def _unique(phrases):
+    """Clean up sentences and drop empty or repeated ones, keeping their order"""
+    cleaned = (phrase.strip().lstrip('•-* \t') for phrase in phrases)
+    return [phrase for phrase in dict.fromkeys(cleaned) if phrase]
+
+
+class ResumeEvaluator:
+    """Scores resumes and writes feedback according to a compiled Rubric
+    
+    The keyword lists, score rules and feedback texts all come from the
+    rubric (rubric.json by default); only the phrase patterns live here.
+    """
+    
+    def __init__(self, rubric=None):
+        self.rubric = rubric or load_rubric()
+        self.matcher = self.rubric.matcher
+        self.career_tracks = self.rubric.career_tracks
+        self.life_stages = self.rubric.life_stages
+        self.rubric_descriptions = self.rubric.descriptions
+    
+    def analyze(self, resume):
+        """Build the shared ResumeDocument, including keyword hits, for a resume"""
+        doc = as_document(resume, self.matcher)
+        if doc.keyword_hits is None:
+            doc = ResumeDocument.from_text(doc.text, self.matcher)
+        return doc
+    
+    def extract_good_phrases(self, resume, budget=None):
+        """Extract strong phrases and accomplishments from resume
+        
+        Stops early with the phrases found so far once the CPUBudget is spent.
+        """
+        doc = self.analyze(resume)
+        budget = budget or CPUBudget()
+        good_phrases = []
+        
+        # Look for quantified achievements and keep the sentence each match is in
+        good_phrases.extend(_sentences_matching(doc, QUANTIFIED_PHRASE_PATTERNS, 0, budget))
+        
+        # Look for strong action verbs at start of bullet points
+        good_phrases.extend(_sentences_matching(doc, ACTION_PHRASE_PATTERNS, 1, budget, limit=3))  # Limit to 3 examples per pattern
+        
+        return _unique(good_phrases)[:5]  # Return top 5 unique phrases
+    
+    def extract_growth_phrases(self, resume, budget=None):
+        """Extract phrases that indicate areas for improvement
+        
+        Stops early with the phrases found so far once the CPUBudget is spent.
+        """
+        doc = self.analyze(resume)
+        budget = budget or CPUBudget()
+        
+        # Look for weak language patterns
+        growth_phrases = list(_sentences_matching(doc, WEAK_PHRASE_PATTERNS, 0, budget))
+        
+        return _unique(growth_phrases)[:3]  # Return top 3 unique phrases
+    
+    def features(self, doc, career_track, dream_job):
+        """Every per-resume value the rubric's rules can refer to
+        
+        Only the counting attributes of doc are read (see
+        incremental.DocumentCounts), so it need not be a full ResumeDocument.
+        """
+        hits = doc.keyword_hits
+        features = {'keywords:' + category: hits.distinct(category) for category in self.rubric.keywords}
+        if career_track in self.rubric.track_keywords:
+            features['track_keywords'] = hits.distinct('track:' + career_track)
+        else:
+            features['track_keywords'] = 0
+        if dream_job:
+            features['dream_job_words'] = sum(1 for word in tokenize(dream_job) if word in doc.tokens)
+        else:
+            features['dream_job_words'] = 0
+        features['quantified'] = doc.quantified_count
+        features['percentages'] = doc.percent_count
+        features['metrics'] = int(doc.has_metric)
+        features['bullets'] = int(doc.has_bullet_marker)
+        features['email'] = int(bool(doc.contact['email']))
+        features['phone'] = int(bool(doc.contact['phone']))
+        return features
+    
+    def score(self, features):
+        """Every rubric score for a resume's features"""
+        scores = {}
+        for name, (base, cap, rules) in self.rubric.score_specs.items():
+            score = base
+            for kind, feature, weight, rule_cap in rules:
+                if kind == 'count':
+                    points = features[feature] * weight
+                    score += points if rule_cap is None else min(points, rule_cap)
+                elif any(features[part] for part in feature):
+                    score += weight
+            scores[name] = min(score, cap)
+        return scores
+    
+    def _context(self, doc, user_inputs, scores=None):
+        """Values the rubric's feedback rules are evaluated against"""
+        career_track = user_inputs.get('career_track', '')
+        life_stage = user_inputs.get('life_stage', '')
+        dream_job = user_inputs.get('dream_job', '')
+        features = self.features(doc, career_track, dream_job)
+        scores = dict(scores if scores is not None else self.score(features))
+        scores['total'] = sum(scores.values())
+        return {
+            'scores': scores,
+            'features': features,
+            'career_track': career_track,
+            'life_stage': life_stage,
+            'dream_job': dream_job,
+            'text_fields': {
+                'career_track': career_track,
+                'career_track_lower': career_track.lower(),
+                'life_stage': life_stage,
+                'dream_job': dream_job
+            }
+        }
+    
+    def _feedback(self, section, context):
+        """Texts of a feedback section whose rules match, limited and joined as configured"""
+        rules, limit, join = self.rubric.feedback[section]
+        texts = [text for text in (rule(context) for rule in rules) if text is not None]
+        if limit is not None:
+            texts = texts[:limit]
+        return texts if join is None else join.join(texts)
+    
+    def generate_personal_feedback(self, user_inputs, evaluation, resume):
+        """Generate personalized feedback based on user inputs and resume"""
+        doc = self.analyze(resume)
+        return self._feedback('personal_feedback', self._context(doc, user_inputs, evaluation['scores']))
+    
+    def suggest_career_paths(self, user_inputs, resume):
+        """Suggest career paths based on resume content and user inputs"""
+        doc = self.analyze(resume)
+        return self._feedback('career_insights', self._context(doc, user_inputs))
+    
+    def evaluate_resume(self, resume, career_track, life_stage, dream_job, scores=None):
+        """Enhanced evaluation with more detailed analysis
+        
+        scores, when given, are the rubric scores already computed for this
+        resume (e.g. by batch_scoring.BatchScorer) and are used as they are.
+        """
+        doc = self.analyze(resume)
+        user_inputs = {'career_track': career_track, 'life_stage': life_stage, 'dream_job': dream_job}
+        context = self._context(doc, user_inputs, scores)
+        scores = {name: context['scores'][name] for name in self.rubric.score_names}
+        
+        return {
+            'scores': scores,
+            'total_score': context['scores']['total'],
+            'strengths': self._feedback('strengths', context),
+            'improvements': self._feedback('improvements', context),
+            'career_alignment': self._feedback('career_alignment', context),
+            'resources': self._feedback('resources', context)
+        }
+
+
+def evaluate_resume_text(evaluator, resume_text, user_inputs, phrase_cpu_budget=None, timings=None, scores=None):
+    """Score the resume and build every piece of feedback shown on the result page
+    
+    phrase_cpu_budget caps the CPU seconds spent extracting quoted phrases; the
+    result's 'partial' flag says whether the cap was hit. Each step is recorded
+    as a stage of timings (a StageTimings) when one is given. Precomputed
+    rubric scores can be passed as scores.
+    """
+    timings = timings or StageTimings()
+    
+    # Analyze the resume once and share the result with every stage
+    with timings.stage('analyze'):
+        doc = evaluator.analyze(resume_text)
+    
+    # Evaluate resume
+    with timings.stage('score'):
+        evaluation = evaluator.evaluate_resume(doc, user_inputs['career_track'], user_inputs['life_stage'], user_inputs['dream_job'], scores)
+    
+    # Extract phrases and generate enhanced feedback
+    with timings.stage('phrases'):
+        phrase_budget = CPUBudget(phrase_cpu_budget)
+        strength_quotes = evaluator.extract_good_phrases(doc, phrase_budget)
+        growth_quotes = evaluator.extract_growth_phrases(doc, phrase_budget)
+    with timings.stage('feedback'):
+        personal_feedback = evaluator.generate_personal_feedback(user_inputs, evaluation, doc)
+        career_insights = evaluator.suggest_career_paths(user_inputs, doc)
+    
+    return {
+        'evaluation': evaluation,
+        'strength_quotes': strength_quotes,
+        'growth_quotes': growth_quotes,
+        'personal_feedback': personal_feedback,
+        'career_insights': career_insights,
+        'partial': phrase_budget.exhausted  # Phrase extraction ran out of budget
+    }
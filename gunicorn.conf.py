@@ -0,0 +1,32 @@
+"""gunicorn settings for production: gunicorn -c gunicorn.conf.py wsgi:app
+
+Settings can be overridden by environment variable (see below) or on the
+command line.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('RESUME_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# Threads let a worker keep serving while one request waits on a PDF parse or a slow client
+worker_class = 'gthread'
+threads = int(os.environ.get('RESUME_THREADS', 4))
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then so memory they dirtied is returned; jitter keeps them from restarting together
+max_requests = int(os.environ.get('RESUME_MAX_REQUESTS', 10_000))
+max_requests_jitter = max_requests // 10
+
+# Import and warm the app once in the master; workers fork from it and share its memory copy-on-write.
+# Code changes then need a full restart, since a HUP re-forks workers from the same preloaded master.
+preload_app = True
+
+accesslog = '-'
+
+
+def worker_exit(server, worker):
+    """Write the results still queued in an exiting worker, then its final metrics"""
+    from app import evaluation_writer, metrics
+    evaluation_writer.close()
+    metrics.flush(force=True)
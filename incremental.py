@@ -0,0 +1,420 @@
+"""Re-evaluate a resume that is edited and resubmitted without rescanning all of it
+
+An EvaluationSession keeps the analysis of every line of the last version it
+saw. A new version is diffed against it line by line, and only the lines
+between the unchanged prefix and suffix are analyzed again. Everything that
+spans lines is carried over from the neighbouring state instead: the keyword
+automaton's state at each line start, and the matches of the count patterns
+around the edit. The ResumeDocument assembled from the line states is the
+same one ResumeDocument.from_text() would build for the whole text, so the
+scores and feedback are exactly those of a full evaluation.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter, namedtuple
+from types import MappingProxyType
+
+from evaluator import (ACTION_PHRASE_PATTERNS, CPUBudget, PHRASE_CHUNK, QUANTIFIED_PHRASE_PATTERNS, _unique,
+                       WEAK_PHRASE_PATTERNS)
+from keyword_matcher import TOKEN_RE
+from metrics import StageTimings
+from resume_document import (METRIC_RE, PERCENT_RE, PHONE_RE, QUANTIFIED_RE, ResumeDocument,
+                             SENTENCE_BREAK_RE)
+from text_normalize import LineNormalizer
+
+# Patterns whose matches are counted over the whole text. They may run across
+# a line break, so their matches are kept per document rather than per line.
+COUNT_PATTERNS = {
+    'quantified': QUANTIFIED_RE,
+    'percent': PERCENT_RE,
+    'metric': METRIC_RE,
+    'phone': PHONE_RE,
+}
+# More characters than any count pattern match is long, or any attempt looks
+# at; matches ending at least this far before an edit cannot be affected by it
+COUNT_PATTERN_REACH = 32
+
+# Phrase patterns in the order the evaluator runs them, with the group whose
+# position picks the quoted sentence
+PHRASE_PATTERNS = ([(pattern, 0) for pattern in QUANTIFIED_PHRASE_PATTERNS]
+                   + [(pattern, 1) for pattern in ACTION_PHRASE_PATTERNS]
+                   + [(pattern, 0) for pattern in WEAK_PHRASE_PATTERNS])
+_GOOD = slice(0, len(QUANTIFIED_PHRASE_PATTERNS))
+_ACTION = slice(_GOOD.stop, _GOOD.stop + len(ACTION_PHRASE_PATTERNS))
+_WEAK = slice(_ACTION.stop, len(PHRASE_PATTERNS))
+
+
+# The attributes of a ResumeDocument that ResumeEvaluator.features() reads
+DocumentCounts = namedtuple('DocumentCounts', ['keyword_hits', 'tokens', 'quantified_count', 'percent_count',
+                                               'has_metric', 'has_bullet_marker', 'contact'])
+
+
+def _add(counts, other):
+    for key, value in other.items():
+        counts[key] = counts.get(key, 0) + value
+
+
+def _subtract(counts, other):
+    """Subtract other from counts, dropping keys that reach zero"""
+    for key, value in other.items():
+        left = counts[key] - value
+        if left:
+            counts[key] = left
+        else:
+            del counts[key]
+
+
+class _Line:
+    """Analysis of one line, independent of the lines around it"""
+
+    __slots__ = ('text', 'lower', 'token_counts', 'breaks', 'at_sign', 'marker',
+                 'state_in', 'state_out', 'keywords', 'phrases')
+
+    def __init__(self, text):
+        self.text = text
+        self.lower = text.casefold()
+        self.token_counts = Counter(TOKEN_RE.findall(self.lower))
+        # Sentence breaks inside the line; the line break itself is implied
+        self.breaks = tuple(m.start() for m in SENTENCE_BREAK_RE.finditer(text))
+        self.at_sign = '@' in text
+        self.marker = '•' in text or '-' in text or '*' in text
+        self.state_in = None  # Keyword automaton states at the start and end of the line
+        self.state_out = None
+        self.keywords = None  # Keywords completed inside the line
+        self.phrases = None  # (pattern index, offset) of each phrase match, None until scanned
+
+    def scan_phrases(self):
+        """Find the phrase pattern matches in the line
+
+        No phrase match crosses a sentence break, so the line on its own
+        finds the same matches as the whole text.
+        """
+        self.phrases = tuple((index, m.start(group)) for index, (pattern, group) in enumerate(PHRASE_PATTERNS)
+                             for m in pattern.finditer(self.text))
+
+
+def _rescan(pattern, text, starts, ends, edit_start, old_edit_end, new_edit_end):
+    """Matches of pattern in the new text, reusing the old ones away from the edit
+
+    starts and ends hold the old text's matches. The edit replaced
+    [edit_start, old_edit_end) of the old text with [edit_start, new_edit_end)
+    of the new one. Scanning restarts after the last match that ends well
+    before the edit. Past the edit it stops at the first position outside
+    any match in both texts; from there on both scans agree.
+    """
+    shift = new_edit_end - old_edit_end
+    cut = edit_start - COUNT_PATTERN_REACH
+    kept = bisect_right(ends, cut)
+    new_starts, new_ends = starts[:kept], ends[:kept]
+    # The old scan found nothing between its last kept match and its next
+    # one, and attempts before cut only looked at unchanged text
+    pos = max(ends[kept - 1] if kept else 0, min(cut, starts[kept]) if kept < len(starts) else cut)
+    while True:
+        if pos >= new_edit_end:
+            index = bisect_left(starts, pos - shift, kept)
+            if index == 0 or ends[index - 1] <= pos - shift:
+                new_starts.extend(old + shift for old in starts[index:])
+                new_ends.extend(old + shift for old in ends[index:])
+                break
+            match = pattern.search(text, pos)
+        else:
+            # Only look a match's length past the edit for one that starts inside it
+            match = pattern.search(text, pos, new_edit_end + COUNT_PATTERN_REACH)
+            if match is None or match.start() >= new_edit_end:
+                pos = new_edit_end
+                continue
+            match = pattern.match(text, match.start())
+        if match is None:
+            break
+        start, end = match.span()
+        new_starts.append(start)
+        new_ends.append(end)
+        pos = end if end > start else end + 1
+    return new_starts, new_ends
+
+
+def _sentences_at(doc, offsets, limit=None):
+    """Yield the sentence of each offset the way evaluator._sentences_matching does"""
+    found = [0] * len(offsets)
+    for start, end in doc.chunks(PHRASE_CHUNK):
+        for index, pattern_offsets in enumerate(offsets):
+            for offset in pattern_offsets[bisect_left(pattern_offsets, start):bisect_left(pattern_offsets, end)]:
+                if limit is not None and found[index] >= limit:
+                    break
+                found[index] += 1
+                yield doc.sentence_at(offset)
+
+
+class EvaluationSession:
+    """Line-level analysis state of one resume across its resubmissions
+
+    evaluate() takes the full new text each time and returns the same result
+    as evaluate_resume_text(), plus the change of every score since the last
+    version and how many lines had to be analyzed again. scores() only
+    computes the rubric scores, for live updates while the user types. Every
+    call starts a new revision. Calls on one session are serialized by its
+    lock.
+
+    Each version is analyzed in the canonical form from normalize_text(),
+    while text and apply_patches() keep to the text as submitted, so a client
+    can send patches against what it sent.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.revision = 0
+        self._last_scores = None
+        self._normalize = LineNormalizer()
+        self._reset(None)
+
+    @property
+    def text(self):
+        """The text of the current revision as submitted"""
+        return self._normalize.text
+
+    def retained_chars(self):
+        """Roughly how many characters of text the session holds, for bounding a cache of sessions"""
+        normalizer = self._normalize
+        # The canonical text, and each line's text and lowercase form
+        chars = len(normalizer.text) + 3 * len(self._text)
+        if normalizer.normalized_lines is not self._text:
+            chars += len(normalizer.normalized_lines)
+        if self._doc is not None:
+            chars += len(self._doc.lower)
+        return chars
+
+    def _reset(self, matcher):
+        self._matcher = matcher
+        self._lines = []
+        self._line_starts = ()
+        self._text = ''
+        self._token_counts = {}  # Only counts above zero, so the keys are the tokens present
+        self._keyword_counts = {}
+        self._flags = Counter()  # Lines with a bullet marker or an @ anywhere in them
+        self._matches = {name: ([], []) for name in COUNT_PATTERNS}
+        self._analyzed = False
+        self._doc = None  # Assembled on first use after each update
+        self._long_sentence = False
+
+    def _update(self, text, matcher):
+        """Bring the line states up to date with text; returns per-revision change counts"""
+        if matcher is not self._matcher:
+            self._reset(matcher)  # The rubric was reloaded; its keywords may differ
+        old_lines, old_text, old_line_starts = self._lines, self._text, self._line_starts
+        texts = text.split('\n')
+        if self._analyzed and text == old_text:
+            return {'lines_added': 0, 'lines_removed': 0, 'lines_reanalyzed': 0}
+
+        # Common prefix and suffix of unchanged lines
+        limit = min(len(old_lines), len(texts))
+        prefix = 0
+        while prefix < limit and old_lines[prefix].text == texts[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old_lines[-1 - suffix].text == texts[-1 - suffix]:
+            suffix += 1
+        removed = old_lines[prefix:len(old_lines) - suffix]
+        added = [_Line(line_text) for line_text in texts[prefix:len(texts) - suffix]]
+        lines = old_lines[:prefix] + added + old_lines[len(old_lines) - suffix:]
+
+        for line in removed:
+            _subtract(self._token_counts, line.token_counts)
+            _subtract(self._keyword_counts, line.keywords)
+            self._flags.subtract({'marker': line.marker, 'at_sign': line.at_sign})
+        for line in added:
+            _add(self._token_counts, line.token_counts)
+            self._flags.update({'marker': line.marker, 'at_sign': line.at_sign})
+
+        # Carry the automaton state forward until an unchanged line starts in
+        # the state it started in before; every later line then matches as before
+        state = lines[prefix - 1].state_out if prefix else 0
+        reanalyzed = 0
+        for index in range(prefix, len(lines)):
+            line = lines[index]
+            if index >= prefix + len(added) and line.state_in == state:
+                break
+            if line.keywords is not None:
+                _subtract(self._keyword_counts, line.keywords)
+            line.state_in = state
+            state, line.keywords = self._matcher.advance(TOKEN_RE.findall(line.lower), state)
+            line.state_out = state
+            _add(self._keyword_counts, line.keywords)
+            reanalyzed += 1
+
+        line_starts = []
+        offset = 0
+        for line in lines:
+            line_starts.append(offset)
+            offset += len(line.text) + 1
+
+        # The edit starts at the line break ending the unchanged prefix
+        edit_start = line_starts[prefix - 1] + len(lines[prefix - 1].text) if prefix else 0
+        old_edit_end = old_line_starts[len(old_lines) - suffix] if suffix else len(old_text)
+        new_edit_end = line_starts[len(lines) - suffix] if suffix else len(text)
+        for name, pattern in COUNT_PATTERNS.items():
+            starts, ends = self._matches[name]
+            self._matches[name] = _rescan(pattern, text, starts, ends, edit_start, old_edit_end, new_edit_end)
+
+        self._lines, self._text, self._line_starts = lines, text, tuple(line_starts)
+        self._analyzed = True
+        self._doc = None
+        return {'lines_added': len(added), 'lines_removed': len(removed), 'lines_reanalyzed': reanalyzed}
+
+    def _document(self):
+        """The ResumeDocument of the current text, assembled from the line states"""
+        if self._doc is None:
+            self._doc = self._build_document()
+        return self._doc
+
+    def _counts(self):
+        """The document's counts without assembling the document"""
+        return DocumentCounts(
+            keyword_hits=self._matcher.hits(Counter(self._keyword_counts)),
+            tokens=self._token_counts.keys(),
+            quantified_count=len(self._matches['quantified'][0]),
+            percent_count=len(self._matches['percent'][0]),
+            has_metric=bool(self._matches['metric'][0]),
+            has_bullet_marker=self._flags['marker'] > 0,
+            contact=MappingProxyType({'email': self._flags['at_sign'] > 0,
+                                      'phone': bool(self._matches['phone'][0])}),
+        )
+
+    def _build_document(self):
+        text, lines = self._text, self._lines
+        sentence_spans = []
+        start = 0
+        for line, offset in zip(lines, self._line_starts):
+            for position in line.breaks:
+                sentence_spans.append((start, offset + position))
+                start = offset + position + 1
+            sentence_spans.append((start, offset + len(line.text)))  # Up to the line break or the end
+            start = offset + len(line.text) + 1
+        # A sentence longer than a phrase chunk may be split by the chunking,
+        # which the per-line phrase matches cannot reproduce
+        self._long_sentence = any(end - start > PHRASE_CHUNK for start, end in sentence_spans)
+
+        counts = self._counts()
+        return ResumeDocument(
+            text=text,
+            lower='\n'.join(line.lower for line in lines),
+            tokens=frozenset(self._token_counts),
+            sentence_spans=tuple(sentence_spans),
+            sentence_starts=tuple(start for start, _ in sentence_spans),
+            has_bullet_marker=counts.has_bullet_marker,
+            contact=counts.contact,
+            quantified_count=counts.quantified_count,
+            percent_count=counts.percent_count,
+            has_metric=counts.has_metric,
+            keyword_hits=counts.keyword_hits,
+        )
+
+    def _phrases(self, evaluator, budget):
+        """(strength quotes, growth quotes) from the lines' cached phrase matches
+
+        Lines not scanned yet are scanned while the budget lasts; lines left
+        over are scanned by a later revision.
+        """
+        doc = self._document()
+        if self._long_sentence:
+            return evaluator.extract_good_phrases(doc, budget), evaluator.extract_growth_phrases(doc, budget)
+        offsets = [[] for _ in PHRASE_PATTERNS]
+        for line, line_start in zip(self._lines, self._line_starts):
+            if line.phrases is None:
+                if budget.spent():
+                    continue
+                line.scan_phrases()
+            for index, offset in line.phrases:
+                offsets[index].append(line_start + offset)
+        good = list(_sentences_at(doc, offsets[_GOOD]))
+        good.extend(_sentences_at(doc, offsets[_ACTION], limit=3))
+        growth = _sentences_at(doc, offsets[_WEAK])
+        return _unique(good)[:5], _unique(growth)[:3]
+
+    def evaluate(self, evaluator, resume_text, user_inputs, phrase_cpu_budget=None, timings=None):
+        """Evaluate the new version of the resume, reanalyzing only what changed
+
+        Returns the keys of evaluate_resume_text() plus 'revision', 'deltas'
+        (each score minus the one of the previous revision, None on the first)
+        and 'changes' (lines added, removed and reanalyzed).
+        """
+        timings = timings or StageTimings()
+        with timings.stage('analyze'):
+            changes = self._advance(resume_text, evaluator)
+            doc = self._document()
+
+        with timings.stage('score'):
+            evaluation = evaluator.evaluate_resume(doc, user_inputs['career_track'], user_inputs['life_stage'],
+                                                   user_inputs['dream_job'])
+
+        with timings.stage('phrases'):
+            phrase_budget = CPUBudget(phrase_cpu_budget)
+            strength_quotes, growth_quotes = self._phrases(evaluator, phrase_budget)
+        with timings.stage('feedback'):
+            personal_feedback = evaluator.generate_personal_feedback(user_inputs, evaluation, doc)
+            career_insights = evaluator.suggest_career_paths(user_inputs, doc)
+
+        deltas = self._deltas(evaluation['scores'], evaluation['total_score'])
+        return {
+            'evaluation': evaluation,
+            'strength_quotes': strength_quotes,
+            'growth_quotes': growth_quotes,
+            'personal_feedback': personal_feedback,
+            'career_insights': career_insights,
+            'partial': phrase_budget.exhausted,
+            'revision': self.revision,
+            'deltas': deltas,
+            'changes': changes
+        }
+
+    def scores(self, evaluator, resume_text, user_inputs, timings=None):
+        """Only the rubric scores of the new version, as {'scores', 'total_score', 'revision'}
+
+        Skips assembling the document, phrase extraction and feedback, so a
+        small edit costs a few line scans and the score rules.
+        """
+        timings = timings or StageTimings()
+        with timings.stage('analyze'):
+            self._advance(resume_text, evaluator)
+        with timings.stage('score'):
+            scores = evaluator.score(evaluator.features(self._counts(), user_inputs['career_track'],
+                                                        user_inputs['dream_job']))
+            total_score = sum(scores.values())
+            self._deltas(scores, total_score)
+        return {'scores': scores, 'total_score': total_score, 'revision': self.revision}
+
+    def apply_patches(self, patches):
+        """The current text with each (start, end, replacement) patch applied in turn
+
+        Offsets count code points of the text as patched so far. Raises
+        ValueError for an offset outside the text.
+        """
+        text = self.text
+        for start, end, replacement in patches:
+            if not 0 <= start <= end <= len(text):
+                raise ValueError(f"Patch range {start}-{end} is outside the text ({len(text)} characters)")
+            text = text[:start] + replacement + text[end:]
+        return text
+
+    def _advance(self, resume_text, evaluator):
+        """Start a new revision with resume_text; returns the change counts of _update()"""
+        try:
+            changes = self._update(self._normalize(resume_text), evaluator.matcher)
+        except BaseException:
+            # Never keep half-updated line states
+            self._reset(None)
+            self._normalize = LineNormalizer()
+            raise
+        self.revision += 1
+        return changes
+
+    def _deltas(self, scores, total_score):
+        """Change of every score since the previous revision (None on the first), remembering these"""
+        deltas = None
+        if self._last_scores is not None:
+            previous, previous_total = self._last_scores
+            deltas = {
+                'scores': {name: score - previous.get(name, 0) for name, score in scores.items()},
+                'total_score': total_score - previous_total
+            }
+        self._last_scores = (scores, total_score)
+        return deltas
@@ -0,0 +1,296 @@
+"""Evaluation jobs queued in SQLite and run by worker threads in every app process
+
+The queue is a single SQLite file in WAL mode, so all gunicorn workers (and
+their job threads) share it without a broker. A worker claims a job by
+taking a lease on it; while the job runs, the lease is renewed in the
+background. If the process dies, the lease runs out and the next claim puts
+the job back in the queue, so no job is lost to a crash. A job that raises is
+retried after a delay until it has run max_attempts times.
+"""
+import atexit
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlite_local import LocalConnections
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    state TEXT NOT NULL,           -- queued, running, done or failed
+    payload TEXT NOT NULL,         -- JSON
+    result TEXT,                   -- JSON, once done
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,                   -- Holder of the lease while running
+    lease_until REAL,
+    available_at REAL NOT NULL,    -- Not claimed before this time, for retry delays
+    created_at REAL NOT NULL,
+    started_at REAL,               -- Start of the latest attempt
+    finished_at REAL,
+    stages TEXT                    -- JSON {stage: seconds} of the finished attempt
+);
+CREATE INDEX IF NOT EXISTS jobs_by_state ON jobs (state, available_at);
+"""
+
+STATES = ('queued', 'running', 'done', 'failed')
+
+
+class JobError(Exception):
+    """A job failed in a way that running it again cannot fix"""
+
+
+@dataclass
+class Job:
+    """A claimed job, as handed to the handler"""
+    id: str
+    kind: str
+    payload: dict
+    attempts: int  # Including this one
+    created_at: float
+    started_at: float  # When this attempt claimed it
+
+
+class JobQueue:
+    """Persistent job queue with leases and retries
+
+    Claims run in an IMMEDIATE transaction, so two workers never take the
+    same job.
+    """
+
+    def __init__(self, path, lease_seconds=120, max_attempts=3, retry_delay=5.0, clock=time.time):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.clock = clock
+        self._connections = LocalConnections(path, SCHEMA)
+        self._db = self._connections.get
+        self._transaction = self._connections.transaction
+
+    def submit(self, job_id, kind, payload):
+        now = self.clock()
+        self._db().execute(
+            "INSERT INTO jobs (id, kind, state, payload, available_at, created_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+            (job_id, kind, json.dumps(payload), now, now))
+        return job_id
+
+    def claim(self, worker):
+        """Lease the oldest job that is ready to run, or return None
+
+        Jobs whose lease ran out are queued again first; their worker is
+        presumed dead. The handler sees them with attempts past max_attempts
+        once they have been interrupted too often.
+        """
+        now = self.clock()
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET state = 'queued', worker = NULL, lease_until = NULL, "
+                       "error = 'The worker running this job stopped' "
+                       "WHERE state = 'running' AND lease_until < ?", (now,))
+            row = db.execute("SELECT id, kind, payload, attempts, created_at FROM jobs "
+                             "WHERE state = 'queued' AND available_at <= ? ORDER BY available_at LIMIT 1",
+                             (now,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET state = 'running', worker = ?, lease_until = ?, started_at = ?, "
+                       "attempts = attempts + 1 WHERE id = ?", (worker, now + self.lease_seconds, now, row['id']))
+        return Job(row['id'], row['kind'], json.loads(row['payload']), row['attempts'] + 1, row['created_at'],
+                   now)
+
+    def renew(self, job_id, worker):
+        """Extend the lease of a running job; False if this worker no longer holds it"""
+        cursor = self._db().execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND state = 'running'",
+                                    (self.clock() + self.lease_seconds, job_id, worker))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker, result, stages=None):
+        """Store the result of a job; False if the lease was lost and another worker owns it now"""
+        cursor = self._db().execute(
+            "UPDATE jobs SET state = 'done', result = ?, error = NULL, worker = NULL, lease_until = NULL, "
+            "finished_at = ?, stages = ? WHERE id = ? AND worker = ? AND state = 'running'",
+            (json.dumps(result), self.clock(), json.dumps(stages or {}), job_id, worker))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, worker, error, retry=True, stages=None):
+        """Record a failed attempt; returns the new state, or None if the lease was lost
+
+        With retry and attempts left the job is queued again after
+        retry_delay seconds per attempt so far; otherwise it is failed for good.
+        """
+        now = self.clock()
+        with self._transaction() as db:
+            row = db.execute("SELECT attempts FROM jobs WHERE id = ? AND worker = ? AND state = 'running'",
+                             (job_id, worker)).fetchone()
+            if row is None:
+                return None
+            if retry and row['attempts'] < self.max_attempts:
+                db.execute("UPDATE jobs SET state = 'queued', error = ?, worker = NULL, lease_until = NULL, "
+                           "available_at = ? WHERE id = ?", (error, now + self.retry_delay * row['attempts'], job_id))
+                return 'queued'
+            db.execute("UPDATE jobs SET state = 'failed', error = ?, worker = NULL, lease_until = NULL, "
+                       "finished_at = ?, stages = ? WHERE id = ?", (error, now, json.dumps(stages or {}), job_id))
+            return 'failed'
+
+    def get(self, job_id):
+        """A job's state, timing and result as a JSON-serializable dict, or None"""
+        row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        started, finished = row['started_at'], row['finished_at']
+        return {
+            'job_id': row['id'],
+            'kind': row['kind'],
+            'status': row['state'],
+            'attempts': row['attempts'],
+            'created_at': row['created_at'],
+            'started_at': started,
+            'finished_at': finished,
+            'queue_seconds': started - row['created_at'] if started is not None else None,
+            'run_seconds': finished - started if started is not None and finished is not None else None,
+            'stages': json.loads(row['stages']) if row['stages'] else None,
+            'error': row['error'],
+            'result': json.loads(row['result']) if row['result'] is not None else None,
+        }
+
+    def counts(self):
+        """Number of jobs in each state"""
+        counts = dict.fromkeys(STATES, 0)
+        for state, count in self._db().execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"):
+            counts[state] = count
+        return counts
+
+    def purge(self, older_than):
+        """Delete jobs that finished more than older_than seconds ago; returns their ids"""
+        cutoff = self.clock() - older_than
+        with self._transaction() as db:
+            ids = [row['id'] for row in db.execute(
+                "SELECT id FROM jobs WHERE state IN ('done', 'failed') AND finished_at < ?", (cutoff,))]
+            db.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in ids])
+        return ids
+
+
+class JobWorkerPool:
+    """Threads that claim jobs from a JobQueue and run them through handler(job)
+
+    handler returns (result, stages) where stages maps stage names to
+    seconds. Raising JobError fails the job for good; any other exception
+    uses up one attempt. on_finish(job, state, run_seconds) is called after
+    every attempt, with state 'done', 'queued' (to be retried) or 'failed'.
+    Finished jobs older than retention seconds are purged now and then and
+    on_purge(ids) is called with their ids.
+
+    Threads are started lazily in the process that first calls start(), so
+    a gunicorn master that preloads the app never forks them.
+    """
+
+    def __init__(self, queue, handler, threads=2, poll_interval=0.5, retention=None, on_finish=None,
+                 on_purge=None, logger=None):
+        self.queue = queue
+        self.handler = handler
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.on_finish = on_finish
+        self.on_purge = on_purge
+        self.logger = logger or logging.getLogger(__name__)
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._running = {}  # Job id -> worker name, for lease renewal
+        self._purged = 0.0
+        atexit.register(self.close)
+
+    def start(self):
+        if self._pid == os.getpid() or self.threads <= 0:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self._running = {}
+            prefix = f'{socket.gethostname()}:{self._pid}'
+            for number in range(self.threads):
+                threading.Thread(target=self._work, args=(f'{prefix}:{number}',), name=f'job-worker-{number}',
+                                 daemon=True).start()
+            threading.Thread(target=self._renew_leases, name='job-leases', daemon=True).start()
+
+    def wake(self):
+        """Have an idle worker of this process look for jobs now instead of at its next poll"""
+        self._wake.set()
+
+    def _work(self, worker):
+        stop = self._stop
+        while not stop.is_set():
+            try:
+                job = self.queue.claim(worker)
+            except sqlite3.Error:
+                self.logger.exception("Could not claim a job")
+                job = None
+            if job is None:
+                self._maintain()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            try:
+                self._run(job, worker)
+            except Exception:
+                # complete(), fail() or on_finish() raised; the job's lease runs out and it is run again
+                self.logger.exception("Could not finish job %s", job.id)
+
+    def _run(self, job, worker):
+        self._running[job.id] = worker
+        start = time.perf_counter()
+        try:
+            if job.attempts > self.queue.max_attempts:
+                raise JobError("The job was interrupted too many times")
+            result, stages = self.handler(job)
+            state = 'done' if self.queue.complete(job.id, worker, result, stages) else None
+        except JobError as e:
+            state = self.queue.fail(job.id, worker, str(e), retry=False)
+        except Exception as e:
+            self.logger.exception("Job %s failed on attempt %d", job.id, job.attempts)
+            state = self.queue.fail(job.id, worker, f"{type(e).__name__}: {e}")
+        finally:
+            self._running.pop(job.id, None)
+        if state is None:
+            self.logger.warning("Job %s lost its lease to another worker; its result was dropped", job.id)
+        elif self.on_finish is not None:
+            self.on_finish(job, state, time.perf_counter() - start)
+
+    def _renew_leases(self):
+        stop = self._stop
+        while not stop.wait(self.queue.lease_seconds / 3):
+            for job_id, worker in list(self._running.items()):
+                try:
+                    self.queue.renew(job_id, worker)
+                except sqlite3.Error:
+                    self.logger.exception("Could not renew the lease of job %s", job_id)
+
+    def _maintain(self):
+        """Purge old jobs, at most hourly per process"""
+        if self.retention is None or time.monotonic() - self._purged < 3600:
+            return
+        self._purged = time.monotonic()
+        try:
+            ids = self.queue.purge(self.retention)
+        except sqlite3.Error:
+            self.logger.exception("Could not purge old jobs")
+            return
+        if ids and self.on_purge is not None:
+            try:
+                self.on_purge(ids)
+            except Exception:
+                self.logger.exception("Could not clean up after purged jobs")
+
+    def close(self):
+        """Stop taking jobs; jobs still running are retried elsewhere once their lease runs out"""
+        self._stop.set()
+        self._wake.set()
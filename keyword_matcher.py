@@ -0,0 +1,138 @@
+import re
+from collections import Counter, deque
+from types import MappingProxyType
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Split text into casefolded word tokens"""
+    return TOKEN_RE.findall(text.casefold())
+
+
+class KeywordHits:
+    """Per-category keyword hit counts produced by a single KeywordMatcher scan"""
+
+    def __init__(self, by_category, counts=None):
+        self._by_category = by_category
+        self.counts = counts if counts is not None else {}  # Occurrences of every keyword found
+
+    def __getitem__(self, category):
+        return self._by_category[category]
+
+    def distinct(self, category):
+        """Number of different keywords from the category that were found"""
+        return len(self._by_category[category])
+
+    def total(self, category):
+        """Total number of keyword occurrences from the category"""
+        return sum(self._by_category[category].values())
+
+    def found(self, category):
+        """Whether any keyword from the category was found"""
+        return bool(self._by_category[category])
+
+    def categories(self):
+        return self._by_category.keys()
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over word tokens for every rubric keyword list
+
+    Keywords are matched as whole words (multi-word keywords as whole phrases),
+    so "led" no longer matches inside "called". A plural "s"/"es" on the last
+    word still counts as the keyword itself. All categories are counted in one
+    pass over the token stream.
+    """
+
+    def __init__(self, categories):
+        self.categories = {}
+        self._goto = [{}]
+        self._fail = [0]
+        self._outputs = [()]
+
+        keywords = {}
+        for category, words in categories.items():
+            normalized = []
+            for word in words:
+                tokens = tuple(tokenize(word))
+                if not tokens:
+                    raise ValueError(f"Keyword {word!r} in {category!r} has no word characters")
+                keyword = ' '.join(tokens)
+                keywords[keyword] = tokens
+                normalized.append(keyword)
+            self.categories[category] = tuple(dict.fromkeys(normalized))
+
+        for keyword, tokens in keywords.items():
+            self._add(keyword, tokens)
+        for keyword, tokens in keywords.items():
+            for suffix in ('s', 'es'):
+                plural = tokens[:-1] + (tokens[-1] + suffix,)
+                if ' '.join(plural) not in keywords:
+                    self._add(keyword, plural)
+        self._link()
+        self._keyword_categories = {}
+        for category, category_keywords in self.categories.items():
+            for keyword in category_keywords:
+                self._keyword_categories.setdefault(keyword, []).append(category)
+
+    def _add(self, keyword, tokens):
+        state = 0
+        for token in tokens:
+            nxt = self._goto[state].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append(())
+            state = nxt
+        if keyword not in self._outputs[state]:
+            self._outputs[state] = self._outputs[state] + (keyword,)
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._outputs[nxt] = self._outputs[nxt] + self._outputs[self._fail[nxt]]
+
+    def count(self, tokens):
+        """Count every keyword occurrence in a sequence of tokens"""
+        return self.advance(tokens)[1]
+
+    def advance(self, tokens, state=0):
+        """Run the automaton over tokens from state; returns (end state, keyword counts)
+
+        Feeding a token stream piece by piece, each piece starting from the
+        previous piece's end state, counts the same keywords as one pass.
+        """
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        counts = Counter()
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if outputs[state]:
+                counts.update(outputs[state])
+        return state, counts
+
+    def hits(self, counts):
+        """Group raw keyword counts into per-category hits"""
+        by_category = {category: {} for category in self.categories}
+        for keyword, count in counts.items():
+            if count:
+                for category in self._keyword_categories.get(keyword, ()):
+                    by_category[category][keyword] = count
+        by_category = {category: MappingProxyType(hits) for category, hits in by_category.items()}
+        return KeywordHits(MappingProxyType(by_category), MappingProxyType(counts))
+
+    def scan(self, tokens):
+        """Scan a token sequence once and return hits for every category"""
+        return self.hits(self.count(tokens))
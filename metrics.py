@@ -0,0 +1,318 @@
+import atexit
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# fcntl is POSIX only; without it snapshots of exited workers are never compacted
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000, 1_000_000)
+EXITED_SNAPSHOT = 'exited.json'  # Counters and histograms of every process that has exited
+
+
+class StageTimings:
+    """Wall-clock time spent in each named stage of one request
+
+    Stages may nest; an outer stage is only charged for the time not spent in
+    its inner stages, so the stages add up to the time they cover.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}  # Stage name -> seconds, in the order first seen
+        self._open = []  # Time spent in inner stages, per open stage
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        self._open.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            inner = self._open.pop()
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed - inner
+            if self._open:
+                self._open[-1] += elapsed
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Value for a Server-Timing header, durations in milliseconds"""
+        parts = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.stages.items()]
+        parts.append(f'total;dur={self.elapsed() * 1000:.2f}')
+        return ', '.join(parts)
+
+
+def _label_key(labels):
+    """Prometheus label set text, e.g. 'stage="pdf"'; labels are (name, value) pairs"""
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels)
+
+
+def _merge(counters, histograms, snapshot):
+    """Add a snapshot's counters and histograms into the merged dicts"""
+    for name, values in snapshot['counters'].items():
+        merged = counters.setdefault(name, {})
+        for key, value in values.items():
+            merged[key] = merged.get(key, 0) + value
+    for name, series in snapshot['histograms'].items():
+        merged = histograms.setdefault(name, {})
+        for key, counts in series.items():
+            if key in merged:
+                merged[key] = [a + b for a, b in zip(merged[key], counts)]
+            else:
+                merged[key] = list(counts)
+
+
+def _snapshot_alive(name):
+    """Whether the process that writes the snapshot <pid>-<start>.json is running
+
+    Any snapshot with our own pid other than our own file was left by an
+    earlier process that had the same pid.
+    """
+    try:
+        pid = int(name.split('-')[0])
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (ValueError, PermissionError):
+        return True
+    return pid != os.getpid()
+
+
+class MetricsRegistry:
+    """Counters and histograms shared by every worker process through snapshot files
+
+    Each process keeps its own values in memory and writes them to
+    <directory>/<pid>-<start>.json at most every flush_interval seconds (and
+    at exit). Rendering merges every snapshot in the directory with this
+    process's live values, so whichever gunicorn worker answers /metrics
+    reports totals for all of them. collect() folds the counters and
+    histograms of exited workers into one exited.json and deletes their
+    snapshots, so counters never go backwards and the directory does not
+    grow with every restart; their gauges are dropped. Compaction holds an
+    exclusive lock file, and collect() otherwise reads under a shared one.
+    """
+
+
+    def __init__(self, directory, flush_interval=1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._definitions = {}  # name -> (type, help, buckets)
+        self._counters = {}  # name -> {label key: value}
+        self._histograms = {}  # name -> {label key: [bucket counts..., sum, count]}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self._path = None
+        self._flushed = 0.0
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(self.flush, force=True)
+
+    def counter(self, name, help_text):
+        self._definitions[name] = ('counter', help_text, None)
+
+    def histogram(self, name, help_text, buckets):
+        self._definitions[name] = ('histogram', help_text, tuple(buckets))
+
+    def gauge(self, name, help_text):
+        """A value set only by collectors and summed over processes, such as a per-worker queue depth"""
+        self._definitions[name] = ('gauge', help_text, None)
+
+    def add_collector(self, collect):
+        """Register collect() -> {(counter or gauge name, labels): value} for values kept elsewhere
+
+        Used for counters another object already maintains, such as cache hits,
+        and for gauges. Gauge values are stored with the counters in snapshots.
+        """
+        self._collectors.append(collect)
+
+    def inc(self, name, labels=(), amount=1):
+        self._own_path()
+        key = _label_key(labels)
+        with self._lock:
+            values = self._counters.setdefault(name, {})
+            values[key] = values.get(key, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        self._own_path()
+        buckets = self._definitions[name][2]
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            counts = series.get(key)
+            if counts is None:
+                counts = series[key] = [0] * (len(buckets) + 3)
+            counts[bisect.bisect_left(buckets, value)] += 1  # Index len(buckets) is +Inf
+            counts[-2] += value
+            counts[-1] += 1
+
+    def snapshot(self):
+        """This process's values as a JSON-serializable dict"""
+        with self._lock:
+            counters = {name: dict(values) for name, values in self._counters.items()}
+            histograms = {name: {key: list(counts) for key, counts in series.items()}
+                          for name, series in self._histograms.items()}
+        for collect in self._collectors:
+            for (name, labels), value in collect().items():
+                values = counters.setdefault(name, {})
+                key = _label_key(labels)
+                values[key] = values.get(key, 0) + value
+        return {'counters': counters, 'histograms': histograms}
+
+    def _own_path(self):
+        if self._pid != os.getpid():
+            # A forked worker must not overwrite the snapshot of its parent
+            with self._lock:
+                self._pid = os.getpid()
+                self._path = os.path.join(self.directory, f'{self._pid}-{time.time_ns()}.json')
+                self._counters = {}
+                self._histograms = {}
+        return self._path
+
+    def flush(self, force=False):
+        """Write this process's snapshot if flush_interval has passed since the last write"""
+        now = time.monotonic()
+        if not force and now - self._flushed < self.flush_interval:
+            return
+        self._flushed = now
+        path = self._own_path()
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def collect(self):
+        """Merged values of every process that has written a snapshot, plus this one live"""
+        own_path = self._own_path()
+        counters = {}
+        histograms = {}
+        _merge(counters, histograms, self.snapshot())
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    fcntl.flock(lock_file, fcntl.LOCK_SH)  # Another worker is reading or compacting
+                else:
+                    self._compact(own_path)
+            exited = self._read(EXITED_SNAPSHOT) or {}
+            merged_names = set(exited.get('merged', ()))
+            if exited:
+                _merge(counters, histograms, exited)
+            for entry in os.scandir(self.directory):
+                if (not entry.name.endswith('.json') or entry.path == own_path or entry.name == EXITED_SNAPSHOT
+                        or entry.name in merged_names):
+                    continue
+                snapshot = self._read(entry.name)
+                if snapshot is None:
+                    continue
+                if not _snapshot_alive(entry.name):
+                    snapshot['counters'] = self._without_gauges(snapshot['counters'])
+                _merge(counters, histograms, snapshot)
+        return counters, histograms
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _without_gauges(self, counters):
+        return {name: values for name, values in counters.items()
+                if self._definitions.get(name, ('counter',))[0] != 'gauge'}
+
+    def _compact(self, own_path):
+        """Fold the snapshots of exited processes into exited.json, under the exclusive lock
+
+        exited.json lists the snapshots it last absorbed, so if this process
+        dies before deleting them they are deleted, not counted again, next time.
+        """
+        exited = self._read(EXITED_SNAPSHOT) or {'counters': {}, 'histograms': {}, 'merged': []}
+        for name in exited.get('merged', ()):
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+        names = [entry.name for entry in os.scandir(self.directory)
+                 if entry.name.endswith('.json') and entry.path != own_path and entry.name != EXITED_SNAPSHOT
+                 and not _snapshot_alive(entry.name)]
+        if not names:
+            return
+        merged = []
+        for name in names:
+            snapshot = self._read(name)
+            if snapshot is not None:
+                _merge(exited['counters'], exited['histograms'],
+                       {'counters': self._without_gauges(snapshot['counters']),
+                        'histograms': snapshot['histograms']})
+            merged.append(name)
+        exited['merged'] = merged
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(exited, f)
+            os.replace(tmp_path, os.path.join(self.directory, EXITED_SNAPSHOT))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        for name in merged:
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def render(self, gauges=None):
+        """Prometheus text exposition of the merged metrics
+
+        gauges is an optional function taking the merged counters and returning
+        {name: (help, {labels: value})} for values derived from them.
+        """
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in self._definitions.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind in ('counter', 'gauge'):
+                for key, value in sorted(counters.get(name, {}).items()):
+                    lines.append(f'{name}{{{key}}} {value}' if key else f'{name} {value}')
+                continue
+            for key, counts in sorted(histograms.get(name, {}).items()):
+                prefix = key + ',' if key else ''
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+                suffix = f'{{{key}}}' if key else ''
+                lines.append(f'{name}_sum{suffix} {counts[-2]}')
+                lines.append(f'{name}_count{suffix} {counts[-1]}')
+        if gauges is not None:
+            for name, (help_text, values) in gauges(counters).items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} gauge')
+                for labels, value in values.items():
+                    key = _label_key(labels)
+                    lines.append(f'{name}{{{key}}} {value}' if key else f'{name} {value}')
+        return '\n'.join(lines) + '\n'
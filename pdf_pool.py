@@ -0,0 +1,167 @@
+import atexit
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+from pdf_text import UNREADABLE_PDF, PdfParseError, extract_pdf_text
+
+# resource is POSIX only; elsewhere workers run without rlimits
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def _limit_cpu(cpu_seconds):
+    """Let the current process use at most cpu_seconds more CPU time
+
+    RLIMIT_CPU counts the whole life of the process, so the soft limit is set
+    to the CPU already used plus the allowance. A runaway parse gets SIGXCPU
+    and the worker dies.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime + cpu_seconds)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn, memory_bytes):
+    """Parse loop of one worker process: receive a task, send back a result"""
+    if resource is not None and memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        path, max_pages, max_chars, cpu_seconds = task
+        try:
+            if resource is not None and cpu_seconds:
+                _limit_cpu(cpu_seconds)
+            with open(path, 'rb') as f:
+                result = ('ok', extract_pdf_text(f, max_pages, max_chars))
+        except MemoryError:
+            result = ('memory', None)
+        except Exception as e:
+            result = ('error', f"{type(e).__name__}: {e}")
+        conn.send(result)
+
+
+class _Worker:
+    """One parse process and the private pipe used to talk to it"""
+
+    def __init__(self, context, memory_bytes):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_bytes), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def stop(self):
+        self.process.kill()
+        self.process.join(1)
+        self.conn.close()
+
+
+class PdfParsePool:
+    """Persistent pool of worker processes that parse PDFs off the request thread
+
+    Every worker has its own pipe, so a worker that dies or hangs can be killed
+    and replaced without affecting the others. A request waits for a free
+    worker and for its result against one deadline. Workers run under an
+    address-space rlimit and a per-parse CPU rlimit, and are recycled after
+    maxtasksperchild parses.
+
+    Workers are started lazily in the process that first uses the pool, so a
+    gunicorn master that preloads the app never forks live pool workers.
+    """
+
+    def __init__(self, processes=2, timeout=10, cpu_seconds=10, memory_bytes=512 * 1024 * 1024,
+                 maxtasksperchild=100):
+        self.processes = processes
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.maxtasksperchild = maxtasksperchild
+        self.replaced = 0  # Workers killed after a crash, timeout or error
+        self._context = multiprocessing.get_context('spawn')
+        self._free = None
+        self._workers = []
+        self._pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _start(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked from a process that already had workers: those belong to the parent
+                self._free = queue.Queue()
+                self._workers = []
+                for _ in range(self.processes):
+                    self._spawn()
+                self._pid = os.getpid()
+
+    def _spawn(self):
+        worker = _Worker(self._context, self.memory_bytes)
+        self._workers.append(worker)
+        self._free.put(worker)
+
+    def _release(self, worker, healthy):
+        if healthy and worker.tasks < self.maxtasksperchild:
+            self._free.put(worker)
+            return
+        worker.stop()
+        with self._lock:
+            self._workers.remove(worker)
+            if not healthy:
+                self.replaced += 1
+            self._spawn()
+
+    def extract(self, path, max_pages=None, max_chars=None):
+        """Parse the PDF at path in a worker, giving up after timeout seconds"""
+        self._start()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                worker = self._free.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                raise PdfParseError("The server is busy reading other PDFs. Please try again or paste your resume text.")
+            if worker.process.is_alive():
+                break
+            self._release(worker, healthy=False)  # Died while idle
+
+        healthy = False
+        try:
+            worker.tasks += 1
+            worker.conn.send((path, max_pages, max_chars, self.cpu_seconds))
+            if not worker.conn.poll(max(deadline - time.monotonic(), 0)):
+                raise PdfParseError("Your PDF took too long to read. Please upload a shorter PDF or paste your resume text.")
+            status, payload = worker.conn.recv()
+            # A worker that hit its memory limit is replaced rather than reused
+            healthy = status != 'memory'
+        except (EOFError, OSError):
+            # The worker died mid-parse, e.g. killed by its CPU limit
+            raise PdfParseError(UNREADABLE_PDF)
+        finally:
+            self._release(worker, healthy)
+
+        if status == 'memory':
+            raise PdfParseError("Your PDF is too large to read. Please upload a smaller PDF or paste your resume text.")
+        if status != 'ok':
+            raise PdfParseError(UNREADABLE_PDF)
+        return payload
+
+    def close(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                for worker in self._workers:
+                    worker.stop()
+            self._workers = []
+            self._pid = None
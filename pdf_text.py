@@ -0,0 +1,220 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# Try to import PyPDF2, but make it optional
+try:
+    from PyPDF2 import PdfReader
+    PDF_SUPPORT = True
+except ImportError:
+    PDF_SUPPORT = False
+
+# fcntl is POSIX only; without it eviction is simply not coordinated between processes
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+UNREADABLE_PDF = "We couldn't read that PDF. Please check the file or paste your resume text."
+
+
+class PdfParseError(Exception):
+    """A PDF could not be parsed, or not within the parse pool's time and resource limits"""
+
+
+class PdfTextCache:
+    """On-disk store of extracted PDF text keyed by the SHA-256 of the PDF bytes
+
+    Entries are written to a temporary file and renamed into place, so readers
+    in other processes only ever see complete files. Reading an entry bumps its
+    modification time, and once the store grows past max_bytes the least
+    recently used files are removed. Eviction holds an exclusive lock file so
+    only one gunicorn worker prunes at a time.
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, evict_every=32):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.txt')
+
+    def get(self, key):
+        """Return the cached text for a PDF key, or None"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8', errors='surrogatepass') as f:
+                text = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # Evicted by another worker after we read it
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, key, text):
+        """Atomically store the text extracted from a PDF"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', errors='surrogatepass') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the store fits in max_bytes"""
+        lock_path = os.path.join(self.directory, '.evict.lock')
+        with open(lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return  # Another worker is already evicting
+            entries = []
+            total = 0
+            for shard in os.scandir(self.directory):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if not entry.name.endswith('.txt'):
+                        continue  # Skip files another worker is still writing
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            # Prune to 90% so a busy store does not evict on every write
+            target = self.max_bytes * 0.9
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+@dataclass
+class PdfExtraction:
+    """Text pulled from a PDF plus how much of the document it covers"""
+    text: str
+    pages_read: int = 0
+    page_count: Optional[int] = None
+    truncated: bool = False
+    from_cache: bool = False
+    page_timings: List[float] = field(default_factory=list)  # Seconds spent on each page read
+
+
+def extract_pdf_text(stream, max_pages=None, max_chars=None):
+    """Extract page text in order, stopping at the page or character cap
+
+    Pages are parsed one at a time and collected in a list joined once at the
+    end, so a 200-page PDF only costs the pages that fit under the caps.
+    """
+    reader = PdfReader(stream)
+    page_count = len(reader.pages)
+    parts = []
+    timings = []
+    chars = 0
+    truncated = False
+    for index, page in enumerate(reader.pages):
+        if max_pages is not None and index >= max_pages:
+            truncated = True
+            break
+        start = time.perf_counter()
+        text = page.extract_text() or ''
+        timings.append(time.perf_counter() - start)
+        if max_chars is not None and chars + len(text) >= max_chars:
+            parts.append(text[:max_chars - chars])
+            truncated = chars + len(text) > max_chars or index + 1 < page_count
+            break
+        parts.append(text)
+        chars += len(text) + 1
+
+    return PdfExtraction(
+        text='\n'.join(parts),
+        pages_read=len(timings),
+        page_count=page_count,
+        truncated=truncated,
+        page_timings=timings,
+    )
+
+
+def read_pdf_upload(file, cache=None, max_pages=None, max_chars=None, pool=None, spool_dir=None):
+    """Extract an uploaded PDF, reusing the text of an identical earlier upload
+
+    The upload is hashed in chunks and then handed to PyPDF2 as the same
+    seekable stream, so the PDF bytes are never copied into memory. With a
+    PdfParsePool the upload is spooled to a file in spool_dir and parsed in a
+    worker process instead of the request thread.
+    """
+    stream = file.stream if hasattr(file, 'stream') else file
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(64 * 1024), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    # The caps are part of the key so a config change never serves differently capped text
+    key = f'{digest.hexdigest()}-p{max_pages}-c{max_chars}'
+
+    if cache is not None:
+        text = cache.get(key)
+        if text is not None:
+            return PdfExtraction(text=text, from_cache=True)
+
+    if pool is None:
+        # PyPDF2 raises all sorts of exceptions on malformed files, as it does in a pool worker
+        try:
+            extraction = extract_pdf_text(stream, max_pages, max_chars)
+        except MemoryError:
+            raise PdfParseError("Your PDF is too large to read. Please upload a smaller PDF or paste your resume text.")
+        except Exception as e:
+            raise PdfParseError(UNREADABLE_PDF) from e
+    else:
+        spooled = tempfile.NamedTemporaryFile(dir=spool_dir, suffix='.pdf', delete=False)
+        try:
+            with spooled:
+                shutil.copyfileobj(stream, spooled)
+            extraction = pool.extract(spooled.name, max_pages, max_chars)
+        finally:
+            os.unlink(spooled.name)
+
+    if cache is not None:
+        cache.put(key, extraction.text)
+    return extraction
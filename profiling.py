@@ -0,0 +1,130 @@
+"""Profile single requests on demand, gated by an HMAC-signed token
+
+A request is run under cProfile only when it carries a valid token in the
+X-Profile-Token header or the _profile query parameter. A token is
+"<unix time>.<hex HMAC-SHA256 of '<unix time>:<path>'>" made with the
+configured secret, so it only works for one path and expires after max_age
+seconds. Print one with:
+
+    RESUME_PROFILE_SECRET=... python profiling.py /evaluate
+"""
+import cProfile
+import hashlib
+import hmac
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import parse_qs
+
+HEADER = 'HTTP_X_PROFILE_TOKEN'
+QUERY_PARAM = '_profile'
+
+
+def sign(secret, timestamp, path):
+    message = f'{timestamp}:{path}'.encode('utf-8')
+    return hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+def profile_token(secret, path, now=None):
+    """A token that enables profiling of one request to path"""
+    timestamp = int(time.time() if now is None else now)
+    return f'{timestamp}.{sign(secret, timestamp, path)}'
+
+
+def verify_token(secret, token, path, max_age, now=None):
+    """Whether token is a signature of path by secret that is at most max_age seconds old"""
+    timestamp, _, signature = token.partition('.')
+    if not timestamp.isdigit() or not signature:
+        return False
+    now = time.time() if now is None else now
+    if abs(now - int(timestamp)) > max_age:
+        return False
+    return hmac.compare_digest(signature, sign(secret, int(timestamp), path))
+
+
+class ProfilingMiddleware:
+    """WSGI middleware running token-carrying requests under cProfile
+
+    The stats of each profiled request go to <directory>/<request id>.pstats
+    and the top functions by cumulative time are logged. The request id is
+    returned in an X-Profile-Id response header. Requests without a token only
+    pay for one environ lookup; with no secret configured, do not install the
+    middleware at all. One request per process is profiled at a time; others
+    that arrive meanwhile run normally.
+    """
+
+    def __init__(self, app, secret, directory, top=25, max_age=300, logger=None):
+        if not secret:
+            raise ValueError("ProfilingMiddleware needs a secret")
+        self.app = app
+        self.secret = secret
+        self.directory = directory
+        self.top = top
+        self.max_age = max_age
+        self.logger = logger or logging.getLogger(__name__)
+        self._busy = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _token(self, environ):
+        token = environ.get(HEADER)
+        if token is None and QUERY_PARAM in environ.get('QUERY_STRING', ''):
+            token = parse_qs(environ['QUERY_STRING']).get(QUERY_PARAM, [None])[0]
+        return token
+
+    def __call__(self, environ, start_response):
+        token = self._token(environ)
+        if token is None:
+            return self.app(environ, start_response)
+
+        path = environ.get('PATH_INFO', '')
+        if not verify_token(self.secret, token, path, self.max_age):
+            self.logger.warning("Rejected profiling token for %s", path)
+            return self.app(environ, start_response)
+        if not self._busy.acquire(blocking=False):
+            self.logger.info("Profiler busy; serving %s without profiling", path)
+            return self.app(environ, start_response)
+        try:
+            return self._profile(environ, start_response, path)
+        finally:
+            self._busy.release()
+
+    def _profile(self, environ, start_response, path):
+        request_id = uuid.uuid4().hex
+
+        def start_with_id(status, headers, exc_info=None):
+            return start_response(status, headers + [('X-Profile-Id', request_id)], exc_info)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            # Consume the body inside the profiler so streamed responses are covered too
+            result = self.app(environ, start_with_id)
+            try:
+                body = list(result)
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            stats_path = os.path.join(self.directory, f'{request_id}.pstats')
+            profiler.dump_stats(stats_path)
+            summary = io.StringIO()
+            pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(self.top)
+            self.logger.warning("Profiled %s %s in %.3fs (request id %s, stats in %s)\n%s",
+                                environ.get('REQUEST_METHOD'), path, elapsed, request_id, stats_path,
+                                summary.getvalue())
+        return body
+
+
+if __name__ == '__main__':
+    secret = os.environ.get('RESUME_PROFILE_SECRET')
+    if not secret or len(sys.argv) != 2:
+        sys.exit("usage: RESUME_PROFILE_SECRET=... python profiling.py <path>")
+    print(profile_token(secret, sys.argv[1]))
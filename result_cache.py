@@ -0,0 +1,98 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def evaluation_key(resume_text, career_track, life_stage, dream_job, rubric_version=None):
+    """Content hash identifying one evaluation request under one rubric version
+
+    resume_text should already be in the canonical form from
+    text_normalize.normalize_text(), so texts that differ only in layout
+    details share a key.
+    """
+    digest = hashlib.sha256()
+    for part in (resume_text, career_track, life_stage, dream_job, rubric_version):
+        digest.update((part or '').encode('utf-8', 'surrogatepass'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class EvaluationCache:
+    """Thread-safe LRU cache of finished evaluations with a time-to-live
+
+    A max_entries of 0 disables caching; every lookup is then a miss. With
+    sizeof, a function giving the size of a value when it is put, the cache
+    also keeps the total size of its entries within max_size.
+    """
+
+    def __init__(self, max_entries=256, ttl=600, clock=time.monotonic, max_size=None, sizeof=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # Key -> (expires, value, size)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached result for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value, size = entry
+                if expires > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self._size -= size
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Store a result, evicting the least recently used entries over the bounds
+
+        A value larger than max_size on its own is not kept, and replaces
+        nothing but an earlier entry for its key.
+        """
+        if self.max_entries <= 0:
+            return
+        size = self.sizeof(value) if self.sizeof is not None else 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[2]
+            if self.max_size is not None and size > self.max_size:
+                return
+            self._entries[key] = (self.clock() + self.ttl, value, size)
+            self._size += size
+            while len(self._entries) > self.max_entries or (self.max_size is not None and self._size > self.max_size):
+                self._size -= self._entries.popitem(last=False)[1][2]
+
+    def discard(self, key):
+        """Drop the entry for key, if there is one"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """Entry count and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'size': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,101 @@
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+from keyword_matcher import KeywordHits, TOKEN_RE
+
+# Sentence ends and line breaks, except a period between two digits such as "3.5"
+SENTENCE_BREAK_RE = re.compile(r'[!?\n]|(?<!\d)\.|\.(?!\d)')
+# Numbers only start at the beginning of a digit run and are bounded, so a long
+# string of digits cannot cause backtracking
+QUANTIFIED_RE = re.compile(r'(?<!\d)(?:\d{1,12}%|\d{1,12}\s{0,3}percent|\d{1,12}\s{0,3}(people|team|members|clients|customers))|\$[\d,]{1,20}', re.IGNORECASE)
+PERCENT_RE = re.compile(r'(?<!\d)(?:\d{1,12}%|\d{1,12}\s{0,3}percent)')
+METRIC_RE = re.compile(r'(?<!\d)(?:\d{1,12}%|\d{1,12}\s{0,3}percent)|\$[\d,]{1,20}')
+PHONE_RE = re.compile(r'(?<!\d)(?:\(?\d{3}\)?[ .-]?\d{3}[ .-]?\d{4}|\+\d{1,3}[ .-]?\d)')
+
+
+@dataclass(frozen=True)
+class ResumeDocument:
+    """Read-only analysis of a resume, built once per request and shared by every scorer"""
+    text: str
+    lower: str
+    tokens: frozenset
+    sentence_spans: Tuple[Tuple[int, int], ...]
+    sentence_starts: Tuple[int, ...]
+    has_bullet_marker: bool
+    contact: Mapping[str, bool]
+    quantified_count: int
+    percent_count: int
+    has_metric: bool
+    keyword_hits: Optional[KeywordHits]
+
+    @classmethod
+    def from_text(cls, text, matcher=None):
+        """Scan the resume text once and precompute everything the scorers need"""
+        lower = text.casefold()
+        token_list = TOKEN_RE.findall(lower)
+
+        sentence_spans = []
+        start = 0
+        for m in SENTENCE_BREAK_RE.finditer(text):
+            sentence_spans.append((start, m.start()))
+            start = m.end()
+        sentence_spans.append((start, len(text)))
+
+        contact = {
+            'email': '@' in text,
+            'phone': PHONE_RE.search(text) is not None,
+        }
+
+        return cls(
+            text=text,
+            lower=lower,
+            tokens=frozenset(token_list),
+            sentence_spans=tuple(sentence_spans),
+            sentence_starts=tuple(start for start, _ in sentence_spans),
+            has_bullet_marker='•' in text or '-' in text or '*' in text,
+            contact=MappingProxyType(contact),
+            quantified_count=len(QUANTIFIED_RE.findall(text)),
+            percent_count=len(PERCENT_RE.findall(text)),
+            has_metric=METRIC_RE.search(text) is not None,
+            keyword_hits=matcher.scan(token_list) if matcher is not None else None,
+        )
+
+    @property
+    def sentences(self):
+        """Sentence strings in document order"""
+        return [self.text[start:end] for start, end in self.sentence_spans]
+
+    def chunks(self, size):
+        """Split the text into (start, end) ranges of about size characters
+
+        Ranges are cut at sentence starts where possible, so a match that stays
+        inside one sentence is never split between two ranges.
+        """
+        starts = self.sentence_starts
+        pos, length = 0, len(self.text)
+        while pos < length:
+            end = pos + size
+            if end >= length:
+                yield pos, length
+                return
+            cut = starts[bisect_right(starts, end) - 1]
+            if cut <= pos:
+                cut = end
+            yield pos, cut
+            pos = cut
+
+    def sentence_at(self, offset):
+        """Return the sentence containing a character offset"""
+        index = max(bisect_right(self.sentence_starts, offset) - 1, 0)
+        start, end = self.sentence_spans[index]
+        return self.text[start:end]
+
+
+def as_document(resume, matcher=None):
+    """Accept either raw resume text or an already-built ResumeDocument"""
+    if isinstance(resume, ResumeDocument):
+        return resume
+    return ResumeDocument.from_text(resume, matcher)
@@ -0,0 +1,287 @@
+import hashlib
+import json
+import logging
+import os
+import string
+import threading
+import time
+
+from keyword_matcher import KeywordMatcher
+
+DEFAULT_RUBRIC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rubric.json')
+
+# Per-resume values a rule can test or count, besides 'keywords:<category>'
+FEATURES = ('track_keywords', 'dream_job_words', 'quantified', 'percentages', 'metrics', 'bullets', 'email', 'phone')
+# Placeholders a feedback text may use
+TEXT_FIELDS = ('career_track', 'career_track_lower', 'life_stage', 'dream_job')
+FEEDBACK_SECTIONS = ('strengths', 'improvements', 'career_alignment', 'resources', 'personal_feedback',
+                     'career_insights')
+
+
+class RubricError(ValueError):
+    """A rubric file is malformed; the message names the offending entry"""
+
+
+def _expect(condition, where, message):
+    if not condition:
+        raise RubricError(f"{where}: {message}")
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class Rubric:
+    """A validated rubric compiled into a keyword matcher and rule functions
+
+    Instances are immutable once built; a reload builds a new one.
+    """
+
+    def __init__(self, data, source='<rubric>'):
+        _expect(isinstance(data, dict), source, "must be a JSON object")
+        for key in ('version', 'career_tracks', 'life_stages', 'keywords', 'scores', 'feedback'):
+            _expect(key in data, source, f"missing {key!r}")
+        self.source = source
+        # The content hash is part of the version so an edited file never reuses cached results
+        canonical = json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        self.version = f"{data['version']}-{hashlib.sha256(canonical).hexdigest()[:12]}"
+
+        tracks = data['career_tracks']
+        _expect(isinstance(tracks, dict) and tracks, 'career_tracks', "must be a non-empty object")
+        self.career_tracks = list(tracks)
+        self.track_keywords = {}
+        self.track_fields = {}
+        for name, track in tracks.items():
+            where = f'career_tracks[{name!r}]'
+            _expect(isinstance(track, dict), where, "must be an object")
+            keywords = track.get('keywords')
+            _expect(isinstance(keywords, list) and keywords and all(isinstance(kw, str) for kw in keywords),
+                    where, "'keywords' must be a non-empty list of strings")
+            self.track_keywords[name] = keywords
+            self.track_fields[name] = {}
+            for field, value in track.items():
+                if field != 'keywords':
+                    _expect(isinstance(value, str), f'{where}.{field}', "must be a string")
+                    self.track_fields[name][field] = value
+
+        stages = data['life_stages']
+        _expect(isinstance(stages, list) and stages and all(isinstance(stage, str) for stage in stages),
+                'life_stages', "must be a non-empty list of strings")
+        self.life_stages = list(stages)
+
+        keywords = data['keywords']
+        _expect(isinstance(keywords, dict), 'keywords', "must be an object")
+        for category, words in keywords.items():
+            _expect(isinstance(words, list) and all(isinstance(word, str) for word in words),
+                    f'keywords[{category!r}]', "must be a list of strings")
+        self.keywords = keywords
+        categories = dict(keywords)
+        for name, words in self.track_keywords.items():
+            categories['track:' + name] = words
+        try:
+            self.matcher = KeywordMatcher(categories)
+        except ValueError as e:
+            raise RubricError(f"keywords: {e}") from None
+
+        scores = data['scores']
+        _expect(isinstance(scores, dict) and scores, 'scores', "must be a non-empty object")
+        self.score_names = list(scores)
+        self.descriptions = {}
+        self.score_specs = {}
+        for name, spec in scores.items():
+            where = f'scores[{name!r}]'
+            _expect(name != 'total', where, "'total' is reserved for the sum of all scores")
+            _expect(isinstance(spec, dict), where, "must be an object")
+            _expect(isinstance(spec.get('description'), str), where, "'description' must be a string")
+            _expect(_is_number(spec.get('base')) and _is_number(spec.get('cap')), where,
+                    "'base' and 'cap' must be numbers")
+            _expect(isinstance(spec.get('rules'), list), where, "'rules' must be a list")
+            self.descriptions[name] = spec['description']
+            rules = [self._score_rule(rule, f'{where}.rules[{i}]') for i, rule in enumerate(spec['rules'])]
+            self.score_specs[name] = (spec['base'], spec['cap'], rules)
+
+        feedback = data['feedback']
+        _expect(isinstance(feedback, dict), 'feedback', "must be an object")
+        self.feedback = {}
+        for section in FEEDBACK_SECTIONS:
+            where = f'feedback.{section}'
+            spec = feedback.get(section)
+            _expect(isinstance(spec, dict) and isinstance(spec.get('rules'), list), where,
+                    "must be an object with a 'rules' list")
+            limit = spec.get('limit')
+            _expect(limit is None or (isinstance(limit, int) and limit >= 0), where, "'limit' must be an integer")
+            join = spec.get('join')
+            _expect(join is None or isinstance(join, str), where, "'join' must be a string")
+            rules = [self._feedback_rule(rule, f'{where}.rules[{i}]') for i, rule in enumerate(spec['rules'])]
+            self.feedback[section] = (rules, limit, join)
+
+    def _check_feature(self, feature, where):
+        if isinstance(feature, str) and feature.startswith('keywords:'):
+            _expect(feature[len('keywords:'):] in self.keywords, where, f"unknown keyword category in {feature!r}")
+        else:
+            _expect(feature in FEATURES, where, f"unknown feature {feature!r}")
+
+    def _score_rule(self, rule, where):
+        """Compile a score rule into (feature names, weight, cap, points)"""
+        _expect(isinstance(rule, dict), where, "must be an object")
+        if 'count' in rule:
+            self._check_feature(rule['count'], where)
+            _expect(_is_number(rule.get('weight')), where, "'weight' must be a number")
+            _expect(rule.get('cap') is None or _is_number(rule['cap']), where, "'cap' must be a number")
+            return ('count', rule['count'], rule['weight'], rule.get('cap'))
+        _expect(isinstance(rule.get('any'), list) and rule['any'], where, "needs 'count' or a non-empty 'any' list")
+        for feature in rule['any']:
+            self._check_feature(feature, where)
+        _expect(_is_number(rule.get('points')), where, "'points' must be a number")
+        return ('any', tuple(rule['any']), rule['points'], None)
+
+    def _condition(self, condition, where):
+        """Compile an 'if' object into a function of the evaluation context"""
+        _expect(isinstance(condition, dict) and condition, where, "must be a non-empty object")
+        unknown = set(condition) - {'score', 'feature', 'at_least', 'below', 'life_stage', 'career_track', 'dream_job'}
+        _expect(not unknown, where, f"unknown keys {sorted(unknown)}")
+        _expect(not ('score' in condition and 'feature' in condition), where, "use either 'score' or 'feature'")
+        for bound in ('at_least', 'below'):
+            _expect(bound not in condition or _is_number(condition[bound]), where, f"'{bound}' must be a number")
+        checks = []
+
+        if 'score' in condition or 'feature' in condition:
+            if 'score' in condition:
+                name = condition['score']
+                _expect(name == 'total' or name in self.score_names, where, f"unknown score {name!r}")
+                def value(context, name=name):
+                    return context['scores'][name]
+            else:
+                name = condition['feature']
+                self._check_feature(name, where)
+                def value(context, name=name):
+                    return context['features'][name]
+            # A bare feature test means "present at least once"
+            at_least = condition.get('at_least', None if 'below' in condition or 'score' in condition else 1)
+            below = condition.get('below')
+            _expect(at_least is not None or below is not None, where, "needs 'at_least' or 'below'")
+            if at_least is not None:
+                checks.append(lambda context: value(context) >= at_least)
+            if below is not None:
+                checks.append(lambda context: value(context) < below)
+
+        if 'life_stage' in condition:
+            parts = condition['life_stage']
+            _expect(isinstance(parts, list) and all(isinstance(p, str) for p in parts), where,
+                    "'life_stage' must be a list of strings")
+            checks.append(lambda context: any(part in context['life_stage'] for part in parts))
+        if 'career_track' in condition:
+            names = condition['career_track']
+            _expect(isinstance(names, list) and all(isinstance(n, str) for n in names), where,
+                    "'career_track' must be a list of strings")
+            checks.append(lambda context: context['career_track'] in names)
+        if 'dream_job' in condition:
+            wanted = condition['dream_job']
+            _expect(isinstance(wanted, bool), where, "'dream_job' must be true or false")
+            checks.append(lambda context: bool(context['dream_job']) == wanted)
+
+        return lambda context: all(check(context) for check in checks)
+
+    def _text(self, text, where):
+        _expect(isinstance(text, str), where, "'text' must be a string")
+        try:
+            placeholders = [(field, spec, conversion) for _, field, spec, conversion in string.Formatter().parse(text)
+                            if field is not None]
+        except ValueError as e:
+            raise RubricError(f"{where}: bad placeholder in text: {e}") from None
+        unknown = {field for field, _, _ in placeholders} - set(TEXT_FIELDS)
+        _expect(not unknown, where, f"unknown placeholders {sorted(unknown)}")
+        # A spec or conversion could fail (or differ) on a user's input; placeholders stay plain {field}
+        _expect(not any(spec or conversion for _, spec, conversion in placeholders), where,
+                "placeholders cannot have a format spec or conversion")
+        return text
+
+    def _feedback_rule(self, rule, where):
+        """Compile a feedback rule into a function returning its text or None"""
+        _expect(isinstance(rule, dict), where, "must be an object")
+        if 'first' in rule:
+            _expect(isinstance(rule['first'], list), where, "'first' must be a list")
+            options = [self._feedback_rule(option, f'{where}.first[{i}]') for i, option in enumerate(rule['first'])]
+            def first(context):
+                for option in options:
+                    text = option(context)
+                    if text is not None:
+                        return text
+                return None
+            return first
+        if 'track' in rule:
+            field = rule['track']
+            _expect(isinstance(field, str), where, "'track' must name a career track field")
+            return lambda context: self.track_fields.get(context['career_track'], {}).get(field)
+
+        text = self._text(rule.get('text'), where)
+        condition = self._condition(rule['if'], f'{where}.if') if 'if' in rule else None
+        def emit(context):
+            if condition is not None and not condition(context):
+                return None
+            return text.format(**context['text_fields'])
+        return emit
+
+
+def load_rubric(path=DEFAULT_RUBRIC_PATH):
+    """Read, validate and compile a rubric file, raising RubricError if it is invalid"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except ValueError as e:
+        raise RubricError(f"{path}: not valid JSON: {e}") from None
+    return Rubric(data, path)
+
+
+class RubricStore:
+    """Holds the current Rubric and reloads it when its file changes
+
+    current() checks the file's modification time at most every
+    poll_interval seconds. A changed file is compiled in full before it
+    replaces the current rubric in one assignment, so requests always see
+    either the old or the new rubric. A file that fails to load is logged
+    and ignored until it changes again.
+    """
+
+    def __init__(self, path=DEFAULT_RUBRIC_PATH, poll_interval=2.0, logger=None):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self.reloads = 0
+        self.rejected = 0
+        self._mtime = os.stat(path).st_mtime_ns
+        self._rubric = load_rubric(path)
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+
+    def current(self):
+        if self.poll_interval is not None and time.monotonic() - self._checked >= self.poll_interval:
+            self.reload()
+        return self._rubric
+
+    def reload(self):
+        """Load the file if it changed since the last attempt; returns whether it was swapped in"""
+        if not self._lock.acquire(blocking=False):
+            return False  # Another thread is already reloading
+        try:
+            self._checked = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError as e:
+                self.logger.error("Cannot stat rubric %s: %s", self.path, e)
+                return False
+            if mtime == self._mtime:
+                return False
+            self._mtime = mtime
+            try:
+                rubric = load_rubric(self.path)
+            except (OSError, RubricError) as e:
+                self.rejected += 1
+                self.logger.error("Rejected rubric reload, keeping version %s: %s", self._rubric.version, e)
+                return False
+            self._rubric = rubric
+            self.reloads += 1
+            self.logger.warning("Loaded rubric version %s from %s", rubric.version, self.path)
+            return True
+        finally:
+            self._lock.release()
@@ -0,0 +1,55 @@
+"""SQLite connections for stores shared by threads and forked gunicorn workers
+
+A sqlite3 connection must not be used from two threads or carried across a
+fork, so each thread opens its own on first use in each process. Databases
+run in WAL mode: readers never wait for the single writer, which suits many
+workers reading and writing one file.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+def connect(path):
+    """Open an autocommit connection in WAL mode whose rows can be read by column name"""
+    db = sqlite3.connect(path, timeout=30, isolation_level=None)
+    db.row_factory = sqlite3.Row
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute('PRAGMA synchronous=NORMAL')
+    return db
+
+
+class LocalConnections:
+    """One connection to path per thread and process, with the schema created up front"""
+
+    def __init__(self, path, schema):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # A short-lived connection, so a process that forks after this has none to inherit
+        db = connect(path)
+        try:
+            db.executescript(schema)
+        finally:
+            db.close()
+
+    def get(self):
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.db = connect(self.path)
+            self._local.pid = os.getpid()
+        return self._local.db
+
+    @contextmanager
+    def transaction(self):
+        """A write transaction that takes the lock up front, so its reads cannot go stale"""
+        db = self.get()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
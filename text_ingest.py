@@ -0,0 +1,271 @@
+"""Read resume text from uploads and form bodies without buffering all of it
+
+Text is decoded chunk by chunk through an incremental decoder that keeps at
+most max_chars characters. Once the cap is reached the rest of the input is
+read and dropped without being decoded, so a request holds at most one
+chunk and the capped text in memory, however large the body.
+"""
+import codecs
+import logging
+import re
+from dataclasses import dataclass
+from urllib.parse import quote, unquote_to_bytes
+
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import FormDataParser, MultiPartParser
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+CHUNK_SIZE = 64 * 1024
+
+_URLENCODED_SEPARATOR = re.compile(rb'[=&]')
+
+# Decoding error handler that keeps bytes which are not valid UTF-8 as their
+# percent escapes, the way Werkzeug decodes URL-encoded form fields
+URL_QUOTE_ERRORS = 'text_ingest.url_quote'
+
+
+def _quote_invalid_bytes(error):
+    return quote(error.object[error.start:error.end], safe=''), error.end
+
+
+codecs.register_error(URL_QUOTE_ERRORS, _quote_invalid_bytes)
+
+
+class TextDecodeError(ValueError):
+    """Input is not text in the expected encoding; the message gives the byte offset"""
+
+
+@dataclass
+class TextIngestion:
+    """Text read from a stream plus whether the character cap cut it short"""
+    text: str
+    truncated: bool = False
+    bytes_read: int = 0  # Bytes consumed, including any dropped after the cap
+
+
+class BoundedTextDecoder:
+    """Incremental decoder that keeps the first max_chars characters of its input
+
+    With errors='strict' an invalid byte raises TextDecodeError naming its
+    offset. A leading UTF-8 byte order mark is dropped.
+    """
+
+    def __init__(self, max_chars=None, encoding='utf-8', errors='strict'):
+        if codecs.lookup(encoding).name == 'utf-8':
+            encoding = 'utf-8-sig'
+        self.max_chars = max_chars
+        self.truncated = False
+        self.bytes_read = 0
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors)
+        self._parts = []
+        self._chars = 0
+
+    def feed(self, data, final=False):
+        """Decode the next chunk; returns False once the cap is reached and further input is ignored"""
+        offset = self.bytes_read
+        self.bytes_read += len(data)
+        if self.truncated:
+            return False
+        try:
+            pending = len(self._decoder.getstate()[0])
+            text = self._decoder.decode(data, final)
+        except UnicodeDecodeError as e:
+            raise TextDecodeError(f"invalid {e.encoding} byte at offset {offset - pending + e.start}") from None
+        if self.max_chars is not None and self._chars + len(text) > self.max_chars:
+            text = text[:self.max_chars - self._chars]
+            self.truncated = True
+        if text:
+            self._parts.append(text)
+            self._chars += len(text)
+        return not self.truncated
+
+    def result(self):
+        return TextIngestion(''.join(self._parts), self.truncated, self.bytes_read)
+
+
+def read_text_stream(stream, max_chars=None, encoding='utf-8', errors='strict', chunk_size=CHUNK_SIZE):
+    """Decode a binary stream in chunks, stopping once max_chars characters are read"""
+    decoder = BoundedTextDecoder(max_chars, encoding, errors)
+    while True:
+        chunk = stream.read(chunk_size)
+        if not decoder.feed(chunk, final=not chunk) or not chunk:
+            return decoder.result()
+
+
+class _PercentDecoder:
+    """Undoes form URL encoding across chunk boundaries"""
+
+    def __init__(self):
+        self._tail = b''  # A '%' escape split by the end of the last chunk
+
+    def decode(self, data, final=False):
+        data = self._tail + data.replace(b'+', b' ')
+        cut = len(data)
+        if not final:
+            escape = data.rfind(b'%', max(0, len(data) - 2))
+            if escape != -1:
+                cut = escape
+        self._tail = data[cut:]
+        return unquote_to_bytes(data[:cut])
+
+
+class StreamingMultiPartParser(MultiPartParser):
+    """MultiPartParser that decodes the streamed_fields through a BoundedTextDecoder
+
+    streamed_fields maps a field name to its character cap. Other fields are
+    buffered as usual, but one larger than max_form_memory_size bytes raises
+    RequestEntityTooLarge, as do part headers that large. Files are spooled
+    by the stream factory.
+    """
+
+    def __init__(self, streamed_fields, logger, **kwargs):
+        super().__init__(**kwargs)
+        self.streamed_fields = streamed_fields
+        self.logger = logger
+
+    def parse(self, stream, boundary, content_length):
+        # Bounds what the decoder holds between reads, such as part headers or a
+        # line with no end; it counts the read being parsed too, so add that
+        max_buffered = None
+        if self.max_form_memory_size is not None:
+            max_buffered = self.max_form_memory_size + self.buffer_size
+        parser = MultipartDecoder(boundary, max_buffered, max_parts=self.max_form_parts)
+        fields = []
+        files = []
+        while True:
+            data = stream.read(self.buffer_size)
+            parser.receive_data(data or None)
+            event = parser.next_event()
+            while not isinstance(event, (Epilogue, NeedData)):
+                if isinstance(event, Field):
+                    part, container, size = event, [], 0
+                    limit = self.streamed_fields.get(event.name)
+                    decoder = None
+                    if limit is not None:
+                        decoder = BoundedTextDecoder(limit, self.get_part_charset(event.headers), 'replace')
+                elif isinstance(event, File):
+                    part, decoder = event, None
+                    container = self.start_file_streaming(event, content_length)
+                elif isinstance(event, Data):
+                    if decoder is not None:
+                        decoder.feed(event.data, final=not event.more_data)
+                    elif isinstance(part, Field):
+                        size += len(event.data)
+                        if self.max_form_memory_size is not None and size > self.max_form_memory_size:
+                            raise RequestEntityTooLarge()
+                        container.append(event.data)
+                    else:
+                        container.write(event.data)
+                    if not event.more_data:
+                        if decoder is not None:
+                            fields.append((part.name, _streamed_text(part.name, decoder, self.logger)))
+                        elif isinstance(part, Field):
+                            fields.append((part.name, b''.join(container).decode(
+                                self.get_part_charset(part.headers), self.errors)))
+                        else:
+                            container.seek(0)
+                            files.append((part.name, FileStorage(container, part.filename, part.name,
+                                                                 headers=part.headers)))
+                event = parser.next_event()
+            if not data:
+                return self.cls(fields), self.cls(files)
+
+
+class StreamingFormDataParser(FormDataParser):
+    """FormDataParser that streams the named fields of multipart and URL-encoded bodies
+
+    Used through a request class whose make_form_data_parser() returns one,
+    so request.form holds the capped text of each streamed field.
+    """
+
+    def __init__(self, *args, streamed_fields=None, logger=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.streamed_fields = streamed_fields or {}
+        self.logger = logger or logging.getLogger(__name__)
+
+    def _parse_multipart(self, stream, mimetype, content_length, options):
+        parser = StreamingMultiPartParser(
+            self.streamed_fields,
+            self.logger,
+            stream_factory=self.stream_factory,
+            max_form_memory_size=self.max_form_memory_size,
+            max_form_parts=self.max_form_parts,
+            cls=self.cls,
+        )
+        boundary = options.get('boundary', '').encode('ascii')
+        if not boundary:
+            raise ValueError("Missing boundary")
+        form, files = parser.parse(stream, boundary, content_length)
+        return stream, form, files
+
+    def _parse_urlencoded(self, stream, mimetype, content_length, options):
+        fields = []
+        name = None  # The field whose value is being read
+        pending = []  # Undecoded bytes of the current name or buffered value
+        size = 0
+        decoder = unquote = None  # Set while a streamed field's value is being read
+
+        def finish(value):
+            if decoder is not None:
+                decoder.feed(unquote.decode(b'', final=True), final=True)
+                value = _streamed_text(name, decoder, self.logger)
+            fields.append((name, value))
+
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            position = 0
+            while position < len(chunk):
+                if name is None:
+                    match = _URLENCODED_SEPARATOR.search(chunk, position)
+                    end = match.start() if match else len(chunk)
+                else:
+                    end = chunk.find(b'&', position)
+                    end = len(chunk) if end == -1 else end
+                piece = chunk[position:end]
+                if decoder is not None:
+                    # Past the cap the bytes are only counted, so skip undoing their escapes
+                    decoder.feed(piece if decoder.truncated else unquote.decode(piece))
+                else:
+                    size += len(piece)
+                    if self.max_form_memory_size is not None and size > self.max_form_memory_size:
+                        raise RequestEntityTooLarge()
+                    pending.append(piece)
+                position = end + 1
+                if end == len(chunk):
+                    break
+                text = _unquote_text(b''.join(pending))
+                pending, size = [], 0
+                if name is None:
+                    if chunk[end:end + 1] == b'&':
+                        if text:
+                            fields.append((text, ''))
+                        continue
+                    name = text
+                    limit = self.streamed_fields.get(name)
+                    if limit is not None:
+                        decoder = BoundedTextDecoder(limit, errors=URL_QUOTE_ERRORS)
+                        unquote = _PercentDecoder()
+                else:
+                    finish(text)
+                    name, decoder = None, None
+            if not chunk:
+                break
+        text = _unquote_text(b''.join(pending))
+        if name is not None:
+            finish(text)
+        elif text:
+            fields.append((text, ''))
+        return stream, self.cls(fields), self.cls()
+
+
+def _streamed_text(name, decoder, logger):
+    result = decoder.result()
+    if result.truncated:
+        logger.info("Form field %s truncated to %d characters (%d bytes received)",
+                    name, decoder.max_chars, result.bytes_read)
+    return result.text
+
+
+def _unquote_text(data):
+    return unquote_to_bytes(data.replace(b'+', b' ')).decode('utf-8', URL_QUOTE_ERRORS)
@@ -0,0 +1,158 @@
+"""Canonical form of resume text, computed once before it is hashed or analyzed
+
+Text pasted from Word or extracted from a PDF carries no-break spaces,
+ligatures, smart quotes, private-use bullet glyphs, soft hyphens and long
+runs of blank space. normalize_text() folds all of them into plain forms, so
+the scoring patterns see the same text whatever program produced it, and two
+submissions that differ only in such details share one cache entry.
+
+Every step is one pass of str.replace, a regex substitution through a
+character table, NFKC or a regex without backtracking, so the cost is linear
+in the length of the text. A step is skipped when a quick containment test
+shows the text does not need it, and pure ASCII text skips the Unicode steps.
+"""
+import re
+import unicodedata
+
+# Glyphs that word processors and PDF fonts put at the start of a list item;
+# the last five are Symbol and Wingdings bullets in the private use area
+BULLET_GLYPHS = ('•‣⁃∙▪▫■□▶►◆◇○●◦'
+                 '★☐✓✔❖➢➤·'
+                 '')
+
+_CHARACTERS = {
+    **{c: "'" for c in '‘’‚‛′'},
+    **{c: '"' for c in '“”„‟″'},
+    **{c: '-' for c in '‐‑‒–—―−'},
+    **{c: '\n' for c in '\x85  '},
+    # C1 controls and invisible formatting: soft hyphens, zero-width spaces and joiners, direction marks
+    **{chr(code): '' for code in range(0x80, 0xa0) if code != 0x85},
+    **{c: '' for c in '­​‌‍‎‏‪‫‬‭‮'
+                             '⁠⁡⁢⁣⁤⁦⁧⁨⁩﻿'},
+}
+# Substituting only the characters that occur is much faster than str.translate over the whole text
+_CHARACTER_RE = re.compile('[' + re.escape(''.join(_CHARACTERS)) + ']')
+_BULLET_RE = re.compile('^[ \t]*[' + BULLET_GLYPHS + ']', re.MULTILINE)
+_CONTROL_RE = re.compile(r'[\x00-\x08\x0e-\x1f\x7f]')
+# Both start with a literal, which the regex engine finds with a fast scan
+_SPACES_RE = re.compile(r'  +')
+_BLANK_LINES_RE = re.compile(r'\n\n\n+')
+
+
+def normalize_text(text):
+    """The canonical text that is hashed, cached and analyzed
+
+    Unix line breaks; control and invisible format characters removed; ASCII
+    quotes and hyphens; NFKC, which also turns ligatures, full-width forms
+    and no-break spaces into their plain equivalents; one bullet character
+    for list items; runs of spaces and tabs collapsed to one space; no spaces
+    at line ends; at most one blank line in a row and none around the text.
+    Applying it to its own output changes nothing.
+    """
+    return _finish(normalize_lines(text.replace('\r\n', '\n')))
+
+
+def _finish(text):
+    """The steps of normalize_text() that look across lines"""
+    if '\n\n\n' in text:
+        text = _BLANK_LINES_RE.sub('\n\n', text)
+    return text.strip(' \n')
+
+
+def normalize_lines(text):
+    """Every step of normalize_text() that works within one line
+
+    For text without '\\r\\n', the result for a + '\\n' + b is the result
+    for a, '\\n' and the result for b.
+    """
+    # str.replace and the containment tests run at memchr speed; most text needs few of the steps
+    if '\r' in text:
+        text = text.replace('\r', '\n')
+    if '\f' in text or '\v' in text:
+        text = text.replace('\f', '\n').replace('\v', '\n')
+    text = _CONTROL_RE.sub('', text)
+    if not text.isascii():
+        # NFKC goes after the character table so it recomposes across any removed invisible character
+        text = unicodedata.normalize('NFKC', _CHARACTER_RE.sub(lambda m: _CHARACTERS[m.group()], text))
+        text = _BULLET_RE.sub('•', text)
+    if '\t' in text:
+        text = text.replace('\t', ' ')
+    text = _SPACES_RE.sub(' ', text)
+    # Runs of spaces are single by now
+    return text.replace(' \n', '\n').replace('\n ', '\n').strip(' ')
+
+
+def _common_prefix(a, b, limit):
+    """Length of the longest common prefix of a and b, up to limit, by comparing halving slices"""
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix(a, b, limit):
+    """Length of the longest common suffix of a and b, up to limit"""
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:len(a) - low] == b[len(b) - middle:len(b) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class LineNormalizer:
+    """normalize_text() for successive versions of one text, redoing only the lines that changed
+
+    The unchanged lines at the start and end are found by comparing the text
+    with the previous version in slices, so after a small edit the cost is a
+    few string comparisons plus normalizing the edited lines. Besides the text
+    as given, only one string of the normalized lines is kept, with the
+    offset of each line in it.
+    """
+
+    def __init__(self):
+        self.text = ''  # The last text, as given
+        self.normalized_lines = ''  # normalize_lines() of each line of text, joined by '\n'
+        self._starts = [0]  # Offset of each of those lines in normalized_lines
+
+    def __call__(self, text):
+        old, starts = self.text, self._starts
+        shorter = min(len(old), len(text))
+        # The first changed line starts after the last line break both versions share
+        start = text.rfind('\n', 0, _common_prefix(old, text, shorter)) + 1
+        kept_before = text.count('\n', 0, start)
+        # The last changed line ends at the first line break of the shared end
+        suffix = _common_suffix(old, text, shorter - start)
+        end = text.find('\n', len(text) - suffix) if suffix else -1
+        if end == -1:
+            end, kept_after = len(text), 0
+        else:
+            kept_after = text.count('\n', end)
+        changed = text[start:end].split('\n')
+        # A '\r' ending a line that a '\n' follows is half of a '\r\n' line break
+        last = len(changed) - 1 if end == len(text) else len(changed)
+        changed = [normalize_lines(line[:-1] if index < last and line.endswith('\r') else line)
+                   for index, line in enumerate(changed)]
+
+        before = self.normalized_lines[:starts[kept_before]] if kept_before else ''
+        new_starts = starts[:kept_before]
+        offset = len(before)
+        for line in changed:
+            new_starts.append(offset)
+            offset += len(line) + 1
+        middle = '\n'.join(changed)
+        if kept_after:
+            after_start = starts[len(starts) - kept_after]
+            shift = offset - after_start
+            new_starts.extend(line_start + shift for line_start in starts[len(starts) - kept_after:])
+            middle += self.normalized_lines[after_start - 1:]
+        self.text = text
+        self.normalized_lines = before + middle
+        self._starts = new_starts
+        return _finish(self.normalized_lines)